@@ -0,0 +1,111 @@
+# coding: utf-8
+
+"""
+    Registry of supported standards
+    Modules of standards are imported on first access (e.g. aqipy.aqi_us or get_calculator('us')), so a process
+    which uses one standard does not load the tables and messages of the others
+"""
+
+import importlib
+
+# standard code -> (module, calculator, calculator inputs, index bands, level names, arguments of the calculator)
+# AQHI standards (Canada, Hong Kong) combine all pollutants in one formula and have no calculator inputs
+REGISTRY = {
+    'us': ('aqi_us', 'get_aqi', 'US_AQI_INPUTS', 'US_AQI', 'US_AQI_LEVELS',
+           ('co_8h', 'o3_1h', 'o3_8h', 'no2_1h', 'pm25_24h', 'pm10_24h', 'so2_1h', 'so2_24h')),
+    'cn': ('aqi_cn', 'get_aqi', 'CN_AQI_INPUTS', 'CN_AQI', 'CN_AQI_LEVELS',
+           ('o3_1h', 'o3_8h', 'co_24h', 'pm25_24h', 'pm10_24h', 'so2_24h', 'no2_24h')),
+    'in': ('aqi_in', 'get_aqi', 'IN_AQI_INPUTS', 'IN_AQI', 'IN_AQI_LEVELS',
+           ('o3_8h', 'co_8h', 'pm25_24h', 'pm10_24h', 'so2_24h', 'no2_24h', 'nh3_24h', 'pb_24h')),
+    'eu': ('caqi_eu', 'get_caqi', 'EU_CAQI_INPUTS', 'EU_CAQI', 'EU_CAQI_LEVELS',
+           ('co_1h', 'o3_max_1h', 'no2_max_1h', 'pm25_24h', 'pm25_1h', 'pm10_1h', 'pm10_24h', 'so2_max_1h')),
+    'uk': ('daqi_uk', 'get_daqi', 'UK_DAQI_INPUTS', 'UK_AQI', 'UK_AQI_LEVELS',
+           ('o3_1h', 'no2_1h', 'so2_15m', 'pm25_24h', 'pm10_24h')),
+    'au': ('aqi_au', 'get_aqi', 'AU_AQI_INPUTS', 'AU_AQI', 'AU_AQI_LEVELS',
+           ('o3_1h', 'o3_4h', 'co_8h', 'no2_1h', 'so2_24h', 'pm25_24h', 'pm10_24h')),
+    'kr': ('cai_kr', 'get_aqi', 'KR_CAI_INPUTS', 'KR_CAI', 'KR_CAI_LEVELS',
+           ('o3_1h', 'co_1h', 'so2_1h', 'no2_1h', 'pm25_24h', 'pm10_24h')),
+    'sg': ('psi_sg', 'get_aqi', 'SG_PSI_INPUTS', 'SG_PSI', 'SG_PSI_LEVELS',
+           ('o3_8h', 'no2_1h', 'so2_24h', 'co_8h', 'pm25_24h', 'pm10_24h')),
+    'ca': ('aqhi_ca', 'get_aqhi', None, 'CA_AQHI', 'CA_AQHI_LEVELS', ('o3_3h', 'no2_3h', 'pm25_3h', 'pm10_3h')),
+    'hk': ('aqhi_hk', 'get_aqhi', None, 'HK_AQHI', 'HK_AQHI_LEVELS',
+           ('o3_3h', 'no2_3h', 'so2_3h', 'pm25_3h', 'pm10_3h')),
+}
+
+__submodules = ('aqhi_ca', 'aqhi_hk', 'aqi_au', 'aqi_cn', 'aqi_in', 'aqi_us', 'cai_kr', 'caqi_eu', 'catalog', 'cli',
+                'columnar', 'daqi_uk', 'inverse', 'multi', 'parallel', 'psi_sg', 'raster', 'server', 'station', 'stream',
+                'units', 'utils')
+__modules = {}
+
+
+def __getattr__(name: str):
+    if name in __submodules:
+        return importlib.import_module('aqipy.' + name)
+    raise AttributeError("module 'aqipy' has no attribute %r" % name)
+
+
+def __dir__() -> []:
+    return sorted(set(globals()) | set(__submodules))
+
+
+def get_standards() -> ():
+    """
+    Lists supported standards
+
+    :return: tuple of standard codes: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    """
+    return tuple(REGISTRY)
+
+
+def get_module(standard: str):
+    """
+    Imports module of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: module, e.g. aqipy.aqi_us
+    """
+    module = __modules.get(standard)
+    if module is None:
+        if standard not in REGISTRY:
+            raise ValueError('unsupported standard: %s' % standard)
+        module = importlib.import_module('aqipy.' + REGISTRY[standard][0])
+        __modules[standard] = module
+    return module
+
+
+def get_calculator(standard: str):
+    """
+    Returns calculator of a standard, e.g. aqi_us.get_aqi for us
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: calculator function
+    """
+    return getattr(get_module(standard), REGISTRY[standard][1])
+
+
+def get_arguments(standard: str) -> ():
+    """
+    Lists arguments of the calculator of a standard without importing its module
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: tuple of argument names, e.g. ('co_8h', 'o3_1h', ...)
+    """
+    if standard not in REGISTRY:
+        raise ValueError('unsupported standard: %s' % standard)
+    return REGISTRY[standard][5]
+
+
+def get_periods(standard: str) -> {}:
+    """
+    Lists pollutants of a standard with their averaging periods without importing its module
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: dict pollutant -> tuple of averaging periods, e.g. {'o3': ('1h', '8h'), 'pm25': ('24h',), ...},
+             hourly maximums of CAQI Europe are given as max_1h
+    """
+    periods = {}
+    for name in get_arguments(standard):
+        pollutant, _, period = name.partition('_')
+        periods.setdefault(pollutant, ())
+        periods[pollutant] += (period,)
+    return periods
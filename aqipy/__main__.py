@@ -0,0 +1,5 @@
+import sys
+
+from aqipy.cli import main
+
+sys.exit(main())
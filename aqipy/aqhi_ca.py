@@ -7,7 +7,9 @@
 """
 
 from typing import Union, Tuple
-from aqipy.utils import __get_aqi_texts, __added_risk, __get_aqi_level, AQI_NOT_AVAILABLE
+from aqipy.utils import __get_aqi_texts, __get_bands, __added_risk, __get_aqi_level, AQI_NOT_AVAILABLE, __as_array, \
+    __is_defined_array, __added_risk_array, __round_clip_array, __maximum_array, __where_available_array, \
+    __get_band_array
 
 CA_AQHI = ((1, 3), (4, 6), (7, 10), (11, 11))
 CA_AQHI_LEVELS = ('low', 'moderate', 'high', 'very high')
@@ -26,9 +28,12 @@ CA_AQHI_RISK = (
     "Avoid strenuous activities outdoors. Children and the elderly should also avoid outdoor physical exertion."
 )
 
+# coefficients of O3, NO2, PM2.5 and PM10
+CA_AQHI_BETAS = (0.000537, 0.000871, 0.000487, 0.000297)
 
-def get_aqhi(o3_3h: float, no2_3h: float, pm25_3h: float, pm10_3h: float, with_level: bool = False) -> Union[
-    Tuple[float, str, str], Tuple[float, dict]]:
+
+def get_aqhi(o3_3h: float, no2_3h: float, pm25_3h: float, pm10_3h: float, with_level: bool = False,
+             with_codes: bool = False) -> Union[Tuple[float, str, str], Tuple[float, dict], Tuple[float, int]]:
     """
     Calculates Canada AQHI
 
@@ -37,11 +42,15 @@ def get_aqhi(o3_3h: float, no2_3h: float, pm25_3h: float, pm10_3h: float, with_l
     :param pm25_3h: PM2.5 average (3h), μg/m3
     :param pm10_3h: PM10 average (3h), μg/m3
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
-    :return: CA AQHI, General message, Risk message
+    :param with_codes: Boolean distinguishing whether to return message code instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
+    :return: CA AQHI, General message, Risk message (or CA AQHI, message code)
     """
     if any(value is None for value in (o3_3h, no2_3h, pm10_3h, pm25_3h)):
+        if with_codes:
+            return AQI_NOT_AVAILABLE, {'level': -1} if with_level else -1
         return AQI_NOT_AVAILABLE, "", ""
-    betas = [0.000537, 0.000871, 0.000487, 0.000297]
+    betas = CA_AQHI_BETAS
     c = [o3_3h * 1000, no2_3h * 1000, pm25_3h, pm10_3h]
     ars = list(map(__added_risk, betas, c))
     ar_pm25 = sum(ars[0:2]) + ars[2]
@@ -49,7 +58,45 @@ def get_aqhi(o3_3h: float, no2_3h: float, pm25_3h: float, pm10_3h: float, with_l
     ar_pm10 = sum(ars[0:2]) + ars[3]
     pm10 = max(1, min(CA_AQHI[-1][1], round(ar_pm10)))
     aqhi = max(pm25, pm10)
+    if with_codes:
+        return aqhi, {'level': __get_bands(CA_AQHI).find(aqhi)} if with_level else __get_bands(CA_AQHI).find(aqhi)
     text1, text2 = __get_aqi_texts(aqhi, CA_AQHI, CA_AQHI_GENERAL, CA_AQHI_RISK)
     if not with_level:
         return aqhi, text1, text2
     return aqhi, {'level': __get_aqi_level(aqhi, CA_AQHI, CA_AQHI_LEVELS)}
+
+
+def get_category(o3_3h: float, no2_3h: float, pm25_3h: float, pm10_3h: float) -> int:
+    """
+    Finds level of Canada AQHI without messages, same as the level of get_aqhi(..., with_level=True)
+
+    :param o3_3h: O3 average (3h), ppm
+    :param no2_3h: NO2 average (3h), ppm
+    :param pm25_3h: PM2.5 average (3h), μg/m3
+    :param pm10_3h: PM10 average (3h), μg/m3
+    :return: level index in CA_AQHI_LEVELS, -1 means AQHI is not available
+    """
+    return get_aqhi(o3_3h, no2_3h, pm25_3h, pm10_3h, with_level=True, with_codes=True)[1]['level']
+
+
+def get_aqhi_batch(o3_3h, no2_3h, pm25_3h, pm10_3h) -> ('np.ndarray', 'np.ndarray'):
+    """
+    Calculates Canada AQHI for arrays of readings, e.g. stations x hours (requires numpy)
+
+    Inputs are broadcast against each other, NaN values are treated as missing readings.
+
+    :param o3_3h: O3 averages (3h), ppm
+    :param no2_3h: NO2 averages (3h), ppm
+    :param pm25_3h: PM2.5 averages (3h), μg/m3
+    :param pm10_3h: PM10 averages (3h), μg/m3
+    :return: CA AQHI array, array of categories (index in CA_AQHI_LEVELS), -1 means AQHI is not available
+    """
+    c = [__as_array(o3_3h) * 1000, __as_array(no2_3h) * 1000, __as_array(pm25_3h), __as_array(pm10_3h)]
+    ars = list(map(__added_risk_array, CA_AQHI_BETAS, c))
+    ar_gases = ars[0] + ars[1]
+    pm25 = __round_clip_array(ar_gases + ars[2], 1, CA_AQHI[-1][1])
+    pm10 = __round_clip_array(ar_gases + ars[3], 1, CA_AQHI[-1][1])
+    available = __is_defined_array(c[0]) & __is_defined_array(c[1]) & __is_defined_array(c[2]) & \
+        __is_defined_array(c[3])
+    aqhi = __where_available_array(__maximum_array(pm25, pm10), available)
+    return aqhi, __get_band_array(aqhi, CA_AQHI)
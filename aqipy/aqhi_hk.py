@@ -9,12 +9,16 @@
 
 from typing import Union, Tuple
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __get_aqi_texts, __added_risk, __get_aqi_level
+from aqipy.utils import AQI_NOT_AVAILABLE, BandTable, __get_aqi_texts, __added_risk, __get_aqi_level, __as_array, \
+    __get_bands, __is_defined_array, __replace_array, __added_risk_array, __maximum_array, __where_available_array, \
+    __get_band_array
 
 HK_AR = (
     (0.00, 1.87), (1.88, 3.76), (3.76, 5.63), (5.64, 7.51), (7.52, 9.40), (9.41, 11.28), (11.29, 12.90), (12.91, 15.06),
     (15.07, 17.21), (17.22, 19.36), (19.37, 19.37)
 )
+# the last of the overlapping bands is taken
+HK_AR_TABLE = BandTable(HK_AR, last=True)
 
 HK_AQHI = ((1, 3), (4, 6), (7, 7), (8, 10), (11, 11))
 HK_AQHI_LEVELS = ('low', 'moderate', 'high', 'very high', 'serious')
@@ -51,9 +55,14 @@ NO2_PPB_UGM3 = 1.88
 SO2_PPB_UGM3 = 2.62
 O3_PPB_UGM3 = 2
 
+# coefficients of NO2, SO2, O3, PM10 and PM2.5
+HK_AQHI_BETAS = (0.0004462559, 0.0001393235, 0.0005116328, 0.0002821751, 0.0002180567)
+# normal level of SO2 (3h), ppm, to make the formula work without SO2
+HK_SO2_NORMAL = 0.020
 
-def get_aqhi(o3_3h: float, no2_3h: float, so2_3h: float, pm25_3h: float, pm10_3h: float, with_level: bool = False) -> \
-        Union[Tuple[int, str, str], Tuple[int, dict]]:
+
+def get_aqhi(o3_3h: float, no2_3h: float, so2_3h: float, pm25_3h: float, pm10_3h: float, with_level: bool = False,
+             with_codes: bool = False) -> Union[Tuple[int, str, str], Tuple[int, dict], Tuple[int, int]]:
     """
     Calculates Hong Kong AQHI
 
@@ -63,21 +72,63 @@ def get_aqhi(o3_3h: float, no2_3h: float, so2_3h: float, pm25_3h: float, pm10_3h
     :param pm25_3h: PM2.5 average (3h), μg/m3
     :param pm10_3h: PM10 average (3h), μg/m3
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
-    :return: Hong Kong AQHI, Effect message, Caution message
+    :param with_codes: Boolean distinguishing whether to return message code instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
+    :return: Hong Kong AQHI, Effect message, Caution message (or Hong Kong AQHI, message code)
     """
     if any(value is None for value in (o3_3h, no2_3h, so2_3h, pm10_3h, pm25_3h)):
+        if with_codes:
+            return AQI_NOT_AVAILABLE, {'level': -1} if with_level else -1
         return AQI_NOT_AVAILABLE, "", ""
-    betas = [0.0004462559, 0.0001393235, 0.0005116328, 0.0002821751, 0.0002180567]
+    betas = HK_AQHI_BETAS
     if so2_3h == 0:
-        so2_3h = 0.020  # normal level - to make formula work without SO2
+        so2_3h = HK_SO2_NORMAL
     c = [no2_3h * 1000 * NO2_PPB_UGM3, so2_3h * 1000 * SO2_PPB_UGM3, o3_3h * 1000 * O3_PPB_UGM3, pm10_3h, pm25_3h]
     ars = list(map(__added_risk, betas, c))
     ar_total = sum(ars[0:3]) + max(ars[3:5])
-    aqhi = len(HK_AR)
-    for i in range(len(HK_AR)):
-        if HK_AR[i][0] <= ar_total <= HK_AR[i][1]:
-            aqhi = i + 1
+    aqhi = HK_AR_TABLE.evaluate(ar_total)
+    if with_codes:
+        # same lookup as the texts below
+        return aqhi, {'level': __get_bands(HK_AQHI).find(aqhi)} if with_level else __get_bands(HK_AR).find(aqhi)
     text1, text2 = __get_aqi_texts(aqhi, HK_AR, HK_AQHI_GENERAL, HK_AQHI_RISK)
     if not with_level:
         return aqhi, text1, text2
     return aqhi, {'level': __get_aqi_level(aqhi, HK_AQHI, HK_AQHI_LEVELS)}
+
+
+def get_category(o3_3h: float, no2_3h: float, so2_3h: float, pm25_3h: float, pm10_3h: float) -> int:
+    """
+    Finds level of Hong Kong AQHI without messages, same as the level of get_aqhi(..., with_level=True)
+
+    :param o3_3h: O3 average (3h), ppm
+    :param no2_3h: NO2 average (3h), ppm
+    :param so2_3h: SO2 average (3h), ppm
+    :param pm25_3h: PM2.5 average (3h), μg/m3
+    :param pm10_3h: PM10 average (3h), μg/m3
+    :return: level index in HK_AQHI_LEVELS, -1 means AQHI is not available
+    """
+    return get_aqhi(o3_3h, no2_3h, so2_3h, pm25_3h, pm10_3h, with_level=True, with_codes=True)[1]['level']
+
+
+def get_aqhi_batch(o3_3h, no2_3h, so2_3h, pm25_3h, pm10_3h) -> ('np.ndarray', 'np.ndarray'):
+    """
+    Calculates Hong Kong AQHI for arrays of readings, e.g. stations x hours (requires numpy)
+
+    Inputs are broadcast against each other, NaN values are treated as missing readings.
+
+    :param o3_3h: O3 averages (3h), ppm
+    :param no2_3h: NO2 averages (3h), ppm
+    :param so2_3h: SO2 averages (3h), ppm
+    :param pm25_3h: PM2.5 averages (3h), μg/m3
+    :param pm10_3h: PM10 averages (3h), μg/m3
+    :return: Hong Kong AQHI array, array of categories (index in HK_AQHI_LEVELS), -1 means AQHI is not available
+    """
+    so2 = __replace_array(__as_array(so2_3h), 0, HK_SO2_NORMAL)
+    c = [__as_array(no2_3h) * 1000 * NO2_PPB_UGM3, so2 * 1000 * SO2_PPB_UGM3, __as_array(o3_3h) * 1000 * O3_PPB_UGM3,
+         __as_array(pm10_3h), __as_array(pm25_3h)]
+    ars = list(map(__added_risk_array, HK_AQHI_BETAS, c))
+    ar_total = ars[0] + ars[1] + ars[2] + __maximum_array(ars[3], ars[4])
+    available = __is_defined_array(c[0]) & __is_defined_array(c[1]) & __is_defined_array(c[2]) & \
+        __is_defined_array(c[3]) & __is_defined_array(c[4])
+    aqhi = __where_available_array(HK_AR_TABLE.evaluate_array(ar_total), available)
+    return aqhi, __get_band_array(aqhi, HK_AQHI)
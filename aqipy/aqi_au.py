@@ -6,7 +6,8 @@
             https://www.environment.nsw.gov.au/topics/air/understanding-air-quality-data/air-quality-index
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __get_aqi_texts, __round_down, __get_aqi_level
+from aqipy.utils import Truncation, RatioTable, __round_down, __get_table_sub_index, __get_max_index, \
+    __get_category
 
 AU_AQI = ((0, 33), (34, 66), (67, 99), (100, 149), (150, 200), (201, 201))
 AU_AQI_LEVELS = ('very good', 'good', 'fair', 'poor', 'very poor', 'hazardous')
@@ -27,6 +28,7 @@ AU_AQI_RISK = (
     "Sensitive groups should avoid strenuous outdoor activities.",
     "Sensitive groups should avoid all outdoor activities."
 )
+AU_AQI_MESSAGES = (AU_AQI_GENERAL, AU_AQI_RISK)
 AU_CO_NEPM_STANDARD_8H = 9.0
 AU_NO2_NEPM_STANDARD_1H = 0.12
 AU_O3_NEPM_STANDARD_1H = 0.10
@@ -34,14 +36,13 @@ AU_O3_NEPM_STANDARD_4H = 0.08
 AU_SO2_NEPM_STANDARD_24H = 0.20
 AU_PM25_NEPM_STANDARD_24H = 25
 AU_PM10_NEPM_STANDARD_24H = 50
-
-
-def __get_aqi(cp: float, standard:float) -> (int, str, str):
-    aqi = round(cp / standard * 100)
-    if aqi > AU_AQI[-1][1]:
-        aqi = AU_AQI[-1][1]
-    text1, text2 = __get_aqi_texts(aqi, AU_AQI, AU_AQI_GENERAL, AU_AQI_RISK)
-    return aqi, text1, text2
+AU_CO_8H_TABLE = RatioTable(AU_CO_NEPM_STANDARD_8H, AU_AQI[-1][1], AU_AQI)
+AU_NO2_1H_TABLE = RatioTable(AU_NO2_NEPM_STANDARD_1H, AU_AQI[-1][1], AU_AQI)
+AU_O3_1H_TABLE = RatioTable(AU_O3_NEPM_STANDARD_1H, AU_AQI[-1][1], AU_AQI)
+AU_O3_4H_TABLE = RatioTable(AU_O3_NEPM_STANDARD_4H, AU_AQI[-1][1], AU_AQI)
+AU_SO2_24H_TABLE = RatioTable(AU_SO2_NEPM_STANDARD_24H, AU_AQI[-1][1], AU_AQI)
+AU_PM25_24H_TABLE = RatioTable(AU_PM25_NEPM_STANDARD_24H, AU_AQI[-1][1], AU_AQI)
+AU_PM10_24H_TABLE = RatioTable(AU_PM10_NEPM_STANDARD_24H, AU_AQI[-1][1], AU_AQI)
 
 
 def get_aqi_o3_1h(o3_1h: float) -> (int, str, str):
@@ -52,7 +53,7 @@ def get_aqi_o3_1h(o3_1h: float) -> (int, str, str):
     :return: O3 AU AQI, General message, Risk message
     """
     cp = __round_down(o3_1h, 2)
-    return __get_aqi(cp, AU_O3_NEPM_STANDARD_1H)
+    return __get_table_sub_index(cp, AU_O3_1H_TABLE, AU_AQI_MESSAGES)
 
 
 def get_aqi_co_8h(co_8h: float) -> (int, str, str):
@@ -63,7 +64,7 @@ def get_aqi_co_8h(co_8h: float) -> (int, str, str):
     :return: CO AU AQI, General message, Risk message
     """
     cp = __round_down(co_8h, 1)
-    return __get_aqi(cp, AU_CO_NEPM_STANDARD_8H)
+    return __get_table_sub_index(cp, AU_CO_8H_TABLE, AU_AQI_MESSAGES)
 
 
 def get_aqi_o3_4h(o3_4h: float) -> (int, str, str):
@@ -74,7 +75,7 @@ def get_aqi_o3_4h(o3_4h: float) -> (int, str, str):
     :return: O3 AU AQI, General message, Risk message
     """
     cp = __round_down(o3_4h, 2)
-    return __get_aqi(cp, AU_O3_NEPM_STANDARD_4H)
+    return __get_table_sub_index(cp, AU_O3_4H_TABLE, AU_AQI_MESSAGES)
 
 
 def get_aqi_no2_1h(no2_1h: float) -> (int, str, str):
@@ -85,7 +86,7 @@ def get_aqi_no2_1h(no2_1h: float) -> (int, str, str):
     :return: NO2 AU AQI, General message, Risk message
     """
     cp = __round_down(no2_1h, 2)
-    return __get_aqi(cp, AU_NO2_NEPM_STANDARD_1H)
+    return __get_table_sub_index(cp, AU_NO2_1H_TABLE, AU_AQI_MESSAGES)
 
 
 def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
@@ -96,7 +97,7 @@ def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
     :return: SO2 AU AQI, General message, Risk message
     """
     cp = __round_down(so2_24h, 2)
-    return __get_aqi(cp, AU_SO2_NEPM_STANDARD_24H)
+    return __get_table_sub_index(cp, AU_SO2_24H_TABLE, AU_AQI_MESSAGES)
 
 
 def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -107,7 +108,7 @@ def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 AU AQI, General message, Risk message
     """
     cp = __round_down(pm25_24h)
-    return __get_aqi(cp, AU_PM25_NEPM_STANDARD_24H)
+    return __get_table_sub_index(cp, AU_PM25_24H_TABLE, AU_AQI_MESSAGES)
 
 
 def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -118,11 +119,25 @@ def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 AU AQI, General message, Risk message
     """
     cp = __round_down(pm10_24h)
-    return __get_aqi(cp, AU_PM10_NEPM_STANDARD_24H)
+    return __get_table_sub_index(cp, AU_PM10_24H_TABLE, AU_AQI_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+AU_AQI_INPUTS = {
+    'o3_1h': ('o3_1h', Truncation(decimals=2), get_aqi_o3_1h, False, AU_O3_1H_TABLE, AU_AQI_MESSAGES),
+    'o3_4h': ('o3_4h', Truncation(decimals=2), get_aqi_o3_4h, False, AU_O3_4H_TABLE, AU_AQI_MESSAGES),
+    'co_8h': ('co_8h', Truncation(decimals=1), get_aqi_co_8h, False, AU_CO_8H_TABLE, AU_AQI_MESSAGES),
+    'no2_1h': ('no2_1h', Truncation(decimals=2), get_aqi_no2_1h, False, AU_NO2_1H_TABLE, AU_AQI_MESSAGES),
+    'so2_24h': ('so2_24h', Truncation(decimals=2), get_aqi_so2_24h, False, AU_SO2_24H_TABLE, AU_AQI_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(), get_aqi_pm25_24h, False, AU_PM25_24H_TABLE, AU_AQI_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(), get_aqi_pm10_24h, False, AU_PM10_24H_TABLE, AU_AQI_MESSAGES),
+}
 
 
 def get_aqi(o3_1h: float = None, o3_4h: float = None, co_8h: float = None, no2_1h: float = None, so2_24h: float = None,
-            pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False) -> (int, {}):
+            pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False,
+            with_codes: bool = False) -> (int, {}):
     """
     Calculates AU AQI (Maximum from individual indexes)
 
@@ -134,28 +149,33 @@ def get_aqi(o3_1h: float = None, o3_4h: float = None, co_8h: float = None, no2_1
     :param pm25_24h: PM2.5 average (24h), μg/m3
     :param pm10_24h: PM10 average (24h), μg/m3
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: AU AQI, dict with tuples (Individual aqi, General message, Risk message)
              keys are: o3_1h, o3_4h, co_8h, no2_1h, so2_24h, pm25_24h, pm10_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if o3_1h:
-        aqi_data['o3_1h'] = get_aqi_o3_1h(o3_1h)
-    if o3_4h:
-        aqi_data['o3_4h'] = get_aqi_o3_4h(o3_4h)
-    if co_8h:
-        aqi_data['co_8h'] = get_aqi_co_8h(co_8h)
-    if no2_1h:
-        aqi_data['no2_1h'] = get_aqi_no2_1h(no2_1h)
-    if so2_24h:
-        aqi_data['so2_24h'] = get_aqi_so2_24h(so2_24h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_aqi_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_aqi_pm10_24h(pm10_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, AU_AQI, AU_AQI_LEVELS)}
+    return __get_max_index(AU_AQI_INPUTS, (o3_1h, o3_4h, co_8h, no2_1h, so2_24h, pm25_24h, pm10_24h),
+                           AU_AQI, AU_AQI_LEVELS, with_level, with_codes)
+
+
+def get_category(o3_1h: float = None, o3_4h: float = None, co_8h: float = None, no2_1h: float = None,
+                 so2_24h: float = None, pm25_24h: float = None, pm10_24h: float = None) -> int:
+    """
+    Finds level of AU AQI without calculating individual indexes and messages
+
+    Same as the level of get_aqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param o3_1h: O3 average (1h), ppm
+    :param o3_4h: O3 average (4h), ppm
+    :param co_8h: CO average (8h), ppm
+    :param no2_1h: NO2 average (1h), ppm
+    :param so2_24h: SO2 average (24h), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :return: level index in AU_AQI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(AU_AQI_INPUTS, AU_AQI, (('o3_1h', o3_1h), ('o3_4h', o3_4h), ('co_8h', co_8h),
+                                                  ('no2_1h', no2_1h), ('so2_24h', so2_24h), ('pm25_24h', pm25_24h),
+                                                  ('pm10_24h', pm10_24h)))
@@ -5,7 +5,8 @@
     Source: https://core.ac.uk/download/pdf/38094372.pdf
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula_texts, __get_aqi_level
+from aqipy.utils import Truncation, __round_down, BreakpointTable, __get_table_sub_index, __get_max_index, \
+    __get_category
 
 CN_AQI = ((0, 50), (51, 100), (101, 150), (151, 200), (201, 299), (300, 300))
 CN_AQI_LEVELS = (
@@ -34,6 +35,16 @@ CN_O3_8H = ((0, 50), (51, 80), (81, 107), (108, 132), (133, 400))
 CN_PM25_24H = ((0, 50), (51, 150), (151, 250), (251, 350), (351, 420), (421, 600))
 CN_PM10_24H = ((0, 35), (36, 75), (76, 115), (116, 150), (151, 250), (251, 500))
 
+CN_AQI_MESSAGES = (CN_AQI_EFFECTS, CN_AQI_CAUTIONS)
+
+CN_O3_1H_TABLE = BreakpointTable(CN_O3_1H, CN_AQI, decimals=0)
+CN_O3_8H_TABLE = BreakpointTable(CN_O3_8H, CN_AQI, decimals=0)
+CN_CO_24H_TABLE = BreakpointTable(CN_CO_24H, CN_AQI, decimals=1)
+CN_PM25_24H_TABLE = BreakpointTable(CN_PM25_24H, CN_AQI, decimals=1)
+CN_PM10_24H_TABLE = BreakpointTable(CN_PM10_24H, CN_AQI, decimals=0)
+CN_SO2_24H_TABLE = BreakpointTable(CN_SO2_24H, CN_AQI, decimals=0)
+CN_NO2_24H_TABLE = BreakpointTable(CN_NO2_24H, CN_AQI, decimals=0)
+
 
 def get_aqi_o3_1h(o3_1h: float) -> (int, str, str):
     """
@@ -43,7 +54,7 @@ def get_aqi_o3_1h(o3_1h: float) -> (int, str, str):
     :return: O3 CN AQI, Effect message, Caution message
     """
     cp = __round_down(o3_1h * 1000)
-    return __get_aqi_general_formula_texts(cp, CN_O3_1H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_O3_1H_TABLE, CN_AQI_MESSAGES)
 
 
 def get_aqi_o3_8h(o3_8h: float) -> (int, str, str):
@@ -54,7 +65,7 @@ def get_aqi_o3_8h(o3_8h: float) -> (int, str, str):
     :return: O3 CN AQI, Effect message, Caution message
     """
     cp = __round_down(o3_8h * 1000)
-    return __get_aqi_general_formula_texts(cp, CN_O3_8H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_O3_8H_TABLE, CN_AQI_MESSAGES)
 
 
 def get_aqi_co_24h(co_24h: float) -> (int, str, str):
@@ -65,7 +76,7 @@ def get_aqi_co_24h(co_24h: float) -> (int, str, str):
     :return: CO CN AQI, Effect message, Caution message
     """
     cp = __round_down(co_24h, 1)
-    return __get_aqi_general_formula_texts(cp, CN_CO_24H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_CO_24H_TABLE, CN_AQI_MESSAGES)
 
 
 def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -76,7 +87,7 @@ def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 CN AQI, Effect message, Caution message
     """
     cp = __round_down(pm25_24h, 1)
-    return __get_aqi_general_formula_texts(cp, CN_PM25_24H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_PM25_24H_TABLE, CN_AQI_MESSAGES)
 
 
 def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -87,7 +98,7 @@ def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 CN AQI, Effect message, Caution message
     """
     cp = round(pm10_24h)
-    return __get_aqi_general_formula_texts(cp, CN_PM10_24H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_PM10_24H_TABLE, CN_AQI_MESSAGES)
 
 
 def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
@@ -98,7 +109,7 @@ def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
     :return: SO2 CN AQI, Effect message, Caution message
     """
     cp = round(so2_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, CN_SO2_24H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_SO2_24H_TABLE, CN_AQI_MESSAGES)
 
 
 def get_aqi_no2_24h(no2_24h: float) -> (int, str, str):
@@ -109,11 +120,25 @@ def get_aqi_no2_24h(no2_24h: float) -> (int, str, str):
     :return: NO2 CN AQI, Effect message, Caution message
     """
     cp = round(no2_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, CN_NO2_24H, CN_AQI_EFFECTS, CN_AQI_CAUTIONS, CN_AQI)
+    return __get_table_sub_index(cp, CN_NO2_24H_TABLE, CN_AQI_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+CN_AQI_INPUTS = {
+    'o3_1h': ('o3_1h', Truncation(1000), get_aqi_o3_1h, False, CN_O3_1H_TABLE, CN_AQI_MESSAGES),
+    'o3_8h': ('o3_8h', Truncation(1000), get_aqi_o3_8h, False, CN_O3_8H_TABLE, CN_AQI_MESSAGES),
+    'co_24h': ('co_24h', Truncation(decimals=1), get_aqi_co_24h, False, CN_CO_24H_TABLE, CN_AQI_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(decimals=1), get_aqi_pm25_24h, False, CN_PM25_24H_TABLE, CN_AQI_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(rounding=True), get_aqi_pm10_24h, False, CN_PM10_24H_TABLE, CN_AQI_MESSAGES),
+    'so2_24h': ('so2_24h', Truncation(1000, rounding=True), get_aqi_so2_24h, False, CN_SO2_24H_TABLE, CN_AQI_MESSAGES),
+    'no2_24h': ('no2_24h', Truncation(1000, rounding=True), get_aqi_no2_24h, False, CN_NO2_24H_TABLE, CN_AQI_MESSAGES),
+}
 
 
 def get_aqi(o3_1h: float = None, o3_8h: float = None, co_24h: float = None, pm25_24h: float = None,
-            pm10_24h: float = None, so2_24h: float = None, no2_24h: float = None, with_level: bool = False) -> (
+            pm10_24h: float = None, so2_24h: float = None, no2_24h: float = None, with_level: bool = False,
+            with_codes: bool = False) -> (
 int, {}):
     """
     Calculates CN AQI (Maximum from individual indexes)
@@ -126,28 +151,33 @@ int, {}):
     :param so2_24h: SO2 average (24h), ppm
     :param no2_24h: NO2 average (24h), ppm
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: CN AQI, dict with tuples (Individual aqi, Effect message, Caution message)
              keys are: o3_1h, o3_8h, co_24h, pm25_24h, pm10_24h, so2_24h, no2_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if o3_1h:
-        aqi_data['o3_1h'] = get_aqi_o3_1h(o3_1h)
-    if o3_8h:
-        aqi_data['o3_8h'] = get_aqi_o3_8h(o3_8h)
-    if co_24h:
-        aqi_data['co_24h'] = get_aqi_co_24h(co_24h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_aqi_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_aqi_pm10_24h(pm10_24h)
-    if so2_24h:
-        aqi_data['so2_24h'] = get_aqi_so2_24h(so2_24h)
-    if no2_24h:
-        aqi_data['no2_24h'] = get_aqi_no2_24h(no2_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, CN_AQI, CN_AQI_LEVELS)}
+    return __get_max_index(CN_AQI_INPUTS, (o3_1h, o3_8h, co_24h, pm25_24h, pm10_24h, so2_24h, no2_24h),
+                           CN_AQI, CN_AQI_LEVELS, with_level, with_codes)
+
+
+def get_category(o3_1h: float = None, o3_8h: float = None, co_24h: float = None, pm25_24h: float = None,
+                 pm10_24h: float = None, so2_24h: float = None, no2_24h: float = None) -> int:
+    """
+    Finds level of CN AQI without calculating individual indexes and messages
+
+    Same as the level of get_aqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param o3_1h: O3 average (1h), ppm
+    :param o3_8h: O3 average (8h), ppm
+    :param co_24h: CO average (24h), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :param so2_24h: SO2 average (24h), ppm
+    :param no2_24h: NO2 average (24h), ppm
+    :return: level index in CN_AQI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(CN_AQI_INPUTS, CN_AQI, (('o3_1h', o3_1h), ('o3_8h', o3_8h), ('co_24h', co_24h),
+                                                  ('pm25_24h', pm25_24h), ('pm10_24h', pm10_24h), ('so2_24h', so2_24h),
+                                                  ('no2_24h', no2_24h)))
@@ -5,7 +5,8 @@
     Source: http://www.indiaenvironmentportal.org.in/files/file/Air%20Quality%20Index.pdf
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula_texts, __get_aqi_level
+from aqipy.utils import Truncation, __round_down, BreakpointTable, __get_table_sub_index, __get_max_index, \
+    __get_category
 
 IN_AQI = ((0, 50), (51, 100), (101, 250), (251, 350), (351, 400), (401, 500))
 IN_AQI_LEVELS = ('good', 'satisfactory', 'moderately polluted', 'poor', 'very poor', 'severe')
@@ -27,6 +28,17 @@ IN_SO2_24H = ((0, 15), (16, 30), (31, 144), (145, 305), (306, 610), (611, 611))
 IN_NH3_24H = ((0, 287), (288, 574), (575, 1148), (1149, 1721), (1722, 2581), (2582, 2582))
 IN_PB_24H = ((0.000, 0.058), (0.059, 0.129), (0.130, 0.247), (0.248, 0.365), (0.366, 0.412), (0.413, 0.413))
 
+IN_AQI_MESSAGES = (IN_AQI_EFFECTS, IN_AQI_EFFECTS)
+
+IN_O3_8H_TABLE = BreakpointTable(IN_O3_8H, IN_AQI, decimals=0)
+IN_CO_8H_TABLE = BreakpointTable(IN_CO_8H, IN_AQI, decimals=1)
+IN_NO2_24H_TABLE = BreakpointTable(IN_NO2_24H, IN_AQI, decimals=0)
+IN_SO2_24H_TABLE = BreakpointTable(IN_SO2_24H, IN_AQI, decimals=0)
+IN_NH3_24H_TABLE = BreakpointTable(IN_NH3_24H, IN_AQI, decimals=0)
+IN_PB_24H_TABLE = BreakpointTable(IN_PB_24H, IN_AQI, decimals=3)
+IN_PM25_24H_TABLE = BreakpointTable(IN_PM25_24H, IN_AQI, decimals=0)
+IN_PM10_24H_TABLE = BreakpointTable(IN_PM10_24H, IN_AQI, decimals=0)
+
 
 def get_aqi_o3_8h(o3_8h: float) -> (int, str, str):
     """
@@ -36,7 +48,7 @@ def get_aqi_o3_8h(o3_8h: float) -> (int, str, str):
     :return: O3 India AQI, Effect message, Caution message
     """
     cp = __round_down(o3_8h * 1000)
-    return __get_aqi_general_formula_texts(cp, IN_O3_8H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_O3_8H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_co_8h(co_8h: float) -> (int, str, str):
@@ -47,7 +59,7 @@ def get_aqi_co_8h(co_8h: float) -> (int, str, str):
     :return: CO India AQI, Effect message, Caution message
     """
     cp = __round_down(co_8h, 1)
-    return __get_aqi_general_formula_texts(cp, IN_CO_8H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_CO_8H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_no2_24h(no2_24h: float) -> (int, str, str):
@@ -58,7 +70,7 @@ def get_aqi_no2_24h(no2_24h: float) -> (int, str, str):
     :return: NO2 India AQI, Effect message, Caution message
     """
     cp = __round_down(no2_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, IN_NO2_24H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_NO2_24H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
@@ -69,7 +81,7 @@ def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
     :return: SO2 India AQI, Effect message, Caution message
     """
     cp = __round_down(so2_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, IN_SO2_24H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_SO2_24H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_nh3_24h(nh3_24h: float) -> (int, str, str):
@@ -80,7 +92,7 @@ def get_aqi_nh3_24h(nh3_24h: float) -> (int, str, str):
     :return: NH3 India AQI, Effect message, Caution message
     """
     cp = __round_down(nh3_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, IN_NH3_24H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_NH3_24H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_pb_24h(pb_24h: float) -> (int, str, str):
@@ -91,7 +103,7 @@ def get_aqi_pb_24h(pb_24h: float) -> (int, str, str):
     :return: Pb India AQI, Effect message, Caution message
     """
     cp = __round_down(pb_24h * 1000, 3)
-    return __get_aqi_general_formula_texts(cp, IN_PB_24H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_PB_24H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -102,7 +114,7 @@ def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 India AQI, Effect message, Caution message
     """
     cp = __round_down(pm25_24h)
-    return __get_aqi_general_formula_texts(cp, IN_PM25_24H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_PM25_24H_TABLE, IN_AQI_MESSAGES)
 
 
 def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -113,12 +125,27 @@ def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 India AQI, Effect message, Caution message
     """
     cp = __round_down(pm10_24h)
-    return __get_aqi_general_formula_texts(cp, IN_PM10_24H, IN_AQI_EFFECTS, IN_AQI_EFFECTS, IN_AQI)
+    return __get_table_sub_index(cp, IN_PM10_24H_TABLE, IN_AQI_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+IN_AQI_INPUTS = {
+    'o3_8h': ('o3_8h', Truncation(1000), get_aqi_o3_8h, False, IN_O3_8H_TABLE, IN_AQI_MESSAGES),
+    'co_8h': ('co_8h', Truncation(decimals=1), get_aqi_co_8h, False, IN_CO_8H_TABLE, IN_AQI_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(), get_aqi_pm25_24h, False, IN_PM25_24H_TABLE, IN_AQI_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(), get_aqi_pm10_24h, False, IN_PM10_24H_TABLE, IN_AQI_MESSAGES),
+    'so2_24h': ('so2_24h', Truncation(1000), get_aqi_so2_24h, False, IN_SO2_24H_TABLE, IN_AQI_MESSAGES),
+    'no2_24h': ('no2_24h', Truncation(1000), get_aqi_no2_24h, False, IN_NO2_24H_TABLE, IN_AQI_MESSAGES),
+    'nh3_24h': ('nh3_24h', Truncation(1000), get_aqi_nh3_24h, False, IN_NH3_24H_TABLE, IN_AQI_MESSAGES),
+    'pb_24h': ('pb_24h', Truncation(1000, decimals=3), get_aqi_pb_24h, False, IN_PB_24H_TABLE, IN_AQI_MESSAGES),
+}
 
 
 def get_aqi(o3_8h: float = None, co_8h: float = None, pm25_24h: float = None,
             pm10_24h: float = None, so2_24h: float = None, no2_24h: float = None,
-            nh3_24h: float = None, pb_24h: float = None, with_level: bool = False) -> (int, {}):
+            nh3_24h: float = None, pb_24h: float = None, with_level: bool = False,
+            with_codes: bool = False) -> (int, {}):
     """
     Calculates India AQI (Maximum from individual indexes)
 
@@ -131,30 +158,34 @@ def get_aqi(o3_8h: float = None, co_8h: float = None, pm25_24h: float = None,
     :param nh3_24h: HN3 average (24h), ppm
     :param pb_24h: Pb average (24h), ppm
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: India AQI, dict with tuples (Individual aqi, Effect message, Caution message)
              keys are: o3_8h, co_8h, pm25_24h, pm10_24h, so2_24h, no2_24h, nh3_24h, pb_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if o3_8h:
-        aqi_data['o3_8h'] = get_aqi_o3_8h(o3_8h)
-    if co_8h:
-        aqi_data['co_8h'] = get_aqi_co_8h(co_8h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_aqi_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_aqi_pm10_24h(pm10_24h)
-    if so2_24h:
-        aqi_data['so2_24h'] = get_aqi_so2_24h(so2_24h)
-    if no2_24h:
-        aqi_data['no2_24h'] = get_aqi_no2_24h(no2_24h)
-    if nh3_24h:
-        aqi_data['nh3_24h'] = get_aqi_nh3_24h(nh3_24h)
-    if pb_24h:
-        aqi_data['pb_24h'] = get_aqi_pb_24h(pb_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, IN_AQI, IN_AQI_LEVELS)}
+    return __get_max_index(IN_AQI_INPUTS, (o3_8h, co_8h, pm25_24h, pm10_24h, so2_24h, no2_24h, nh3_24h, pb_24h),
+                           IN_AQI, IN_AQI_LEVELS, with_level, with_codes)
+
+
+def get_category(o3_8h: float = None, co_8h: float = None, pm25_24h: float = None, pm10_24h: float = None,
+                 so2_24h: float = None, no2_24h: float = None, nh3_24h: float = None, pb_24h: float = None) -> int:
+    """
+    Finds level of India AQI without calculating individual indexes and messages
+
+    Same as the level of get_aqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param o3_8h: O3 average (8h), ppm
+    :param co_8h: CO average (8h), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :param so2_24h: SO2 average (24h), ppm
+    :param no2_24h: NO2 average (24h), ppm
+    :param nh3_24h: HN3 average (24h), ppm
+    :param pb_24h: Pb average (24h), ppm
+    :return: level index in IN_AQI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(IN_AQI_INPUTS, IN_AQI, (('o3_8h', o3_8h), ('co_8h', co_8h), ('pm25_24h', pm25_24h),
+                                                  ('pm10_24h', pm10_24h), ('so2_24h', so2_24h), ('no2_24h', no2_24h),
+                                                  ('nh3_24h', nh3_24h), ('pb_24h', pb_24h)))
@@ -5,10 +5,18 @@
     Source: https://www.airnow.gov/sites/default/files/2018-05/aqi-technical-assistance-document-may2016.pdf
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula_texts, __get_aqi_level
+from collections import deque
+
+from aqipy.utils import AQI_NOT_AVAILABLE, Truncation, __round_down, BreakpointTable, __get_table_sub_index, __get_max_index, \
+    __round_down_array, __round_array, __is_defined_array, __get_table_array, __get_weighted_average_array, \
+    __get_max_index_batch, __get_category
 
 US_AQI = ((0, 50), (51, 100), (101, 150), (151, 200), (201, 300), (301, 500))
 US_AQI_LEVELS = ('good', 'moderate', 'unhealthy sensitive', 'unhealthy', 'very unhealthy', 'hazardous')
+US_AQI_POLLUTANTS = ('co_8h', 'o3_1h', 'o3_8h', 'no2_1h', 'pm25_24h', 'pm10_24h', 'so2_1h', 'so2_24h')
+# NowCast hours and minimal weight factor
+US_NOWCAST_PM = (12, 0.5)
+US_NOWCAST_O3 = (8, 0.0)
 US_OZONE_8H = ((0, 0.054), (0.055, 0.070), (0.071, 0.085), (0.086, 0.105), (0.106, 0.200))
 US_OZONE_1H = ((0, 0), (0, 0), (0.125, 0.164), (0.165, 0.204), (0.205, 0.404), (0.405, 0.604))
 US_OZONE_EFFECTS = (
@@ -98,6 +106,23 @@ US_NO2_CAUTIONS = (
     "People with asthma, children and older adults should remain indoors; everyone else should avoid all outdoor exertion."
 )
 
+US_OZONE_MESSAGES = (US_OZONE_EFFECTS, US_OZONE_CAUTIONS)
+US_CO_MESSAGES = (US_CO_EFFECTS, US_CO_CAUTIONS)
+US_PM_MESSAGES = (US_PM_EFFECTS, US_PM_CAUTIONS)
+US_SO2_MESSAGES = (US_SO2_EFFECTS, US_SO2_CAUTIONS)
+US_NO2_MESSAGES = (US_NO2_EFFECTS, US_NO2_CAUTIONS)
+
+US_OZONE_1H_TABLE = BreakpointTable(US_OZONE_1H, US_AQI, decimals=3)
+# 8-hour O3 values do not define higher AQI values (≥ 301)
+US_OZONE_8H_TABLE = BreakpointTable(US_OZONE_8H, US_AQI, 300, decimals=3)
+US_CO_8H_TABLE = BreakpointTable(US_CO_8H, US_AQI, decimals=1)
+US_PM25_24H_TABLE = BreakpointTable(US_PM25_24H, US_AQI, decimals=1)
+US_PM10_24H_TABLE = BreakpointTable(US_PM10_24H, US_AQI, decimals=0)
+# 1-hour SO2 values do not define higher AQI values (≥ 200)
+US_SO2_1H_TABLE = BreakpointTable(US_SO2_1H, US_AQI, 200, decimals=0)
+US_SO2_24H_TABLE = BreakpointTable(US_SO2_24H, US_AQI, decimals=0)
+US_NO2_1H_TABLE = BreakpointTable(US_NO2_1H, US_AQI, decimals=0)
+
 
 def get_aqi_o3_1h(o3_1h: float) -> (int, str, str):
     """
@@ -107,7 +132,7 @@ def get_aqi_o3_1h(o3_1h: float) -> (int, str, str):
     :return: O3 US AQI, Effect message, Caution message
     """
     cp = __round_down(o3_1h, 3)
-    return __get_aqi_general_formula_texts(cp, US_OZONE_1H, US_OZONE_EFFECTS, US_OZONE_CAUTIONS, US_AQI)
+    return __get_table_sub_index(cp, US_OZONE_1H_TABLE, US_OZONE_MESSAGES)
 
 
 def get_aqi_o3_8h(o3_8h: float) -> (int, str, str):
@@ -118,8 +143,7 @@ def get_aqi_o3_8h(o3_8h: float) -> (int, str, str):
     :return: O3 US AQI, Effect message, Caution message
     """
     cp = __round_down(o3_8h, 3)
-    # 8-hour O3 values do not define higher AQI values (≥ 301)
-    return __get_aqi_general_formula_texts(cp, US_OZONE_8H, US_OZONE_EFFECTS, US_OZONE_CAUTIONS, US_AQI, 300)
+    return __get_table_sub_index(cp, US_OZONE_8H_TABLE, US_OZONE_MESSAGES)
 
 
 def get_aqi_co_8h(co_8h: float) -> (int, str, str):
@@ -130,7 +154,7 @@ def get_aqi_co_8h(co_8h: float) -> (int, str, str):
     :return: CO US AQI, Effect message, Caution message
     """
     cp = __round_down(co_8h, 1)
-    return __get_aqi_general_formula_texts(cp, US_CO_8H, US_CO_EFFECTS, US_CO_CAUTIONS, US_AQI)
+    return __get_table_sub_index(cp, US_CO_8H_TABLE, US_CO_MESSAGES)
 
 
 def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -141,7 +165,7 @@ def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 US AQI, Effect message, Caution message
     """
     cp = __round_down(pm25_24h, 1)
-    return __get_aqi_general_formula_texts(cp, US_PM25_24H, US_PM_EFFECTS, US_PM_CAUTIONS, US_AQI)
+    return __get_table_sub_index(cp, US_PM25_24H_TABLE, US_PM_MESSAGES)
 
 
 def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -152,7 +176,7 @@ def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 US AQI, Effect message, Caution message
     """
     cp = round(pm10_24h)
-    return __get_aqi_general_formula_texts(cp, US_PM10_24H, US_PM_EFFECTS, US_PM_CAUTIONS, US_AQI)
+    return __get_table_sub_index(cp, US_PM10_24H_TABLE, US_PM_MESSAGES)
 
 
 def get_aqi_so2_1h(so2_1h: float) -> (int, str, str):
@@ -163,8 +187,7 @@ def get_aqi_so2_1h(so2_1h: float) -> (int, str, str):
     :return: SO2 US AQI, Effect message, Caution message
     """
     cp = round(so2_1h * 1000)
-    # 1-hour SO2 values do not define higher AQI values (≥ 200)
-    return __get_aqi_general_formula_texts(cp, US_SO2_1H, US_SO2_EFFECTS, US_SO2_CAUTIONS, US_AQI, 200)
+    return __get_table_sub_index(cp, US_SO2_1H_TABLE, US_SO2_MESSAGES)
 
 
 def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
@@ -175,7 +198,7 @@ def get_aqi_so2_24h(so2_24h: float) -> (int, str, str):
     :return: SO2 US AQI, Effect message, Caution message
     """
     cp = round(so2_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, US_SO2_24H, US_SO2_EFFECTS, US_SO2_CAUTIONS, US_AQI)
+    return __get_table_sub_index(cp, US_SO2_24H_TABLE, US_SO2_MESSAGES)
 
 
 def get_aqi_no2_1h(no2_1h: float) -> (int, str, str):
@@ -186,11 +209,26 @@ def get_aqi_no2_1h(no2_1h: float) -> (int, str, str):
     :return: NO2 US AQI, Effect message, Caution message
     """
     cp = round(no2_1h * 1000)
-    return __get_aqi_general_formula_texts(cp, US_NO2_1H, US_NO2_EFFECTS, US_NO2_CAUTIONS, US_AQI)
+    return __get_table_sub_index(cp, US_NO2_1H_TABLE, US_NO2_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+US_AQI_INPUTS = {
+    'co_8h': ('co_8h', Truncation(decimals=1), get_aqi_co_8h, False, US_CO_8H_TABLE, US_CO_MESSAGES),
+    'o3_1h': ('o3_1h', Truncation(decimals=3), get_aqi_o3_1h, True, US_OZONE_1H_TABLE, US_OZONE_MESSAGES),
+    'o3_8h': ('o3_8h', Truncation(decimals=3), get_aqi_o3_8h, False, US_OZONE_8H_TABLE, US_OZONE_MESSAGES),
+    'no2_1h': ('no2_1h', Truncation(1000, rounding=True), get_aqi_no2_1h, False, US_NO2_1H_TABLE, US_NO2_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(decimals=1), get_aqi_pm25_24h, False, US_PM25_24H_TABLE, US_PM_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(rounding=True), get_aqi_pm10_24h, False, US_PM10_24H_TABLE, US_PM_MESSAGES),
+    'so2_1h': ('so2_1h', Truncation(1000, rounding=True), get_aqi_so2_1h, False, US_SO2_1H_TABLE, US_SO2_MESSAGES),
+    'so2_24h': ('so2_24h', Truncation(1000, rounding=True), get_aqi_so2_24h, False, US_SO2_24H_TABLE, US_SO2_MESSAGES),
+}
 
 
 def get_aqi(co_8h: float = None, o3_1h: float = None, o3_8h: float = None, no2_1h: float = None, pm25_24h: float = None,
-            pm10_24h: float = None, so2_1h: float = None, so2_24h: float = None, with_level: bool = False) -> (int, {}):
+            pm10_24h: float = None, so2_1h: float = None, so2_24h: float = None, with_level: bool = False,
+            with_codes: bool = False) -> (int, {}):
     """
     Calculates US AQI (Maximum from individual indexes)
 
@@ -203,30 +241,156 @@ def get_aqi(co_8h: float = None, o3_1h: float = None, o3_8h: float = None, no2_1
     :param so2_1h: SO2 average (1h), ppm
     :param so2_24h: SO2 average (24h), ppm
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: US AQI, dict with tuples (Individual aqi, Effect message, Caution message)
             keys are: co_8h, o3_1h, o3_8h, no2_1h, pm25_24h, pm10_24h, so2_1h, so2_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if co_8h:
-        aqi_data['co_8h'] = get_aqi_co_8h(co_8h)
-    if o3_1h and bool(__round_down(o3_1h, 3)):
-        aqi_data['o3_1h'] = get_aqi_o3_1h(o3_1h)
-    if o3_8h:
-        aqi_data['o3_8h'] = get_aqi_o3_8h(o3_8h)
-    if no2_1h:
-        aqi_data['no2_1h'] = get_aqi_no2_1h(no2_1h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_aqi_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_aqi_pm10_24h(pm10_24h)
-    if so2_1h:
-        aqi_data['so2_1h'] = get_aqi_so2_1h(so2_1h)
-    if so2_24h:
-        aqi_data['so2_24h'] = get_aqi_so2_24h(so2_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, US_AQI, US_AQI_LEVELS)}
+    return __get_max_index(US_AQI_INPUTS, (co_8h, o3_1h, o3_8h, no2_1h, pm25_24h, pm10_24h, so2_1h, so2_24h),
+                           US_AQI, US_AQI_LEVELS, with_level, with_codes)
+
+
+def get_category(co_8h: float = None, o3_1h: float = None, o3_8h: float = None, no2_1h: float = None,
+                 pm25_24h: float = None, pm10_24h: float = None, so2_1h: float = None, so2_24h: float = None) -> int:
+    """
+    Finds level of US AQI without calculating individual indexes and messages
+
+    Same as the level of get_aqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param co_8h: CO average (8h), ppm
+    :param o3_1h: O3 average (1h), ppm
+    :param o3_8h: O3 average (8h), ppm
+    :param no2_1h: NO2 average (1h), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :param so2_1h: SO2 average (1h), ppm
+    :param so2_24h: SO2 average (24h), ppm
+    :return: level index in US_AQI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(US_AQI_INPUTS, US_AQI, (('co_8h', co_8h), ('o3_1h', o3_1h), ('o3_8h', o3_8h),
+                                                  ('no2_1h', no2_1h), ('pm25_24h', pm25_24h), ('pm10_24h', pm10_24h),
+                                                  ('so2_1h', so2_1h), ('so2_24h', so2_24h)))
+
+
+def get_aqi_batch(co_8h=None, o3_1h=None, o3_8h=None, no2_1h=None, pm25_24h=None, pm10_24h=None, so2_1h=None,
+                  so2_24h=None) -> ('np.ndarray', {}, 'np.ndarray'):
+    """
+    Calculates US AQI for arrays of readings (requires numpy)
+
+    Inputs are broadcast against each other, zero or NaN values are treated as missing readings.
+
+    :param co_8h: CO averages (8h), ppm
+    :param o3_1h: O3 averages (1h), ppm
+    :param o3_8h: O3 averages (8h), ppm
+    :param no2_1h: NO2 averages (1h), ppm
+    :param pm25_24h: PM2.5 averages (24h), μg/m3
+    :param pm10_24h: PM10 averages (24h), μg/m3
+    :param so2_1h: SO2 averages (1h), ppm
+    :param so2_24h: SO2 averages (24h), ppm
+    :return: US AQI array, dict with individual aqi arrays, array of dominant pollutants (index in US_AQI_POLLUTANTS)
+             keys are: co_8h, o3_1h, o3_8h, no2_1h, pm25_24h, pm10_24h, so2_1h, so2_24h
+             -1 means AQI is not available
+    """
+    return __get_max_index_batch(US_AQI_INPUTS, (co_8h, o3_1h, o3_8h, no2_1h, pm25_24h, pm10_24h, so2_1h, so2_24h),
+                                 US_AQI_POLLUTANTS)
+
+
+class NowCast:
+    """
+    Incremental NowCast of one pollutant for one station
+
+    Every pushed hourly average updates running minimum and maximum of the window, the weighted average is
+    computed over a fixed number of hours. NowCast is not available unless 2 of the 3 most recent hours are valid.
+    """
+    __slots__ = ('pollutant', 'hours', 'min_weight', 'concentration', '_values', '_hour', '_mins', '_maxs')
+
+    def __init__(self, pollutant: str):
+        """
+        :param pollutant: pollutant name: pm25, pm10 or o3
+        """
+        if pollutant not in ('pm25', 'pm10', 'o3'):
+            raise ValueError("NowCast is defined for pm25, pm10 and o3")
+        self.pollutant = pollutant
+        self.hours, self.min_weight = US_NOWCAST_O3 if pollutant == 'o3' else US_NOWCAST_PM
+        self.concentration = None
+        self._values = deque(maxlen=self.hours)
+        self._hour = 0
+        self._mins = deque()
+        self._maxs = deque()
+
+    def push(self, value: float) -> float:
+        """
+        Adds hourly average
+
+        :param value: hourly average, μg/m3 for PM, ppm for O3, None for missing hour
+        :return: NowCast concentration, None if not available
+        """
+        self._hour += 1
+        self._values.append(value)
+        first = self._hour - self.hours
+        for extremes in (self._mins, self._maxs):
+            while extremes and extremes[0][0] <= first:
+                extremes.popleft()
+        if value is not None:
+            while self._mins and self._mins[-1][1] >= value:
+                self._mins.pop()
+            self._mins.append((self._hour, value))
+            while self._maxs and self._maxs[-1][1] <= value:
+                self._maxs.pop()
+            self._maxs.append((self._hour, value))
+        recent = list(self._values)[-3:]
+        if sum(1 for v in recent if v is not None) < 2:
+            self.concentration = None
+            return None
+        c_min = self._mins[0][1]
+        c_max = self._maxs[0][1]
+        weight = 1.0 if c_max == 0 else c_min / c_max
+        weight = min(max(weight, self.min_weight), 1.0)
+        numerator = 0.0
+        denominator = 0.0
+        factor = 1.0
+        for v in reversed(self._values):
+            if v is not None:
+                numerator += factor * v
+                denominator += factor
+            factor = factor * weight
+        self.concentration = numerator / denominator if denominator else None
+        return self.concentration
+
+    def get_aqi(self) -> (int, str, str):
+        """
+        Calculates US AQI of the current NowCast concentration
+
+        :return: US AQI, Effect message, Caution message, -1 means AQI is not available
+        """
+        if self.concentration is None:
+            return AQI_NOT_AVAILABLE, "", ""
+        if self.pollutant == 'pm25':
+            return get_aqi_pm25_24h(self.concentration)
+        if self.pollutant == 'pm10':
+            return get_aqi_pm10_24h(self.concentration)
+        return get_aqi_o3_8h(self.concentration)
+
+
+def get_nowcast_batch(values, pollutant: str) -> ('np.ndarray', 'np.ndarray'):
+    """
+    Calculates NowCast for a matrix of hourly averages (requires numpy)
+
+    :param values: hourly averages, stations x hours, ordered in time along hours, NaN for missing hours
+    :param pollutant: pollutant name: pm25, pm10 or o3
+    :return: NowCast concentrations and US AQI at every hour, NaN and -1 mean NowCast is not available
+    """
+    if pollutant not in ('pm25', 'pm10', 'o3'):
+        raise ValueError("NowCast is defined for pm25, pm10 and o3")
+    hours, min_weight = US_NOWCAST_O3 if pollutant == 'o3' else US_NOWCAST_PM
+    nowcast = __get_weighted_average_array(values, hours, min_weight)
+    available = __is_defined_array(nowcast)
+    if pollutant == 'pm25':
+        aqi = __get_table_array(__round_down_array(nowcast, 1), US_PM25_24H_TABLE, available)
+    elif pollutant == 'pm10':
+        aqi = __get_table_array(__round_array(nowcast), US_PM10_24H_TABLE, available)
+    else:
+        aqi = __get_table_array(__round_down_array(nowcast, 3), US_OZONE_8H_TABLE, available)
+    return nowcast, aqi
@@ -5,7 +5,8 @@
     Source: http://www.airkorea.or.kr/eng/khaiInfo?pMENU_NO=166
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula_texts, __get_aqi_level
+from aqipy.utils import Truncation, __round_down, BreakpointTable, __get_table_sub_index, __get_max_index, \
+    __get_category
 
 KR_CAI = ((0, 50), (51, 100), (101, 250), (251, 500))
 KR_CAI_LEVELS = ('good', 'moderate', 'unhealthy', 'very unhealthy')
@@ -23,6 +24,15 @@ KR_AQI_GENERAL = (
     "A level which may need to take emergency measures for patients and members of sensitive groups and have harmful impacts on the general public"
 )
 
+KR_AQI_MESSAGES = (KR_AQI_GENERAL, KR_AQI_GENERAL)
+
+KR_O3_1H_TABLE = BreakpointTable(KR_O3_1H, KR_CAI, decimals=3)
+KR_CO_1H_TABLE = BreakpointTable(KR_CO_1H, KR_CAI, decimals=2)
+KR_SO2_1H_TABLE = BreakpointTable(KR_SO2_1H, KR_CAI, decimals=3)
+KR_NO2_1H_TABLE = BreakpointTable(KR_NO2_1H, KR_CAI, decimals=3)
+KR_PM25_24H_TABLE = BreakpointTable(KR_PM25_24H, KR_CAI, decimals=0)
+KR_PM10_24H_TABLE = BreakpointTable(KR_PM10_24H, KR_CAI, decimals=0)
+
 
 def get_cai_o3_1h(o3_1h: float) -> (int, str, str):
     """
@@ -32,7 +42,7 @@ def get_cai_o3_1h(o3_1h: float) -> (int, str, str):
     :return: O3 South Korea CAI, General message, Risk message
     """
     cp = __round_down(o3_1h, 3)
-    return __get_aqi_general_formula_texts(cp, KR_O3_1H, KR_AQI_GENERAL, KR_AQI_GENERAL, KR_CAI)
+    return __get_table_sub_index(cp, KR_O3_1H_TABLE, KR_AQI_MESSAGES)
 
 
 def get_cai_co_1h(co_1h: float) -> (int, str, str):
@@ -43,7 +53,7 @@ def get_cai_co_1h(co_1h: float) -> (int, str, str):
     :return: CO South Korea CAI, General message, Risk message
     """
     cp = __round_down(co_1h, 2)
-    return __get_aqi_general_formula_texts(cp, KR_CO_1H, KR_AQI_GENERAL, KR_AQI_GENERAL, KR_CAI)
+    return __get_table_sub_index(cp, KR_CO_1H_TABLE, KR_AQI_MESSAGES)
 
 
 def get_cai_so2_1h(so2_1h: float) -> (int, str, str):
@@ -54,7 +64,7 @@ def get_cai_so2_1h(so2_1h: float) -> (int, str, str):
     :return: SO2 South Korea CAI, General message, Risk message
     """
     cp = __round_down(so2_1h, 3)
-    return __get_aqi_general_formula_texts(cp, KR_SO2_1H, KR_AQI_GENERAL, KR_AQI_GENERAL, KR_CAI)
+    return __get_table_sub_index(cp, KR_SO2_1H_TABLE, KR_AQI_MESSAGES)
 
 
 def get_cai_no2_1h(no2_1h: float) -> (int, str, str):
@@ -65,7 +75,7 @@ def get_cai_no2_1h(no2_1h: float) -> (int, str, str):
     :return: NO2 South Korea CAI, General message, Risk message
     """
     cp = __round_down(no2_1h, 3)
-    return __get_aqi_general_formula_texts(cp, KR_NO2_1H, KR_AQI_GENERAL, KR_AQI_GENERAL, KR_CAI)
+    return __get_table_sub_index(cp, KR_NO2_1H_TABLE, KR_AQI_MESSAGES)
 
 
 def get_cai_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -76,7 +86,7 @@ def get_cai_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 South Korea CAI, General message, Risk message
     """
     cp = __round_down(pm25_24h)
-    return __get_aqi_general_formula_texts(cp, KR_PM25_24H, KR_AQI_GENERAL, KR_AQI_GENERAL, KR_CAI)
+    return __get_table_sub_index(cp, KR_PM25_24H_TABLE, KR_AQI_MESSAGES)
 
 
 def get_cai_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -87,11 +97,24 @@ def get_cai_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 South Korea CAI, General message, Risk message
     """
     cp = __round_down(pm10_24h)
-    return __get_aqi_general_formula_texts(cp, KR_PM10_24H, KR_AQI_GENERAL, KR_AQI_GENERAL, KR_CAI)
+    return __get_table_sub_index(cp, KR_PM10_24H_TABLE, KR_AQI_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+KR_CAI_INPUTS = {
+    'o3_1h': ('o3_1h', Truncation(decimals=3), get_cai_o3_1h, False, KR_O3_1H_TABLE, KR_AQI_MESSAGES),
+    'co_1h': ('co_1h', Truncation(decimals=2), get_cai_co_1h, False, KR_CO_1H_TABLE, KR_AQI_MESSAGES),
+    'so2_1h': ('so2_1h', Truncation(decimals=3), get_cai_so2_1h, False, KR_SO2_1H_TABLE, KR_AQI_MESSAGES),
+    'no2_1h': ('no2_1h', Truncation(decimals=3), get_cai_no2_1h, False, KR_NO2_1H_TABLE, KR_AQI_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(), get_cai_pm25_24h, False, KR_PM25_24H_TABLE, KR_AQI_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(), get_cai_pm10_24h, False, KR_PM10_24H_TABLE, KR_AQI_MESSAGES),
+}
 
 
 def get_aqi(o3_1h: float = None, co_1h: float = None, so2_1h: float = None, no2_1h: float = None,
-            pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False) -> (int, {}):
+            pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False,
+            with_codes: bool = False) -> (int, {}):
     """
     Calculates South Korea CAI (Maximum from individual indexes)
 
@@ -102,26 +125,31 @@ def get_aqi(o3_1h: float = None, co_1h: float = None, so2_1h: float = None, no2_
     :param pm25_24h: PM2.5 average (24h), μg/m3
     :param pm10_24h: PM10 average (24h), μg/m3
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: South Korea CAI, dict with tuples (Individual aqi, General message, Risk message)
              keys are: o3_1h, co_1h, so2_1h, no2_1h, pm25_24h, pm10_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if o3_1h:
-        aqi_data['o3_1h'] = get_cai_o3_1h(o3_1h)
-    if co_1h:
-        aqi_data['co_1h'] = get_cai_co_1h(co_1h)
-    if so2_1h:
-        aqi_data['so2_1h'] = get_cai_so2_1h(so2_1h)
-    if no2_1h:
-        aqi_data['no2_1h'] = get_cai_no2_1h(no2_1h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_cai_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_cai_pm10_24h(pm10_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, KR_CAI, KR_CAI_LEVELS)}
+    return __get_max_index(KR_CAI_INPUTS, (o3_1h, co_1h, so2_1h, no2_1h, pm25_24h, pm10_24h),
+                           KR_CAI, KR_CAI_LEVELS, with_level, with_codes)
+
+
+def get_category(o3_1h: float = None, co_1h: float = None, so2_1h: float = None, no2_1h: float = None,
+                 pm25_24h: float = None, pm10_24h: float = None) -> int:
+    """
+    Finds level of South Korea CAI without calculating individual indexes and messages
+
+    Same as the level of get_aqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param o3_1h: O3 average (1h), ppm
+    :param co_1h: CO average (1h), ppm
+    :param so2_1h: SO2 average (1h), ppm
+    :param no2_1h: NO2 average (1h), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :return: level index in KR_CAI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(KR_CAI_INPUTS, KR_CAI, (('o3_1h', o3_1h), ('co_1h', co_1h), ('so2_1h', so2_1h),
+                                                  ('no2_1h', no2_1h), ('pm25_24h', pm25_24h), ('pm10_24h', pm10_24h)))
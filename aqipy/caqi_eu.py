@@ -5,7 +5,8 @@
     Source: https://www.airqualitynow.eu/download/CITEAIR-Comparing_Urban_Air_Quality_across_Borders.pdf
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula, __get_aqi_level
+from aqipy.utils import Truncation, BreakpointTable, __round_down, __get_table_sub_index, __get_max_index, \
+    __get_category
 
 EU_CAQI = ((0, 24), (25, 49), (50, 74), (75, 99), (100, 100))
 EU_CAQI_LEVELS = ('very low', 'low', 'medium', 'high', 'very high')
@@ -18,6 +19,15 @@ EU_O3_1H = ((0, 29), (30, 59), (60, 89), (90, 119), (120, 120))
 EU_CO_8H = ((0.0, 4.3), (4.4, 6.5), (6.6, 8.6), (8.7, 17.4), (17.5, 17.5))
 EU_SO2_1H = ((0, 18), (19, 37), (38, 133), (134, 190), (191, 191))
 
+EU_NO2_1H_TABLE = BreakpointTable(EU_NO2_1H, EU_CAQI, decimals=0)
+EU_SO2_1H_TABLE = BreakpointTable(EU_SO2_1H, EU_CAQI, decimals=0)
+EU_O3_1H_TABLE = BreakpointTable(EU_O3_1H, EU_CAQI, decimals=0)
+EU_CO_8H_TABLE = BreakpointTable(EU_CO_8H, EU_CAQI, decimals=1)
+EU_PM25_1H_TABLE = BreakpointTable(EU_PM25_1H, EU_CAQI, decimals=0)
+EU_PM25_24H_TABLE = BreakpointTable(EU_PM25_24H, EU_CAQI, decimals=0)
+EU_PM10_1H_TABLE = BreakpointTable(EU_PM10_1H, EU_CAQI, decimals=0)
+EU_PM10_24H_TABLE = BreakpointTable(EU_PM10_24H, EU_CAQI, decimals=0)
+
 
 def get_caqi_no2_1h(no2_max_1h: float) -> float:
     """
@@ -27,7 +37,7 @@ def get_caqi_no2_1h(no2_max_1h: float) -> float:
     :return: NO2 CAQI Europe
     """
     cp = __round_down(no2_max_1h * 1000)
-    return __get_aqi_general_formula(cp, EU_NO2_1H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_NO2_1H_TABLE, None)
 
 
 def get_caqi_so2_1h(so2_max_1h: float) -> float:
@@ -38,7 +48,7 @@ def get_caqi_so2_1h(so2_max_1h: float) -> float:
     :return: SO2 CAQI Europe
     """
     cp = __round_down(so2_max_1h * 1000)
-    return __get_aqi_general_formula(cp, EU_SO2_1H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_SO2_1H_TABLE, None)
 
 
 def get_caqi_o3_1h(o3_max_1h: float) -> float:
@@ -49,7 +59,7 @@ def get_caqi_o3_1h(o3_max_1h: float) -> float:
     :return: O3 CAQI Europe
     """
     cp = __round_down(o3_max_1h * 1000)
-    return __get_aqi_general_formula(cp, EU_O3_1H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_O3_1H_TABLE, None)
 
 
 def get_caqi_co_1h(co_8h: float) -> float:
@@ -60,7 +70,7 @@ def get_caqi_co_1h(co_8h: float) -> float:
     :return: CO CAQI Europe
     """
     cp = __round_down(co_8h, 1)
-    return __get_aqi_general_formula(cp, EU_CO_8H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_CO_8H_TABLE, None)
 
 
 def get_caqi_pm25_1h(pm25_1h: float) -> float:
@@ -71,7 +81,7 @@ def get_caqi_pm25_1h(pm25_1h: float) -> float:
     :return: PM2.5 CAQI Europe
     """
     cp = __round_down(pm25_1h)
-    return __get_aqi_general_formula(cp, EU_PM25_1H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_PM25_1H_TABLE, None)
 
 
 def get_caqi_pm25_24h(pm25_24h: float) -> float:
@@ -82,7 +92,7 @@ def get_caqi_pm25_24h(pm25_24h: float) -> float:
     :return: PM2.5 CAQI Europe
     """
     cp = __round_down(pm25_24h)
-    return __get_aqi_general_formula(cp, EU_PM25_24H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_PM25_24H_TABLE, None)
 
 
 def get_caqi_pm10_1h(pm10_1h: float) -> float:
@@ -93,7 +103,7 @@ def get_caqi_pm10_1h(pm10_1h: float) -> float:
     :return: PM10 CAQI Europe
     """
     cp = __round_down(pm10_1h)
-    return __get_aqi_general_formula(cp, EU_PM10_1H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_PM10_1H_TABLE, None)
 
 
 def get_caqi_pm10_24h(pm10_24h: float) -> float:
@@ -104,7 +114,21 @@ def get_caqi_pm10_24h(pm10_24h: float) -> float:
     :return: PM10 CAQI Europe
     """
     cp = __round_down(pm10_24h)
-    return __get_aqi_general_formula(cp, EU_PM10_24H, EU_CAQI)
+    return __get_table_sub_index(cp, EU_PM10_24H_TABLE, None)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+EU_CAQI_INPUTS = {
+    'no2_max_1h': ('no2_1h', Truncation(1000), get_caqi_no2_1h, False, EU_NO2_1H_TABLE, None),
+    'so2_max_1h': ('so2_1h', Truncation(1000), get_caqi_so2_1h, False, EU_SO2_1H_TABLE, None),
+    'o3_max_1h': ('o3_1h', Truncation(1000), get_caqi_o3_1h, False, EU_O3_1H_TABLE, None),
+    'co_1h': ('co_1h', Truncation(decimals=1), get_caqi_co_1h, False, EU_CO_8H_TABLE, None),
+    'pm25_1h': ('pm25_1h', Truncation(), get_caqi_pm25_1h, False, EU_PM25_1H_TABLE, None),
+    'pm25_24h': ('pm25_24h', Truncation(), get_caqi_pm25_24h, False, EU_PM25_24H_TABLE, None),
+    'pm10_1h': ('pm10_1h', Truncation(), get_caqi_pm10_1h, False, EU_PM10_1H_TABLE, None),
+    'pm10_24h': ('pm10_24h', Truncation(), get_caqi_pm10_24h, False, EU_PM10_24H_TABLE, None),
+}
 
 
 def get_caqi(co_1h: float = None, o3_max_1h: float = None, no2_max_1h: float = None, pm25_24h: float = None,
@@ -126,26 +150,29 @@ def get_caqi(co_1h: float = None, o3_max_1h: float = None, no2_max_1h: float = N
             keys are: no2_1h, so2_1h, o3_1h, co_1h, pm25_1h, pm25_24h, pm10_1h, pm10_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if no2_max_1h:
-        aqi_data['no2_1h'] = get_caqi_no2_1h(no2_max_1h)
-    if so2_max_1h:
-        aqi_data['so2_1h'] = get_caqi_so2_1h(so2_max_1h)
-    if o3_max_1h:
-        aqi_data['o3_1h'] = get_caqi_o3_1h(o3_max_1h)
-    if co_1h:
-        aqi_data['co_1h'] = get_caqi_co_1h(co_1h)
-    if pm25_1h:
-        aqi_data['pm25_1h'] = get_caqi_pm25_1h(pm25_1h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_caqi_pm25_24h(pm25_24h)
-    if pm10_1h:
-        aqi_data['pm10_1h'] = get_caqi_pm10_1h(pm10_1h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_caqi_pm10_24h(pm10_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x, aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, EU_CAQI, EU_CAQI_LEVELS)}
+    return __get_max_index(EU_CAQI_INPUTS, (no2_max_1h, so2_max_1h, o3_max_1h, co_1h, pm25_1h, pm25_24h, pm10_1h,
+                                            pm10_24h), EU_CAQI, EU_CAQI_LEVELS, with_level)
+
+
+def get_category(co_1h: float = None, o3_max_1h: float = None, no2_max_1h: float = None, pm25_24h: float = None,
+                 pm25_1h: float = None, pm10_1h: float = None, pm10_24h: float = None, so2_max_1h: float = None) -> int:
+    """
+    Finds level of CAQI Europe without calculating individual indexes and messages
+
+    Same as the level of get_caqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param co_1h: CO average (1h), ppm
+    :param o3_max_1h: O3 maximum (max in 1h), ppm
+    :param no2_max_1h: NO2 maximum (max in 1h), ppm
+    :param pm25_1h: PM2.5 average (1h), μg/m3
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_1h: PM10 average (1h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :param so2_max_1h: SO2 maximum (max in 1h), ppm
+    :return: level index in EU_CAQI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(EU_CAQI_INPUTS, EU_CAQI, (('co_1h', co_1h), ('o3_max_1h', o3_max_1h),
+                                                    ('no2_max_1h', no2_max_1h), ('pm25_24h', pm25_24h),
+                                                    ('pm25_1h', pm25_1h), ('pm10_1h', pm10_1h), ('pm10_24h', pm10_24h),
+                                                    ('so2_max_1h', so2_max_1h)))
@@ -0,0 +1,105 @@
+# coding: utf-8
+
+"""
+    Message catalogs
+    Calculators called with with_codes=True return small integer message codes instead of texts,
+    the catalog resolves codes to texts of a language
+"""
+
+from aqipy import REGISTRY, get_module
+from aqipy.station import STANDARDS
+from aqipy.utils import __get_bands
+
+DEFAULT_LANGUAGE = 'en'
+
+# (standard, language) -> catalog
+__catalogs = {}
+
+
+def __get_default_catalog(standard: str) -> {}:
+    if standard not in STANDARDS:
+        module = get_module(standard)
+        bands = REGISTRY[standard][3]
+        return {'aqhi': tuple(zip(getattr(module, bands + '_GENERAL'), getattr(module, bands + '_RISK')))}
+    catalog = {}
+    for key, _, _, _, _, messages in STANDARDS[standard][0].values():
+        if messages is not None:
+            catalog[key] = tuple(zip(*messages))
+    return catalog
+
+
+def get_catalog(standard: str, language: str = DEFAULT_LANGUAGE) -> {}:
+    """
+    Returns message catalog of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param language: language of the texts, see add_translation()
+    :return: dict message key -> tuple of message pairs (effect or general message, caution or risk message)
+             by message code, keys are result keys of the calculator (e.g. pm25_24h) or aqhi for AQHI standards,
+             CAQI Europe has no messages
+    """
+    catalog = __catalogs.get((standard, language))
+    if catalog is None:
+        if language != DEFAULT_LANGUAGE:
+            raise ValueError('no %s translation of standard %s' % (language, standard))
+        catalog = __get_default_catalog(standard)
+        __catalogs[(standard, language)] = catalog
+    return catalog
+
+
+def get_message(standard: str, key: str, code: int, language: str = DEFAULT_LANGUAGE) -> (str, str):
+    """
+    Resolves message code to texts
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param key: result key of the calculator, e.g. pm25_24h, or aqhi for AQHI standards
+    :param code: message code returned by the calculator, -1 gives empty messages
+    :param language: language of the texts, see add_translation()
+    :return: Effect (General) message, Caution (Risk) message
+    """
+    if code < 0:
+        return "", ""
+    return get_catalog(standard, language)[key][code]
+
+
+def get_code(standard: str, aqi: int) -> int:
+    """
+    Finds message code of an index value, same as the code of the dominant pollutant returned by the calculator
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param aqi: index value
+    :return: message code, -1 if there are no messages
+    """
+    if standard == 'eu' or aqi < 0:
+        return -1
+    if standard == 'uk':
+        # messages follow the index value
+        return aqi - 1
+    module = get_module(standard)
+    bands = module.HK_AR if standard == 'hk' else getattr(module, REGISTRY[standard][3])
+    return __get_bands(bands).find(aqi)
+
+
+def add_translation(standard: str, language: str, catalog: {}):
+    """
+    Adds translated message catalog of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param language: language code, e.g. de
+    :param catalog: dict with the same keys and number of messages as get_catalog(standard)
+    """
+    default = get_catalog(standard)
+    if set(catalog) != set(default) or any(len(catalog[key]) != len(default[key]) for key in default):
+        raise ValueError('catalog does not match messages of standard %s' % standard)
+    __catalogs[(standard, language)] = {key: tuple(tuple(pair) for pair in catalog[key]) for key in default}
+
+
+def get_languages(standard: str) -> ():
+    """
+    Lists languages of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: tuple of language codes
+    """
+    return (DEFAULT_LANGUAGE,) + tuple(sorted(language for s, language in __catalogs
+                                              if s == standard and language != DEFAULT_LANGUAGE))
@@ -0,0 +1,184 @@
+# coding: utf-8
+
+"""
+    Command line tool: python -m aqipy
+    Reads CSV or JSON Lines readings from files or stdin and streams index, dominant pollutant and level to stdout
+
+    python -m aqipy --standard us readings.csv
+    cat readings.jsonl | python -m aqipy --standard eu --format jsonl --map pm25=pm25_24h --keep station --keep time
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from multiprocessing import get_context
+
+from aqipy import REGISTRY, get_module
+from aqipy.multi import ALL_STANDARDS, AQHI_INPUTS, get_indexes_rows
+from aqipy.station import STANDARDS
+from aqipy.units import PRESSURE, TEMPERATURE, get_unit
+
+CHUNK_SIZE = 10000
+
+
+def get_level_names(standard: str) -> ():
+    """
+    Returns level names of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: tuple of level names, e.g. ('good', 'moderate', ...)
+    """
+    return getattr(get_module(standard), REGISTRY[standard][4])
+
+
+def __get_value(value, line: int, column: str):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # a malformed cell is a missing reading, the stream goes on
+        print('row %d, column %s: %r is not a number, treated as missing' % (line, column, value), file=sys.stderr)
+        return None
+
+
+def evaluate_chunk(standard: str, readings: [], units=None, temperature: float = TEMPERATURE,
+                   pressure: float = PRESSURE) -> []:
+    """
+    Calculates index of one standard for a chunk of readings
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param readings: list of dicts of averages, keys are same as in multi.get_indexes(), None means missing reading
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C
+    :param pressure: pressure for conversion between volume and mass units, kPa
+    :return: list of tuples (index, dominant pollutant or None, level name), -1 means index is not available
+    """
+    names = get_level_names(standard)
+    return [(aqi, dominant, names[level] if level >= 0 else '')
+            for aqi, dominant, level in get_indexes_rows(readings, standard, units, temperature, pressure)]
+
+
+def __read_rows(files: [], input_format: str):
+    for f in files:
+        if input_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def __get_chunks(rows, mapping: {}, keep: [], chunk_size: int):
+    readings = []
+    kept = []
+    for line, row in enumerate(rows, 1):
+        readings.append({name: __get_value(row.get(column), line, column) for column, name in mapping.items()
+                         if column in row})
+        kept.append([row.get(column, '') for column in keep])
+        if len(readings) == chunk_size:
+            yield readings, kept
+            readings = []
+            kept = []
+    if readings:
+        yield readings, kept
+
+
+def __get_mapping(standard: str, pairs: []) -> {}:
+    if standard in AQHI_INPUTS:
+        names = AQHI_INPUTS[standard]
+    else:
+        names = list(STANDARDS[standard][0])
+        # CAQI Europe falls back to hourly averages for hourly maximums
+        names += [name.replace('_max_', '_') for name in names if '_max_' in name]
+    mapping = {name: name for name in names}
+    for pair in pairs:
+        column, _, name = pair.partition('=')
+        mapping[column] = name
+    return mapping
+
+
+def __get_units(values: []):
+    # a plain unit applies to all pollutants, POLLUTANT=UNIT sets the unit of one pollutant or argument
+    if not values:
+        return None
+    units = {}
+    for value in values:
+        name, _, unit = value.rpartition('=')
+        units[name or None] = get_unit(unit)
+    if None not in units:
+        return units
+    if len(units) > 1:
+        raise ValueError('a unit of all pollutants can not be combined with units of pollutants')
+    return units[None]
+
+
+def main(argv: [] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m aqipy', description='Calculates air quality indexes of readings')
+    parser.add_argument('files', nargs='*', help='input files, stdin by default')
+    parser.add_argument('--standard', choices=ALL_STANDARDS, default='us', help='air quality standard')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default=None,
+                        help='input format, by file extension or csv by default')
+    parser.add_argument('--output-format', choices=('csv', 'jsonl'), default='csv', help='output format')
+    parser.add_argument('--map', action='append', default=[], metavar='COLUMN=NAME',
+                        help='maps an input column to an argument of the calculator, e.g. pm25=pm25_24h')
+    parser.add_argument('--keep', action='append', default=[], metavar='COLUMN',
+                        help='copies an input column to the output, e.g. station or time')
+    parser.add_argument('--unit', action='append', default=[], metavar='[POLLUTANT=]UNIT',
+                        help='unit of the input concentrations (ppm, ppb, ug/m3, mg/m3), e.g. ug/m3 or no2=ppb')
+    parser.add_argument('--temperature', type=float, default=TEMPERATURE,
+                        help='temperature for conversion between volume and mass units, °C')
+    parser.add_argument('--pressure', type=float, default=PRESSURE,
+                        help='pressure for conversion between volume and mass units, kPa')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows evaluated at once')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    args = parser.parse_args(argv)
+    try:
+        conversion = (__get_units(args.unit), args.temperature, args.pressure)
+    except ValueError as e:
+        parser.error(str(e))
+
+    input_format = args.format
+    if input_format is None:
+        input_format = 'jsonl' if args.files and all(f.endswith(('.jsonl', '.json')) for f in args.files) else 'csv'
+    files = [open(name, newline='') for name in args.files] if args.files else [sys.stdin]
+    mapping = __get_mapping(args.standard, args.map)
+    fields = args.keep + ['aqi', 'dominant', 'level']
+    out = sys.stdout
+    writer = csv.writer(out, lineterminator='\n')
+    if args.output_format == 'csv':
+        writer.writerow(fields)
+
+    def write(result, kept):
+        for values, (aqi, dominant, level) in zip(kept, result):
+            if args.output_format == 'csv':
+                writer.writerow(values + [aqi, dominant or '', level])
+            else:
+                out.write(json.dumps(dict(zip(fields, values + [aqi, dominant, level]))) + '\n')
+
+    chunks = __get_chunks(__read_rows(files, input_format), mapping, args.keep, args.chunk_size)
+    try:
+        if args.workers <= 1:
+            for readings, kept in chunks:
+                write(evaluate_chunk(args.standard, readings, *conversion), kept)
+        else:
+            # at most two chunks per worker are in flight, so memory stays bounded and output keeps input order
+            with get_context().Pool(args.workers) as pool:
+                pending = deque()
+                for readings, kept in chunks:
+                    pending.append((pool.apply_async(evaluate_chunk, (args.standard, readings) + conversion), kept))
+                    if len(pending) >= 2 * args.workers:
+                        result, kept = pending.popleft()
+                        write(result.get(), kept)
+                while pending:
+                    result, kept = pending.popleft()
+                    write(result.get(), kept)
+    except BrokenPipeError:  # pragma: no cover
+        return 1
+    finally:
+        for f in files:
+            if f is not sys.stdin:
+                f.close()
+    return 0
@@ -0,0 +1,99 @@
+# coding: utf-8
+
+"""
+    Out-of-core evaluation of columnar archives (requires numpy)
+    Pollutant columns are memory-mapped from raw binary or .npy files and evaluated block by block,
+    results are written to memory-mapped .npy files, so memory use does not depend on the size of the archive
+"""
+
+import os
+
+from aqipy.multi import AQHI_INPUTS, get_indexes_batch, get_pollutants, get_sub_indexes_batch
+from aqipy.units import PRESSURE, TEMPERATURE
+from aqipy.utils import AQI_DTYPE, AQI_NOT_AVAILABLE, __get_max_index_array, __get_band_array, __require_numpy
+from aqipy.station import STANDARDS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# rows per block, a block of a few float64 columns fits into L2 cache
+BLOCK_SIZE = 16384
+
+
+def open_column(source, dtype: str = 'float64') -> 'np.ndarray':
+    """
+    Opens a pollutant column without loading it into memory
+
+    :param source: path of a .npy file or of a raw binary file with values of dtype, or an array
+    :param dtype: dtype of raw files, float32 or float64
+    :return: read-only memory-mapped array (or the array itself)
+    """
+    __require_numpy()
+    if not isinstance(source, (str, os.PathLike)):
+        return np.asarray(source)
+    if str(source).endswith('.npy'):
+        return np.load(source, mmap_mode='r')
+    return np.memmap(source, dtype=dtype, mode='r')
+
+
+def get_indexes_mapped(standard: str, inputs: {}, output_dir: str, dtype: str = 'float64',
+                       block_size: int = BLOCK_SIZE, sub_indexes: bool = True, units=None, temperature=TEMPERATURE,
+                       pressure=PRESSURE) -> {}:
+    """
+    Calculates index of one standard for memory-mapped pollutant columns
+
+    Creates aqi.npy, dominant.npy and level.npy in output_dir, and aqi_<pollutant>.npy with individual indexes
+    (e.g. aqi_pm25_24h.npy) for standards which take the maximum of individual indexes.
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param inputs: dict of columns, keys are same as in multi.get_indexes(), values are accepted by open_column(),
+                   zero or NaN values are treated as missing readings (only NaN for AQHI standards)
+    :param output_dir: directory of the results
+    :param dtype: dtype of raw input files, float32 or float64
+    :param block_size: number of rows evaluated at once
+    :param sub_indexes: Boolean distinguishing whether to write individual indexes
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C, or a column
+    :param pressure: pressure for conversion between volume and mass units, kPa, or a column
+    :return: dict of result name (aqi, dominant, level, aqi_<pollutant>) -> path of the .npy file,
+             dominant pollutant is an index in multi.get_pollutants(), -1 means index is not available
+    """
+    columns = {name: open_column(source, dtype).ravel() for name, source in inputs.items()}
+    conditions = [value if isinstance(value, (int, float)) else open_column(value, dtype).ravel()
+                  for value in (temperature, pressure)]
+    rows = {len(column) for column in columns.values()}
+    if len(rows) > 1:
+        raise ValueError("columns have different lengths: %s" % sorted(rows))
+    rows = rows.pop() if rows else 0
+    names = ['aqi', 'dominant', 'level']
+    if sub_indexes and standard not in AQHI_INPUTS:
+        names += ['aqi_' + key for key in get_pollutants(standard)]
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, name + '.npy') for name in names}
+    outputs = {name: np.lib.format.open_memmap(path, mode='w+', dtype=AQI_DTYPE, shape=(rows,))
+               for name, path in paths.items()}
+    for start in range(0, rows, block_size):
+        stop = min(start + block_size, rows)
+        block = {name: column[start:stop] for name, column in columns.items()}
+        temperature, pressure = [value if isinstance(value, (int, float)) else value[start:stop] for value in conditions]
+        if standard in AQHI_INPUTS:
+            aqi, dominant, level = get_indexes_batch(block, (standard,), units, temperature, pressure)[standard]
+            dominant = AQI_NOT_AVAILABLE
+        else:
+            aqi_data = get_sub_indexes_batch(block, standard, units, temperature, pressure)
+            aqi, dominant = __get_max_index_array(aqi_data, get_pollutants(standard))
+            level = __get_band_array(aqi, STANDARDS[standard][1])
+            if len(aqi) != stop - start:
+                # none of the pollutants of the standard is given
+                aqi = dominant = level = AQI_NOT_AVAILABLE
+            for key in get_pollutants(standard):
+                if 'aqi_' + key in outputs:
+                    outputs['aqi_' + key][start:stop] = aqi_data.get(key, AQI_NOT_AVAILABLE)
+        outputs['aqi'][start:stop] = aqi
+        outputs['dominant'][start:stop] = dominant
+        outputs['level'][start:stop] = level
+    for output in outputs.values():
+        output.flush()
+    return paths
@@ -6,8 +6,7 @@
             https://uk-air.defra.gov.uk/assets/documents/reports/cat14/1304251155_Update_on_Implementation_of_the_DAQI_April_2013_Final.pdf
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula, __get_aqi_general_formula_texts, \
-    __get_aqi_level
+from aqipy.utils import Truncation, BandTable, __round_down, __get_table_sub_index, __get_max_index, __get_category
 
 UK_AQI = ((1, 3), (4, 6), (7, 9), (10, 10))
 UK_AQI_LEVELS = ('low', 'moderate', 'high', 'very high')
@@ -45,12 +44,11 @@ UK_DAQI_RISK = (
     "Adults and children with lung problems, adults with heart problems, and older people, should avoid strenuous physical activity. People with asthma may find they need to use their reliever inhaler more often."
 )
 
-
-def __get_daqi(val: float, array: [[]]) -> (int, str, str):
-    for i in range(len(array)):
-        if array[i][0] <= val <= array[i][1]:
-            return i + 1, UK_DAQI_GENERAL[i], UK_DAQI_RISK[i]
-    return len(array), UK_DAQI_GENERAL[-1], UK_DAQI_RISK[-1]
+UK_DAQI_MESSAGES = (UK_DAQI_GENERAL, UK_DAQI_RISK)
+UK_O3_1H_TABLE = BandTable(UK_O3_1H)
+UK_NO2_1H_TABLE = BandTable(UK_NO2_1H)
+UK_PM25_24H_TABLE = BandTable(UK_PM25_24H)
+UK_PM10_24H_TABLE = BandTable(UK_PM10_24H)
 
 
 def get_daqi_o3_1h(o3_1h: float) -> (int, str, str):
@@ -61,7 +59,7 @@ def get_daqi_o3_1h(o3_1h: float) -> (int, str, str):
     :return: O3 UK DAQI, Effect message, Caution message
     """
     cp = __round_down(o3_1h * 1000)
-    return __get_daqi(cp, UK_O3_1H)
+    return __get_table_sub_index(cp, UK_O3_1H_TABLE, UK_DAQI_MESSAGES)
 
 
 def get_daqi_no2_1h(no2_1h: float) -> (int, str, str):
@@ -72,7 +70,7 @@ def get_daqi_no2_1h(no2_1h: float) -> (int, str, str):
     :return: NO2 UK DAQI, Effect message, Caution message
     """
     cp = __round_down(no2_1h * 1000)
-    return __get_daqi(cp, UK_NO2_1H)
+    return __get_table_sub_index(cp, UK_NO2_1H_TABLE, UK_DAQI_MESSAGES)
 
 
 def get_daqi_so2_15m(so2_15m: float) -> (int, str, str):
@@ -83,7 +81,7 @@ def get_daqi_so2_15m(so2_15m: float) -> (int, str, str):
     :return: SO2 UK DAQI, Effect message, Caution message
     """
     cp = __round_down(so2_15m * 1000)
-    return __get_daqi(cp, UK_NO2_1H)
+    return __get_table_sub_index(cp, UK_NO2_1H_TABLE, UK_DAQI_MESSAGES)
 
 
 def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -94,7 +92,7 @@ def get_aqi_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 UK DAQI, Effect message, Caution message
     """
     cp = __round_down(pm25_24h)
-    return __get_daqi(cp, UK_PM25_24H)
+    return __get_table_sub_index(cp, UK_PM25_24H_TABLE, UK_DAQI_MESSAGES)
 
 
 def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -105,11 +103,23 @@ def get_aqi_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 UK DAQI, Effect message, Caution message
     """
     cp = __round_down(pm10_24h)
-    return __get_daqi(cp, UK_PM10_24H)
+    return __get_table_sub_index(cp, UK_PM10_24H_TABLE, UK_DAQI_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+UK_DAQI_INPUTS = {
+    'o3_1h': ('o3_1h', Truncation(1000), get_daqi_o3_1h, False, UK_O3_1H_TABLE, UK_DAQI_MESSAGES),
+    'no2_1h': ('no2_1h', Truncation(1000), get_daqi_no2_1h, False, UK_NO2_1H_TABLE, UK_DAQI_MESSAGES),
+    'so2_15m': ('so2_15m', Truncation(1000), get_daqi_so2_15m, False, UK_NO2_1H_TABLE, UK_DAQI_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(), get_aqi_pm25_24h, False, UK_PM25_24H_TABLE, UK_DAQI_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(), get_aqi_pm10_24h, False, UK_PM10_24H_TABLE, UK_DAQI_MESSAGES),
+}
 
 
 def get_daqi(o3_1h: float = None, no2_1h: float = None, so2_15m: float = None,
-             pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False) -> (int, {}):
+             pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False,
+             with_codes: bool = False) -> (int, {}):
     """
     Calculates DAQI UK (Maximum from individual indexes)
 
@@ -119,24 +129,30 @@ def get_daqi(o3_1h: float = None, no2_1h: float = None, so2_15m: float = None,
     :param pm25_24h: PM2.5 average (24h), μg/m3
     :param pm10_24h: PM10 average (24h), μg/m3
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: DAQI UK, dict with tuples (Individual aqi, Effect message, Caution message)
              keys are: o3_1h, no2_1h, so2_15m, pm25_24h, pm10_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if o3_1h:
-        aqi_data['o3_1h'] = get_daqi_o3_1h(o3_1h)
-    if no2_1h:
-        aqi_data['no2_1h'] = get_daqi_no2_1h(no2_1h)
-    if so2_15m:
-        aqi_data['so2_15m'] = get_daqi_so2_15m(so2_15m)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_aqi_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_aqi_pm10_24h(pm10_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, UK_AQI, UK_AQI_LEVELS)}
+    return __get_max_index(UK_DAQI_INPUTS, (o3_1h, no2_1h, so2_15m, pm25_24h, pm10_24h),
+                           UK_AQI, UK_AQI_LEVELS, with_level, with_codes)
+
+
+def get_category(o3_1h: float = None, no2_1h: float = None, so2_15m: float = None, pm25_24h: float = None,
+                 pm10_24h: float = None) -> int:
+    """
+    Finds level of DAQI UK without calculating individual indexes and messages
+
+    Same as the level of get_daqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param o3_1h: O3 average (1h), ppm
+    :param no2_1h: NO2 average (1h), ppm
+    :param so2_15m: SO3 average (15m), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :return: level index in UK_AQI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(UK_DAQI_INPUTS, UK_AQI, (('o3_1h', o3_1h), ('no2_1h', no2_1h), ('so2_15m', so2_15m),
+                                                   ('pm25_24h', pm25_24h), ('pm10_24h', pm10_24h)))
@@ -0,0 +1,155 @@
+# coding: utf-8
+
+"""
+    Inverse lookup: index value to concentration threshold
+    Finds the smallest concentration which gives at least the index value, respecting truncation and caps
+    of every individual index, so that raw concentrations can be compared with precomputed thresholds,
+    concentrations inside gaps of breakpoint tables give index 0 (see get_gaps())
+"""
+
+import math
+import struct
+
+from aqipy.station import STANDARDS
+from aqipy.utils import BandTable, BreakpointTable
+
+__thresholds = {}
+
+
+def __to_bits(val: float) -> int:
+    return struct.unpack('<q', struct.pack('<d', val))[0]
+
+
+def __from_bits(bits: int) -> float:
+    return struct.unpack('<d', struct.pack('<q', bits))[0]
+
+
+def __get_grid_range(low: float, high: float, multiplier: int) -> (int, int):
+    # grid steps of truncated concentrations within [low, high], rounding absorbs binary representation errors
+    return math.ceil(round(low * multiplier, 6)), math.floor(round(high * multiplier, 6))
+
+
+def __find_on_grid(table, k_low: int, k_high: int, multiplier: int, aqi: int) -> int:
+    # first grid step with index >= aqi, the index does not decrease within the range
+    if k_low > k_high or table.evaluate(k_high / multiplier) < aqi:
+        return -1
+    while k_low < k_high:
+        k = (k_low + k_high) // 2
+        if table.evaluate(k / multiplier) >= aqi:
+            k_high = k
+        else:
+            k_low = k + 1
+    return k_low
+
+
+def __find_truncated(table, multiplier: int, aqi: int) -> int:
+    if isinstance(table, BreakpointTable):
+        # interpolation grows within every row, values between rows give 0
+        for low, high in zip(table._lows, table._highs):
+            k = __find_on_grid(table, *__get_grid_range(low, high, multiplier), multiplier, aqi)
+            if k >= 0:
+                return k
+        # values above the table saturate
+        k = __get_grid_range(0, table._highs[-1], multiplier)[1] + 1
+        return k if table.evaluate(k / multiplier) >= aqi else -1
+    # band and ratio tables grow with the concentration
+    if isinstance(table, BandTable):
+        top = table.bands[-1][1] + 1
+    else:
+        top = table.standard * table.max_aqi / 100 + 1
+    return __find_on_grid(table, 0, __get_grid_range(0, top, multiplier)[1], multiplier, aqi)
+
+
+def __find_raw(truncation, cp: float) -> float:
+    # smallest float with truncation(val) >= cp, positive floats are ordered as their bit patterns
+    high = cp / truncation.scale * 2 + 1
+    low_bits, high_bits = 0, __to_bits(high)
+    if truncation(0.0) >= cp:
+        return 0.0
+    while high_bits - low_bits > 1:
+        bits = (low_bits + high_bits) // 2
+        if truncation(__from_bits(bits)) >= cp:
+            high_bits = bits
+        else:
+            low_bits = bits
+    return __from_bits(high_bits)
+
+
+def get_concentration(standard: str, pollutant: str, aqi: int) -> float:
+    """
+    Finds concentration threshold of an index value
+
+    A reading reaches the index value when its concentration is at least the threshold (and not zero), except
+    inside gaps of a breakpoint table: truncated concentrations between two rows give index 0 (e.g. 50.1 to 50.9
+    μg/m3 of CN PM2.5 24h, whose rows end at 50 and start at 51), see get_gaps().
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg
+    :param pollutant: argument of the calculator of the standard, e.g. pm25_24h or no2_max_1h
+    :param aqi: index value
+    :return: smallest concentration in units of the calculator, None if the index value is never reached
+             (e.g. above the cap of the individual index)
+    """
+    key = (standard, pollutant, aqi)
+    if key in __thresholds:
+        return __thresholds[key]
+    if standard not in STANDARDS:
+        raise ValueError('unsupported standard: %s' % standard)
+    _, truncation, _, skip_zero, table, _ = STANDARDS[standard][0][pollutant]
+    multiplier = 1 if truncation.rounding else 10 ** truncation.decimals
+    if aqi <= 0:
+        # every available concentration reaches it
+        threshold = __find_raw(truncation, 1 / multiplier) if skip_zero else 0.0
+    else:
+        k = __find_truncated(table, multiplier, aqi)
+        if k == 0 and skip_zero:
+            k = 1 if table.evaluate(1 / multiplier) >= aqi else -1
+        threshold = None if k < 0 else __find_raw(truncation, k / multiplier)
+    __thresholds[key] = threshold
+    return threshold
+
+
+def get_thresholds(standard: str, aqi: int) -> {}:
+    """
+    Finds concentration thresholds of an index value for all pollutants of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg
+    :param aqi: index value, e.g. 151
+    :return: dict of calculator argument -> threshold, see get_concentration()
+    """
+    return {pollutant: get_concentration(standard, pollutant, aqi) for pollutant in STANDARDS[standard][0]}
+
+
+def get_level_thresholds(standard: str, pollutant: str) -> []:
+    """
+    Finds concentration thresholds of the levels of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg
+    :param pollutant: argument of the calculator of the standard, e.g. pm25_24h
+    :return: list of thresholds of the lower bounds of the levels, see get_concentration()
+    """
+    return [get_concentration(standard, pollutant, band[0]) for band in STANDARDS[standard][1]]
+
+
+def get_gaps(standard: str, pollutant: str) -> []:
+    """
+    Finds concentration ranges inside gaps of the breakpoint table of a pollutant, readings within them give index 0
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg
+    :param pollutant: argument of the calculator of the standard, e.g. pm25_24h
+    :return: list of (low, high) in units of the calculator, concentrations low <= c < high are inside a gap,
+             empty if the table has no gaps
+    """
+    if standard not in STANDARDS:
+        raise ValueError('unsupported standard: %s' % standard)
+    _, truncation, _, _, table, _ = STANDARDS[standard][0][pollutant]
+    if not isinstance(table, BreakpointTable):
+        return []
+    multiplier = 1 if truncation.rounding else 10 ** truncation.decimals
+    gaps = []
+    for high, low in zip(table._highs, table._lows[1:]):
+        # grid steps above the end of a row and below the start of the next one
+        k_first = __get_grid_range(0, high, multiplier)[1] + 1
+        k_last = math.ceil(round(low * multiplier, 6)) - 1
+        if k_first <= k_last:
+            gaps.append((__find_raw(truncation, k_first / multiplier), __find_raw(truncation, (k_last + 1) / multiplier)))
+    return gaps
@@ -0,0 +1,178 @@
+# coding: utf-8
+
+"""
+    All standards for one reading
+    Every concentration is checked and truncated once per distinct truncation and shared by the standards
+"""
+
+from aqipy import REGISTRY, get_module
+from aqipy.station import STANDARDS
+from aqipy.units import PRESSURE, TEMPERATURE, convert_reading
+from aqipy.utils import AQI_NOT_AVAILABLE, __get_bands, __as_array, __is_available_array, __get_table_array, \
+    __get_max_index_array, __get_band_array, __get_numpy
+
+ALL_STANDARDS = ('us', 'cn', 'in', 'eu', 'uk', 'au', 'kr', 'sg', 'ca', 'hk')
+# AQHI standard code -> arguments of the calculator
+AQHI_INPUTS = {code: spec[5] for code, spec in REGISTRY.items() if spec[2] is None}
+
+
+def get_pollutants(standard: str) -> ():
+    """
+    Lists pollutants of a standard, dominant pollutant codes of batch results are indexes in this tuple
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: tuple of result keys, e.g. ('co_8h', 'o3_1h', ...), empty for AQHI standards
+    """
+    if standard in AQHI_INPUTS:
+        return ()
+    return tuple(spec[0] for spec in STANDARDS[standard][0].values())
+
+
+def __get_reading(reading: {}, name: str) -> (str, float):
+    # CAQI Europe uses hourly maximums, which are hourly averages for an hourly index
+    if name not in reading and '_max_' in name:
+        name = name.replace('_max_', '_')
+    return name, reading.get(name)
+
+
+def get_indexes(reading: {}, standards: () = ALL_STANDARDS, units=None, temperature=TEMPERATURE,
+                pressure=PRESSURE) -> {}:
+    """
+    Calculates indexes of several standards for one reading
+
+    :param reading: dict of averages, keys are argument names of the calculators, e.g. pm25_24h, o3_8h, o3_3h,
+                    (CAQI Europe falls back to o3_1h, no2_1h and so2_1h for o3_max_1h, no2_max_1h and so2_max_1h)
+    :param standards: standard codes: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C
+    :param pressure: pressure for conversion between volume and mass units, kPa
+    :return: dict standard code -> tuple (index, dominant pollutant, level index in the levels of the standard)
+             -1 and None mean index is not available
+    """
+    if units is not None:
+        reading = convert_reading(reading, units, temperature, pressure)
+    truncated = {}
+    result = {}
+    for standard in standards:
+        if standard in AQHI_INPUTS:
+            module = get_module(standard)
+            aqi = module.get_aqhi(*[reading.get(name) for name in AQHI_INPUTS[standard]])[0]
+            result[standard] = (aqi, None, __get_bands(getattr(module, REGISTRY[standard][3])).find(aqi))
+            continue
+        inputs, levels, _ = STANDARDS[standard]
+        aqi = AQI_NOT_AVAILABLE
+        dominant = None
+        for name, (key, truncation, _, skip_zero, table, _) in inputs.items():
+            name, val = __get_reading(reading, name)
+            if not val:
+                continue
+            cache_key = (name, truncation.key)
+            if cache_key in truncated:
+                cp = truncated[cache_key]
+            else:
+                cp = truncation(val)
+                truncated[cache_key] = cp
+            if skip_zero and not cp:
+                continue
+            value = table.evaluate(cp)
+            if dominant is None or value > aqi:
+                aqi = value
+                dominant = key
+        result[standard] = (aqi, dominant, __get_bands(levels).find(aqi) if dominant is not None else -1)
+    return result
+
+
+def __get_sub_index_arrays(readings: {}, standard: str, arrays: {}, truncated: {}) -> {}:
+    # arrays and truncated cache conversions of the inputs shared by standards
+    aqi_data = {}
+    for name, (key, truncation, _, skip_zero, table, _) in STANDARDS[standard][0].items():
+        name, val = __get_reading(readings, name)
+        if val is None:
+            continue
+        if name not in arrays:
+            c = __as_array(val)
+            arrays[name] = (c, __is_available_array(c))
+        c, available = arrays[name]
+        cache_key = (name, truncation.key)
+        if cache_key not in truncated:
+            truncated[cache_key] = truncation.truncate_array(c)
+        cp = truncated[cache_key]
+        if skip_zero:
+            available = available & (cp != 0)
+        aqi_data[key] = __get_table_array(cp, table, available)
+    return aqi_data
+
+
+def get_sub_indexes_batch(readings: {}, standard: str, units=None, temperature=TEMPERATURE, pressure=PRESSURE) -> {}:
+    """
+    Calculates individual indexes of a standard for arrays of readings (requires numpy)
+
+    :param readings: dict of arrays of averages, keys are same as in get_indexes()
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C
+    :param pressure: pressure for conversion between volume and mass units, kPa
+    :return: dict with individual index arrays, keys are same as in the results of the calculator of the standard,
+             -1 means index is not available
+    """
+    return __get_sub_index_arrays(convert_reading(readings, units, temperature, pressure), standard, {}, {})
+
+
+def get_indexes_batch(readings: {}, standards: () = ALL_STANDARDS, units=None, temperature=TEMPERATURE,
+                      pressure=PRESSURE) -> {}:
+    """
+    Calculates indexes of several standards for arrays of readings (requires numpy)
+
+    Inputs are broadcast against each other, zero or NaN values are treated as missing readings
+    (AQHI standards treat only NaN as missing, same as None of scalar calculations).
+
+    :param readings: dict of arrays of averages, keys are same as in get_indexes()
+    :param standards: standard codes: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C
+    :param pressure: pressure for conversion between volume and mass units, kPa
+    :return: dict standard code -> tuple of arrays (index, dominant pollutant as index in get_pollutants(),
+             level index in the levels of the standard), -1 means index is not available,
+             dominant pollutant is None for AQHI standards
+    """
+    readings = convert_reading(readings, units, temperature, pressure)
+    arrays = {}
+    truncated = {}
+    result = {}
+    for standard in standards:
+        if standard in AQHI_INPUTS:
+            values = [readings.get(name, float('nan')) for name in AQHI_INPUTS[standard]]
+            aqi, category = get_module(standard).get_aqhi_batch(*values)
+            result[standard] = (aqi, None, category)
+            continue
+        aqi_data = __get_sub_index_arrays(readings, standard, arrays, truncated)
+        aqi, dominant = __get_max_index_array(aqi_data, get_pollutants(standard))
+        result[standard] = (aqi, dominant, __get_band_array(aqi, STANDARDS[standard][1]))
+    return result
+
+
+def get_indexes_rows(readings: [], standard: str, units=None, temperature=TEMPERATURE, pressure=PRESSURE) -> []:
+    """
+    Calculates index of one standard for a list of readings, with the batch engine when numpy is installed
+
+    :param readings: list of dicts of averages, keys are same as in get_indexes(), None means missing reading
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C
+    :param pressure: pressure for conversion between volume and mass units, kPa
+    :return: list of tuples (index, dominant pollutant, level index), same as get_indexes() for every reading
+    """
+    if __get_numpy() is None:
+        return [get_indexes(reading, (standard,), units, temperature, pressure)[standard] for reading in readings]
+    keys = {key for reading in readings for key in reading}
+    columns = {key: __as_array([reading.get(key) for reading in readings]) for key in keys}
+    aqi, dominant, level = get_indexes_batch(columns, (standard,), units, temperature, pressure)[standard]
+    if len(aqi) != len(readings):
+        # none of the pollutants of the standard is given
+        return [(AQI_NOT_AVAILABLE, None, -1)] * len(readings)
+    if dominant is None:
+        dominant = [None] * len(readings)
+    else:
+        pollutants = get_pollutants(standard)
+        dominant = [pollutants[i] if i >= 0 else None for i in dominant.tolist()]
+    return list(zip(aqi.tolist(), dominant, level.tolist()))
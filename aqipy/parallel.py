@@ -0,0 +1,106 @@
+# coding: utf-8
+
+"""
+    Parallel evaluation of large datasets (requires numpy)
+    Input columns and results live in shared memory, worker processes evaluate chunks of rows in place,
+    so only chunk bounds are sent between processes
+"""
+
+import os
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+from aqipy.multi import get_indexes_batch
+from aqipy.units import PRESSURE, TEMPERATURE, convert_reading
+from aqipy.utils import AQI_DTYPE, AQI_NOT_AVAILABLE, __require_numpy
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+CHUNK_SIZE = 65536
+
+# shared buffers attached by a worker process
+__shared = {}
+
+
+def __attach(standard: str, names: (), rows: int, input_name: str, output_name: str):
+    inputs = SharedMemory(input_name)
+    outputs = SharedMemory(output_name)
+    __shared['standard'] = standard
+    __shared['buffers'] = (inputs, outputs)
+    __shared['inputs'] = np.ndarray((len(names), rows), dtype=np.float64, buffer=inputs.buf)
+    __shared['outputs'] = np.ndarray((3, rows), dtype=AQI_DTYPE, buffer=outputs.buf)
+    __shared['names'] = names
+
+
+def __evaluate_rows(standard: str, readings: {}, outputs: 'np.ndarray'):
+    aqi, dominant, category = get_indexes_batch(readings, (standard,))[standard]
+    if len(aqi) != outputs.shape[1]:
+        # none of the pollutants of the standard is given
+        outputs[:] = AQI_NOT_AVAILABLE
+        return
+    outputs[0] = aqi
+    outputs[1] = AQI_NOT_AVAILABLE if dominant is None else dominant
+    outputs[2] = category
+
+
+def __evaluate(bounds: (int, int)):
+    start, stop = bounds
+    readings = {name: __shared['inputs'][i, start:stop] for i, name in enumerate(__shared['names'])}
+    __evaluate_rows(__shared['standard'], readings, __shared['outputs'][:, start:stop])
+
+
+def get_indexes_parallel(standard: str, readings: {}, workers: int = None, chunk_size: int = CHUNK_SIZE, units=None,
+                         temperature=TEMPERATURE, pressure=PRESSURE) -> ('np.ndarray', 'np.ndarray', 'np.ndarray'):
+    """
+    Calculates index of one standard for columns of readings in a process pool
+
+    Results are identical to multi.get_indexes_batch and to the scalar calculators of the standard.
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param readings: dict of columns of averages, keys are same as in multi.get_indexes(), zero or NaN values are
+                     treated as missing readings (only NaN for AQHI standards)
+    :param workers: number of processes, number of CPUs by default
+    :param chunk_size: number of rows evaluated by a worker at once
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C (or array)
+    :param pressure: pressure for conversion between volume and mass units, kPa (or array)
+    :return: arrays of index, dominant pollutant (index in multi.get_pollutants(), -1 for AQHI standards) and
+             level index, -1 means index is not available
+    """
+    __require_numpy()
+    # converted once in the parent, workers only evaluate
+    readings = convert_reading(readings, units, temperature, pressure)
+    names = tuple(readings)
+    columns = np.broadcast_arrays(*[np.asarray(readings[name], dtype=np.float64).ravel() for name in names])
+    rows = len(columns[0]) if columns else 0
+    if workers is None:
+        workers = os.cpu_count() or 1
+    bounds = [(start, min(start + chunk_size, rows)) for start in range(0, rows, chunk_size)]
+    if workers <= 1 or len(bounds) <= 1:
+        result = np.empty((3, rows), dtype=AQI_DTYPE)
+        __evaluate_rows(standard, dict(zip(names, columns)), result)
+        aqi, dominant, category = result
+        return aqi, dominant, category
+    inputs = SharedMemory(create=True, size=max(len(names) * rows * 8, 1))
+    outputs = SharedMemory(create=True, size=3 * rows * np.dtype(AQI_DTYPE).itemsize)
+    try:
+        shared = np.ndarray((len(names), rows), dtype=np.float64, buffer=inputs.buf)
+        for i, column in enumerate(columns):
+            shared[i] = column
+        result = np.ndarray((3, rows), dtype=AQI_DTYPE, buffer=outputs.buf)
+        result[:] = AQI_NOT_AVAILABLE
+        del shared
+        with get_context().Pool(min(workers, len(bounds)), __attach,
+                                (standard, names, rows, inputs.name, outputs.name)) as pool:
+            pool.map(__evaluate, bounds, chunksize=1)
+        aqi, dominant, category = result.copy()
+        del result
+    finally:
+        inputs.close()
+        inputs.unlink()
+        outputs.close()
+        outputs.unlink()
+    return aqi, dominant, category
@@ -7,7 +7,8 @@
             https://www-haze-gov-sg-admin.cwp.sg/docs/default-source/default-document-library/how-to-plan-your-outdoor-activities-during-haze.pdf
 """
 
-from aqipy.utils import AQI_NOT_AVAILABLE, __round_down, __get_aqi_general_formula_texts, __get_aqi_level
+from aqipy.utils import Truncation, __round_down, BreakpointTable, __get_table_sub_index, __get_max_index, \
+    __get_category
 
 SG_PSI = ((0, 50), (51, 100), (101, 200), (201, 300), (301, 400), (401, 500))
 SG_PSI_LEVELS = ('good', 'moderate', 'unhealthy', 'unhealthy', 'hazardous', 'hazardous')
@@ -36,6 +37,15 @@ SG_AQI_RISK = (
     "PSI levels above 400 may be life-threatening to ill and elderly persons"
 )
 
+SG_AQI_MESSAGES = (SG_AQI_GENERAL, SG_AQI_RISK)
+
+SG_O3_8H_TABLE = BreakpointTable(SG_O3_8H, SG_PSI, decimals=0)
+SG_NO2_1H_TABLE = BreakpointTable(SG_NO2_1H, SG_PSI, decimals=0)
+SG_SO2_24H_TABLE = BreakpointTable(SG_SO2_24H, SG_PSI, decimals=0)
+SG_CO_8H_TABLE = BreakpointTable(SG_CO_8H, SG_PSI, decimals=1)
+SG_PM25_24H_TABLE = BreakpointTable(SG_PM25_24H, SG_PSI, decimals=0)
+SG_PM10_24H_TABLE = BreakpointTable(SG_PM10_24H, SG_PSI, decimals=0)
+
 
 def get_psi_o3_8h(o3_8h: float) -> (int, str, str):
     """
@@ -45,7 +55,7 @@ def get_psi_o3_8h(o3_8h: float) -> (int, str, str):
     :return: Singapore PSI, General message, Risk message
     """
     cp = __round_down(o3_8h * 1000)
-    return __get_aqi_general_formula_texts(cp, SG_O3_8H, SG_AQI_GENERAL, SG_AQI_RISK, SG_PSI)
+    return __get_table_sub_index(cp, SG_O3_8H_TABLE, SG_AQI_MESSAGES)
 
 
 def get_psi_no2_1h(no2_1h: float) -> (int, str, str):
@@ -56,7 +66,7 @@ def get_psi_no2_1h(no2_1h: float) -> (int, str, str):
     :return: Singapore PSI, General message, Risk message
     """
     cp = __round_down(no2_1h * 1000)
-    return __get_aqi_general_formula_texts(cp, SG_NO2_1H, SG_AQI_GENERAL, SG_AQI_RISK, SG_PSI)
+    return __get_table_sub_index(cp, SG_NO2_1H_TABLE, SG_AQI_MESSAGES)
 
 
 def get_psi_so2_24h(so2_24h: float) -> (int, str, str):
@@ -67,7 +77,7 @@ def get_psi_so2_24h(so2_24h: float) -> (int, str, str):
     :return: Singapore PSI, General message, Risk message
     """
     cp = __round_down(so2_24h * 1000)
-    return __get_aqi_general_formula_texts(cp, SG_SO2_24H, SG_AQI_GENERAL, SG_AQI_RISK, SG_PSI)
+    return __get_table_sub_index(cp, SG_SO2_24H_TABLE, SG_AQI_MESSAGES)
 
 
 def get_psi_co_8h(co_8h: float) -> (int, str, str):
@@ -78,7 +88,7 @@ def get_psi_co_8h(co_8h: float) -> (int, str, str):
     :return: Singapore PSI, General message, Risk message
     """
     cp = __round_down(co_8h, 1)
-    return __get_aqi_general_formula_texts(cp, SG_CO_8H, SG_AQI_GENERAL, SG_AQI_RISK, SG_PSI)
+    return __get_table_sub_index(cp, SG_CO_8H_TABLE, SG_AQI_MESSAGES)
 
 
 def get_psi_pm25_24h(pm25_24h: float) -> (int, str, str):
@@ -89,7 +99,7 @@ def get_psi_pm25_24h(pm25_24h: float) -> (int, str, str):
     :return: PM2.5 Singapore PSI,  General message, Risk message
     """
     cp = __round_down(pm25_24h)
-    return __get_aqi_general_formula_texts(cp, SG_PM25_24H, SG_AQI_GENERAL, SG_AQI_RISK, SG_PSI)
+    return __get_table_sub_index(cp, SG_PM25_24H_TABLE, SG_AQI_MESSAGES)
 
 
 def get_psi_pm10_24h(pm10_24h: float) -> (int, str, str):
@@ -100,11 +110,24 @@ def get_psi_pm10_24h(pm10_24h: float) -> (int, str, str):
     :return: PM10 Singapore PSI,  General message, Risk message
     """
     cp = __round_down(pm10_24h)
-    return __get_aqi_general_formula_texts(cp, SG_PM10_24H, SG_AQI_GENERAL, SG_AQI_RISK, SG_PSI)
+    return __get_table_sub_index(cp, SG_PM10_24H_TABLE, SG_AQI_MESSAGES)
+
+
+# inputs of the calculator: argument name -> (result key, truncation, individual index, zero after truncation means
+# not available, table of truncated concentrations, messages of the individual index)
+SG_PSI_INPUTS = {
+    'o3_8h': ('o3_8h', Truncation(1000), get_psi_o3_8h, False, SG_O3_8H_TABLE, SG_AQI_MESSAGES),
+    'no2_1h': ('no2_1h', Truncation(1000), get_psi_no2_1h, True, SG_NO2_1H_TABLE, SG_AQI_MESSAGES),
+    'so2_24h': ('so2_24h', Truncation(1000), get_psi_so2_24h, False, SG_SO2_24H_TABLE, SG_AQI_MESSAGES),
+    'co_8h': ('co_8h', Truncation(decimals=1), get_psi_co_8h, False, SG_CO_8H_TABLE, SG_AQI_MESSAGES),
+    'pm25_24h': ('pm25_24h', Truncation(), get_psi_pm25_24h, False, SG_PM25_24H_TABLE, SG_AQI_MESSAGES),
+    'pm10_24h': ('pm10_24h', Truncation(), get_psi_pm10_24h, False, SG_PM10_24H_TABLE, SG_AQI_MESSAGES),
+}
 
 
 def get_aqi(o3_8h: float = None, no2_1h: float = None, so2_24h: float = None,
-            co_8h: float = None, pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False) -> (int, {}):
+            co_8h: float = None, pm25_24h: float = None, pm10_24h: float = None, with_level: bool = False,
+            with_codes: bool = False) -> (int, {}):
     """
     Calculates Singapore PSI (Maximum from individual indexes)
 
@@ -115,26 +138,31 @@ def get_aqi(o3_8h: float = None, no2_1h: float = None, so2_24h: float = None,
     :param pm25_24h: PM2.5 average (24h), μg/m3
     :param pm10_24h: PM10 average (24h), μg/m3
     :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+    :param with_codes: Boolean distinguishing whether to return message codes instead of messages (and level index
+                       instead of level name), codes are resolved by catalog.get_message()
     :return: Singapore PSI, dict with tuples (Individual PSI, General message, Risk message)
             keys are: o3_8h, no2_1h, so2_24h, co_8h, pm25_24h, pm10_24h
              -1 means AQI is not available
     """
-    aqi_data = {}
-    if o3_8h:
-        aqi_data['o3_8h'] = get_psi_o3_8h(o3_8h)
-    if no2_1h and bool(__round_down(no2_1h, 3)):
-        aqi_data['no2_1h'] = get_psi_no2_1h(no2_1h)
-    if so2_24h:
-        aqi_data['so2_24h'] = get_psi_so2_24h(so2_24h)
-    if co_8h:
-        aqi_data['co_8h'] = get_psi_co_8h(co_8h)
-    if pm25_24h:
-        aqi_data['pm25_24h'] = get_psi_pm25_24h(pm25_24h)
-    if pm10_24h:
-        aqi_data['pm10_24h'] = get_psi_pm10_24h(pm10_24h)
-    if len(aqi_data) == 0:
-        return AQI_NOT_AVAILABLE, aqi_data
-    value = max(list(map(lambda x: x[0], aqi_data.values())))
-    if not with_level:
-        return value, aqi_data
-    return value, {'level': __get_aqi_level(value, SG_PSI, SG_PSI_LEVELS)}
+    return __get_max_index(SG_PSI_INPUTS, (o3_8h, no2_1h, so2_24h, co_8h, pm25_24h, pm10_24h),
+                           SG_PSI, SG_PSI_LEVELS, with_level, with_codes)
+
+
+def get_category(o3_8h: float = None, no2_1h: float = None, so2_24h: float = None, co_8h: float = None,
+                 pm25_24h: float = None, pm10_24h: float = None) -> int:
+    """
+    Finds level of Singapore PSI without calculating individual indexes and messages
+
+    Same as the level of get_aqi(..., with_level=True), truncated concentrations are compared with precomputed
+    edges of the levels, evaluation stops at the highest level.
+
+    :param o3_8h: O3 average (8h), ppm
+    :param no2_1h: NO2 average (1h), ppm
+    :param so2_24h: SO2 average (24h), ppm
+    :param co_8h: CO average (8h), ppm
+    :param pm25_24h: PM2.5 average (24h), μg/m3
+    :param pm10_24h: PM10 average (24h), μg/m3
+    :return: level index in SG_PSI_LEVELS, -1 means AQI is not available (or outside the levels)
+    """
+    return __get_category(SG_PSI_INPUTS, SG_PSI, (('o3_8h', o3_8h), ('no2_1h', no2_1h), ('so2_24h', so2_24h),
+                                                  ('co_8h', co_8h), ('pm25_24h', pm25_24h), ('pm10_24h', pm10_24h)))
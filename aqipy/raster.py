@@ -0,0 +1,240 @@
+# coding: utf-8
+
+"""
+    Raster mode for gridded model output (requires numpy)
+    2D grids (or 3D with time) of concentrations are evaluated in one vectorized pass, levels are mapped to RGBA
+    through a precomputed palette, rendered tiles are cached by their quantized inputs
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from aqipy import REGISTRY, get_module
+from aqipy.multi import AQHI_INPUTS, get_pollutants, __get_reading, __get_sub_index_arrays
+from aqipy.station import STANDARDS
+from aqipy.units import PRESSURE, TEMPERATURE, convert_reading
+from aqipy.utils import AQI_DTYPE, AQI_NOT_AVAILABLE, __as_array, __is_available_array, __is_defined_array, \
+    __get_max_index_array, __get_band_array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# standard code -> RGB colors of the levels, customary colors of the index charts
+COLORS = {
+    'us': ((0, 228, 0), (255, 255, 0), (255, 126, 0), (255, 0, 0), (143, 63, 151), (126, 0, 35)),
+    'cn': ((0, 228, 0), (255, 255, 0), (255, 126, 0), (255, 0, 0), (153, 0, 76), (126, 0, 35)),
+    'in': ((0, 176, 80), (146, 208, 80), (255, 255, 0), (255, 153, 0), (255, 0, 0), (192, 0, 0)),
+    'eu': ((121, 188, 106), (187, 207, 76), (238, 194, 11), (242, 147, 5), (232, 65, 111)),
+    'uk': ((0, 255, 0), (255, 207, 0), (255, 0, 0), (206, 48, 255)),
+    'au': ((49, 173, 211), (153, 185, 100), (255, 210, 54), (236, 120, 58), (120, 45, 73), (208, 71, 48)),
+    'kr': ((50, 161, 255), (0, 199, 60), (253, 155, 90), (255, 89, 89)),
+    'sg': ((0, 176, 80), (0, 112, 192), (255, 255, 0), (255, 153, 0), (255, 0, 0), (255, 0, 0)),
+    'ca': ((0, 204, 255), (255, 255, 0), (255, 0, 0), (102, 0, 0)),
+    'hk': ((77, 184, 72), (249, 169, 51), (237, 28, 36), (139, 69, 19), (0, 0, 0)),
+}
+# color of cells without index
+NO_DATA_COLOR = (0, 0, 0, 0)
+TILE_CACHE_SIZE = 256
+
+__palettes = {}
+
+
+def get_palette(standard: str, colors: () = None) -> 'np.ndarray':
+    """
+    Compiles colors of the levels of a standard into a palette
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param colors: RGB or RGBA colors of the levels, COLORS of the standard by default
+    :return: read-only uint8 array of shape (levels + 1, 4), the last row is NO_DATA_COLOR,
+             so that palette[level] maps level -1 to it
+    """
+    if colors is None:
+        palette = __palettes.get(standard)
+        if palette is not None:
+            return palette
+    levels = getattr(get_module(standard), REGISTRY[standard][4])
+    rows = COLORS[standard] if colors is None else colors
+    if len(rows) != len(levels):
+        raise ValueError('standard %s has %d levels, got %d colors' % (standard, len(levels), len(rows)))
+    palette = np.array([tuple(color) + (255,) * (4 - len(color)) for color in rows] + [NO_DATA_COLOR],
+                       dtype=np.uint8)
+    palette.flags.writeable = False
+    if colors is None:
+        __palettes[standard] = palette
+    return palette
+
+
+def __prepare(readings: {}, standard: str) -> ({}, {}):
+    # converted inputs of the standard: arrays name -> (array, availability) and truncated arrays,
+    # same caches as multi.__get_sub_index_arrays()
+    arrays = {}
+    truncated = {}
+    if standard in AQHI_INPUTS:
+        for name in AQHI_INPUTS[standard]:
+            if readings.get(name) is not None:
+                c = __as_array(readings[name])
+                arrays[name] = (c, __is_defined_array(c))
+        return arrays, truncated
+    for name, (_, truncation, _, _, _, _) in STANDARDS[standard][0].items():
+        name, val = __get_reading(readings, name)
+        if val is None:
+            continue
+        if name not in arrays:
+            c = __as_array(val)
+            arrays[name] = (c, __is_available_array(c))
+        cache_key = (name, truncation.key)
+        if cache_key not in truncated:
+            truncated[cache_key] = truncation.truncate_array(arrays[name][0])
+    return arrays, truncated
+
+
+def __get_grids(readings: {}, standard: str, arrays: {}, truncated: {}) -> ('np.ndarray', 'np.ndarray',
+                                                                            'np.ndarray', {}):
+    shape = np.broadcast(*[c for c, _ in arrays.values()]).shape if arrays else ()
+    if standard in AQHI_INPUTS:
+        values = [arrays[name][0] if name in arrays else float('nan') for name in AQHI_INPUTS[standard]]
+        aqi, level = get_module(standard).get_aqhi_batch(*values)
+        return aqi, None, level, {}
+    aqi_data = __get_sub_index_arrays(readings, standard, arrays, truncated)
+    if not aqi_data:
+        empty = np.full(shape, AQI_NOT_AVAILABLE, dtype=AQI_DTYPE)
+        return empty, empty.copy(), empty.copy(), {}
+    aqi, dominant = __get_max_index_array(aqi_data, get_pollutants(standard))
+    return aqi, dominant, __get_band_array(aqi, STANDARDS[standard][1]), aqi_data
+
+
+def get_grids(readings: {}, standard: str, units=None, temperature=TEMPERATURE,
+              pressure=PRESSURE) -> ('np.ndarray', 'np.ndarray', 'np.ndarray', {}):
+    """
+    Calculates index grids of one standard for gridded concentrations
+
+    Grids of any shape (e.g. rows x columns or time x rows x columns) are broadcast against each other,
+    results are the same as multi.get_indexes_batch() for every cell.
+
+    :param readings: dict of grids of averages, keys are same as in multi.get_indexes(),
+                     zero or NaN values are treated as missing readings (only NaN for AQHI standards)
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C, or a grid
+    :param pressure: pressure for conversion between volume and mass units, kPa, or a grid
+    :return: tuple of grids (index, dominant pollutant as index in multi.get_pollutants(), level index)
+             and dict of individual index grids, keys are result keys of the calculator, -1 means index is not
+             available, dominant pollutant is None and individual indexes are empty for AQHI standards
+    """
+    readings = convert_reading(readings, units, temperature, pressure)
+    return __get_grids(readings, standard, *__prepare(readings, standard))
+
+
+def __get_tile_key(standard: str, palette: 'np.ndarray', arrays: {}, truncated: {}) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(standard.encode())
+    digest.update(palette.tobytes())
+    for name in sorted(arrays):
+        c, available = arrays[name]
+        digest.update(('%s%r' % (name, c.shape)).encode())
+        digest.update(np.packbits(available).tobytes())
+        if standard in AQHI_INPUTS:
+            # AQHI formulas use concentrations as they are
+            digest.update(np.ascontiguousarray(c).tobytes())
+    for name, key in sorted(truncated):
+        digest.update(('%s%r' % (name, key)).encode())
+        digest.update(np.ascontiguousarray(truncated[(name, key)]).tobytes())
+    return digest.digest()
+
+
+def render_grid(readings: {}, standard: str, colors: () = None, units=None, temperature=TEMPERATURE,
+                pressure=PRESSURE, cache: 'TileCache' = None) -> 'np.ndarray':
+    """
+    Renders gridded concentrations to colors of the index levels
+
+    :param readings: dict of grids of averages, see get_grids()
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :param colors: RGB or RGBA colors of the levels, see get_palette()
+    :param units: units of the concentrations, see units.convert_reading(), units of the calculators by default
+    :param temperature: temperature for conversion between volume and mass units, °C, or a grid
+    :param pressure: pressure for conversion between volume and mass units, kPa, or a grid
+    :param cache: cache of rendered tiles, tiles with equal quantized inputs are rendered once
+    :return: uint8 array of the grid shape + (4,) with RGBA colors, NO_DATA_COLOR where index is not available,
+             read-only if cached
+    """
+    readings = convert_reading(readings, units, temperature, pressure)
+    palette = get_palette(standard, colors)
+    arrays, truncated = __prepare(readings, standard)
+    if cache is None:
+        return palette[__get_grids(readings, standard, arrays, truncated)[2]]
+    key = __get_tile_key(standard, palette, arrays, truncated)
+    tile = cache.get(key)
+    if tile is None:
+        tile = palette[__get_grids(readings, standard, arrays, truncated)[2]]
+        tile.flags.writeable = False
+        cache.put(key, tile)
+    return tile
+
+
+class TileCache:
+    """
+    Bounded LRU cache of rendered tiles keyed on quantized inputs, shared by threads
+
+    Inputs are quantized with the truncations of the standard, so tiles whose concentrations truncate
+    to the same values (e.g. unchanged areas of a new model run) are not rendered again.
+    """
+
+    def __init__(self, maxsize: int = TILE_CACHE_SIZE):
+        """
+        :param maxsize: maximal number of cached tiles
+        """
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> 'np.ndarray':
+        """
+        :param key: digest of quantized inputs
+        :return: cached tile, None if missing
+        """
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key: bytes, tile: 'np.ndarray'):
+        """
+        Adds a tile, evicts the least recently used tiles above maxsize
+
+        :param key: digest of quantized inputs
+        :param tile: rendered tile
+        """
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.maxsize:
+                self._tiles.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all tiles and resets the counters
+        """
+        with self._lock:
+            self._tiles.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> {}:
+        """
+        :return: dict with hits, misses, size and maxsize
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._tiles), 'maxsize': self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._tiles)
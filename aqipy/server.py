@@ -0,0 +1,303 @@
+# coding: utf-8
+
+"""
+    Micro-batching HTTP service on asyncio (standard library only)
+    Concurrent requests are coalesced into one batch per standard, responses carry message ids instead of texts
+
+    python -m aqipy.server --port 8080
+
+    POST /v1/aqi/<standard>       body: reading or list of readings, e.g. {"pm25_24h": 12.3, "o3_8h": 0.031}
+                                  response: {"aqi": 52, "dominant": "pm25_24h", "level": 1, "message": 1} or a list
+    GET  /v1/messages/<standard>  level names and texts, texts of a result are messages[dominant or "aqhi"][message]
+    GET  /v1/metrics              request counters, queue depth and latency percentiles
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+from aqipy.catalog import get_catalog, get_code
+from aqipy.cli import get_level_names
+from aqipy.multi import ALL_STANDARDS, get_indexes_rows
+
+MAX_BATCH = 4096
+MAX_DELAY = 0.002
+LATENCY_SAMPLES = 10000
+# largest accepted request body, bytes
+MAX_BODY = 16 * 1024 * 1024
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+          500: 'Internal Server Error'}
+
+
+def get_messages(standard: str) -> {}:
+    """
+    Returns message catalog of a standard
+
+    :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+    :return: dict with level names and messages: pollutant (or "aqhi") -> list of message pairs by message id,
+             CAQI Europe has no messages
+    """
+    messages = {key: [list(pair) for pair in pairs] for key, pairs in get_catalog(standard).items()}
+    return {'levels': list(get_level_names(standard)), 'messages': messages}
+
+
+class AqiServer:
+    """
+    HTTP service which evaluates readings in micro-batches
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, max_batch: int = MAX_BATCH,
+                 max_delay: float = MAX_DELAY):
+        """
+        :param host: listening address
+        :param port: listening port, 0 picks a free port
+        :param max_batch: maximal number of readings in a batch
+        :param max_delay: maximal time a request waits for other requests to join its batch, seconds
+        """
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.requests = 0
+        self.readings = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._queues = {}
+        self._depth = 0
+        self._workers = []
+        self._server = None
+
+    async def start(self):
+        """
+        Starts listening, the actual port is in self.port
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stops listening and batching
+        """
+        if self._server is not None:
+            self._server.close()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # requests which did not reach a batch get an error instead of waiting forever
+        for queue in self._queues.values():
+            while not queue.empty():
+                item = queue.get_nowait()
+                self._depth -= len(item[0])
+                self._fail([item])
+        self._workers = []
+        self._queues = {}
+        if self._server is not None:
+            # connections waiting for their batches are answered by now
+            await self._server.wait_closed()
+
+    def queue_depth(self) -> int:
+        """
+        :return: number of readings waiting for evaluation
+        """
+        return self._depth
+
+    def metrics(self) -> {}:
+        """
+        :return: dict with counters, queue depth and latency percentiles in milliseconds
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+        return {'requests': self.requests, 'readings': self.readings, 'batches': self.batches,
+                'queue_depth': self.queue_depth(), 'max_queue_depth': self.max_queue_depth,
+                'latency_p50_ms': percentile(0.5), 'latency_p99_ms': percentile(0.99)}
+
+    async def evaluate(self, standard: str, readings: []) -> []:
+        """
+        Evaluates readings in the next batch of the standard
+
+        :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+        :param readings: list of dicts of averages, keys are same as in multi.get_indexes()
+        :return: list of compact responses
+        """
+        queue = self._queues.get(standard)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[standard] = queue
+            self._workers.append(asyncio.ensure_future(self._batch(standard, queue)))
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((readings, future))
+        self._depth += len(readings)
+        self.max_queue_depth = max(self.max_queue_depth, self._depth)
+        return await future
+
+    async def _batch(self, standard: str, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = []
+            try:
+                items.append(await queue.get())
+                size = len(items[0][0])
+                deadline = loop.time() + self.max_delay
+                while size < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    items.append(item)
+                    size += len(item[0])
+                self._depth -= size
+                self.batches += 1
+                # evaluation runs in a thread, so that large batches do not block other connections
+                outcomes = await loop.run_in_executor(None, self._evaluate_batch, standard,
+                                                      [chunk for chunk, _ in items])
+            except asyncio.CancelledError:
+                self._fail(items)
+                raise
+            for (_, future), outcome in zip(items, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result([self._get_response(standard, *r) for r in outcome])
+
+    @staticmethod
+    def _evaluate_batch(standard: str, chunks: []) -> []:
+        # results of every request, or the exception of a failing request
+        try:
+            results = get_indexes_rows([reading for chunk in chunks for reading in chunk], standard)
+        except Exception:
+            # evaluate the requests one by one, so that only the failing request gets the error
+            outcomes = []
+            for chunk in chunks:
+                try:
+                    outcomes.append(get_indexes_rows(chunk, standard))
+                except Exception as e:
+                    outcomes.append(e)
+            return outcomes
+        outcomes = []
+        start = 0
+        for chunk in chunks:
+            outcomes.append(results[start:start + len(chunk)])
+            start += len(chunk)
+        return outcomes
+
+    @staticmethod
+    def _fail(items: []):
+        for _, future in items:
+            if not future.done():
+                future.set_exception(ConnectionAbortedError('server is closing'))
+
+    @staticmethod
+    def _is_reading(reading) -> bool:
+        return isinstance(reading, dict) and all(
+            value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+            for value in reading.values())
+
+    @staticmethod
+    def _get_response(standard: str, aqi: int, dominant: str, level: int) -> {}:
+        return {'aqi': aqi, 'dominant': dominant, 'level': level, 'message': get_code(standard, aqi)}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': 'request body is too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._route(method, path, body)
+                await self._respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> (int, {}):
+        parts = path.strip('/').split('/')
+        if len(parts) == 3 and parts[0] == 'v1' and parts[2] in ALL_STANDARDS:
+            if parts[1] == 'messages':
+                return (200, get_messages(parts[2])) if method == 'GET' else (405, {'error': 'use GET'})
+            if parts[1] == 'aqi':
+                if method != 'POST':
+                    return 405, {'error': 'use POST'}
+                start = time.perf_counter()
+                try:
+                    data = json.loads(body)
+                except ValueError as e:
+                    return 400, {'error': str(e)}
+                bulk = isinstance(data, list)
+                readings = data if bulk else [data]
+                if not all(self._is_reading(reading) for reading in readings):
+                    return 400, {'error': 'readings must be objects with numeric values'}
+                self.requests += 1
+                self.readings += len(readings)
+                try:
+                    results = await self.evaluate(parts[2], readings) if readings else []
+                except (TypeError, ValueError) as e:
+                    return 400, {'error': str(e)}
+                except Exception as e:
+                    return 500, {'error': '%s: %s' % (type(e).__name__, e)}
+                self._latencies.append(time.perf_counter() - start)
+                return 200, results if bulk else results[0]
+        if path.rstrip('/') == '/v1/metrics':
+            return 200, self.metrics()
+        return 404, {'error': 'not found'}
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s'
+                     % (status, STATUS[status].encode(), len(body), body))
+        await writer.drain()
+
+
+def main(argv: [] = None):
+    parser = argparse.ArgumentParser(prog='python -m aqipy.server', description='Air quality index HTTP service')
+    parser.add_argument('--host', default='127.0.0.1', help='listening address')
+    parser.add_argument('--port', type=int, default=8080, help='listening port')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='maximal number of readings in a batch')
+    parser.add_argument('--max-delay', type=float, default=MAX_DELAY, help='maximal batching delay, seconds')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = AqiServer(args.host, args.port, args.max_batch, args.max_delay)
+        await server.start()
+        print('listening on http://%s:%d' % (server.host, server.port))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
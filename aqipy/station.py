@@ -0,0 +1,160 @@
+# coding: utf-8
+
+"""
+    Incremental index state of one station
+    Sub-indices are cached per pollutant and recalculated only when the truncated concentration changes
+"""
+
+from aqipy import REGISTRY, get_module
+from aqipy.units import PRESSURE, TEMPERATURE, convert_reading
+from aqipy.utils import AQI_NOT_AVAILABLE, IndexBands
+
+
+class StandardTables(dict):
+    """
+    Standard code -> (calculator inputs, index bands, level names) for standards which take the maximum of
+    individual indexes, the module of a standard is imported on first access
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.codes = tuple(code for code, spec in REGISTRY.items() if spec[2] is not None)
+
+    def __missing__(self, standard: str) -> ({}, (), ()):
+        if standard not in self.codes:
+            raise KeyError(standard)
+        module = get_module(standard)
+        _, _, inputs, bands, levels, _ = REGISTRY[standard]
+        tables = (getattr(module, inputs), getattr(module, bands), getattr(module, levels))
+        self[standard] = tables
+        return tables
+
+    def __contains__(self, standard) -> bool:
+        return standard in self.codes
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get(self, standard: str, default=None):
+        return self[standard] if standard in self.codes else default
+
+    def keys(self) -> ():
+        return self.codes
+
+    def values(self) -> []:
+        return [self[standard] for standard in self.codes]
+
+    def items(self) -> []:
+        return [(standard, self[standard]) for standard in self.codes]
+
+
+STANDARDS = StandardTables()
+
+
+class Station:
+    """
+    Index state of one station for a standard which takes the maximum of individual indexes
+
+    Every update touches only the given pollutants: a sub-index is recalculated when the truncated concentration
+    changes, the maximum and the dominant pollutant are maintained incrementally. Updates which do not change any
+    truncated concentration are no-ops. AQHI (Canada, Hong Kong) combines all pollutants in one formula and is not
+    supported.
+    """
+
+    def __init__(self, standard: str, units=None, temperature: float = TEMPERATURE, pressure: float = PRESSURE):
+        """
+        :param standard: standard code: us, cn, in, eu, uk, au, kr, sg
+        :param units: units of the concentrations, see units.convert_reading(), units of the calculator by default
+        :param temperature: temperature for conversion between volume and mass units, °C
+        :param pressure: pressure for conversion between volume and mass units, kPa
+        """
+        if standard not in STANDARDS:
+            raise ValueError('unsupported standard: %s' % standard)
+        self.standard = standard
+        self._inputs, levels, self._level_names = STANDARDS[standard]
+        self._bands = IndexBands(levels)
+        self._order = {name: i for i, name in enumerate(self._inputs)}
+        self._units = (units, temperature, pressure)
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all concentrations
+        """
+        # argument name -> (truncated concentration, individual index, individual aqi)
+        self._state = {}
+        self.aqi = AQI_NOT_AVAILABLE
+        # argument name of the dominant pollutant
+        self._dominant = None
+        self._result = None
+
+    @property
+    def dominant(self) -> str:
+        """
+        Result key of the dominant pollutant, e.g. o3_1h for o3_max_1h, same as multi.get_indexes(), None if no index
+        """
+        return None if self._dominant is None else self._inputs[self._dominant][0]
+
+    def update(self, **kwargs: float) -> (int, {}):
+        """
+        Updates concentrations, e.g. update(pm25_24h=12.3), None or zero removes a pollutant
+
+        :param kwargs: concentrations, keys are arguments of the calculator of the standard, e.g. aqi_us.get_aqi
+        :return: same as the calculator of the standard without level, the dict is shared until the next change
+        """
+        if self._units[0] is not None:
+            kwargs = convert_reading(kwargs, *self._units)
+        for name, val in kwargs.items():
+            spec = self._inputs.get(name)
+            if spec is None:
+                raise TypeError('unexpected pollutant: %s' % name)
+            cp = spec[1](val) if val else 0
+            if not val or (spec[3] and not cp):
+                if name in self._state:
+                    del self._state[name]
+                    self._result = None
+                    if name == self._dominant:
+                        self.__rescan()
+                continue
+            old = self._state.get(name)
+            if old is not None and old[0] == cp:
+                continue
+            index = spec[2](val)
+            value = getattr(index, 'aqi', index)
+            self._state[name] = (cp, index, value)
+            self._result = None
+            if self._dominant is None or value > self.aqi or \
+                    (value == self.aqi and self._order[name] <= self._order[self._dominant]):
+                self.aqi = value
+                self._dominant = name
+            elif name == self._dominant:
+                self.__rescan()
+        return self.get_aqi()
+
+    def __rescan(self):
+        self.aqi = AQI_NOT_AVAILABLE
+        self._dominant = None
+        for name in self._inputs:
+            item = self._state.get(name)
+            if item is not None and (self._dominant is None or item[2] > self.aqi):
+                self.aqi = item[2]
+                self._dominant = name
+
+    def get_aqi(self, with_level: bool = False) -> (int, {}):
+        """
+        Returns current index
+
+        :param with_level: Boolean distinguishing whether to print AQI level such as 'good' or 'hazardous'
+        :return: same as the calculator of the standard
+        """
+        if self._dominant is None:
+            return AQI_NOT_AVAILABLE, {}
+        if with_level:
+            i = self._bands.find(self.aqi)
+            return self.aqi, {'level': self._level_names[i] if i >= 0 else ""}
+        if self._result is None:
+            self._result = {spec[0]: self._state[name][1] for name, spec in self._inputs.items() if name in self._state}
+        return self.aqi, self._result
@@ -0,0 +1,308 @@
+# coding: utf-8
+
+"""
+    Rolling averages of raw samples for the index calculators
+    Averages are kept in ring buffers of time-bucketed partial sums, so every sample is an O(1) update,
+    hourly indexes are summarized per day in constant memory per station
+"""
+
+import inspect
+
+from aqipy import REGISTRY, get_module
+from aqipy.utils import AQI_NOT_AVAILABLE, IndexBands
+
+# averaging periods used by the index calculators, seconds
+WINDOWS = {'15m': 900, '1h': 3600, '3h': 10800, '4h': 14400, '8h': 28800, '24h': 86400}
+POLLUTANTS = ('co', 'o3', 'no2', 'so2', 'pm25', 'pm10', 'nh3', 'pb')
+BUCKETS = 60
+SECONDS_PER_DAY = 86400
+# hours of the day of the index values in daily summaries
+REPORT_HOURS = (0, 6, 12, 18)
+
+__calculator_params = {}
+
+
+class RollingMean:
+    """
+    Running mean over a time window
+
+    The window is split into buckets of equal duration, samples older than the window expire bucket by bucket,
+    so the window is exact up to one bucket.
+    """
+    __slots__ = ('window', 'width', '_sums', '_counts', '_sum', '_count', '_filled', '_head')
+
+    def __init__(self, window: float, buckets: int = BUCKETS):
+        """
+        :param window: window duration, seconds
+        :param buckets: number of buckets in the window
+        """
+        self.window = window
+        self.width = window / buckets
+        self._sums = [0.0] * buckets
+        self._counts = [0] * buckets
+        self._sum = 0.0
+        self._count = 0
+        self._filled = 0
+        self._head = None
+
+    def __advance(self, bucket: int):
+        size = len(self._sums)
+        if self._head is None or bucket - self._head >= size:
+            for i in range(size):
+                self._sums[i] = 0.0
+                self._counts[i] = 0
+            self._sum = 0.0
+            self._count = 0
+            self._filled = 0
+        else:
+            for b in range(self._head + 1, bucket + 1):
+                i = b % size
+                if self._counts[i]:
+                    self._sum -= self._sums[i]
+                    self._count -= self._counts[i]
+                    self._filled -= 1
+                    self._sums[i] = 0.0
+                    self._counts[i] = 0
+            if self._count == 0:
+                self._sum = 0.0
+        self._head = bucket
+
+    def add(self, timestamp: float, value: float):
+        """
+        Adds a sample, samples older than the window are ignored
+
+        :param timestamp: sample time, seconds
+        :param value: sample value
+        """
+        bucket = int(timestamp // self.width)
+        if self._head is None or bucket > self._head:
+            self.__advance(bucket)
+        elif bucket <= self._head - len(self._sums):
+            return
+        i = bucket % len(self._sums)
+        if self._counts[i] == 0:
+            self._filled += 1
+        self._sums[i] += value
+        self._counts[i] += 1
+        self._sum += value
+        self._count += 1
+
+    def mean(self, timestamp: float = None, min_coverage: float = 0.0) -> float:
+        """
+        Calculates mean of the samples in the window
+
+        :param timestamp: current time, seconds, expires samples older than the window
+        :param min_coverage: minimal share of buckets with samples
+        :return: mean value, None if there is not enough data
+        """
+        if timestamp is not None and self._head is not None:
+            bucket = int(timestamp // self.width)
+            if bucket > self._head:
+                self.__advance(bucket)
+        if self._count == 0 or self._filled < min_coverage * len(self._sums):
+            return None
+        return self._sum / self._count
+
+
+class StationAverages:
+    """
+    Rolling averages of raw samples of one station over the averaging periods of the index calculators
+    """
+
+    def __init__(self, windows: {} = None, buckets: int = BUCKETS, min_coverage: float = 0.0):
+        """
+        :param windows: averaging periods, dict of period name (e.g. '8h') to duration in seconds
+        :param buckets: number of buckets in every window
+        :param min_coverage: minimal share of buckets with samples for an average to be available
+        """
+        self.windows = WINDOWS if windows is None else windows
+        self.buckets = buckets
+        self.min_coverage = min_coverage
+        self._means = {}
+
+    def add(self, timestamp: float, **samples: float):
+        """
+        Adds raw samples, e.g. add(t, pm25=12.3, o3=0.031), None values are ignored
+
+        :param timestamp: sample time, seconds
+        :param samples: sample values, keys are: co, o3, no2, so2, pm25, pm10, nh3, pb
+        """
+        for pollutant, value in samples.items():
+            if value is None:
+                continue
+            means = self._means.get(pollutant)
+            if means is None:
+                means = {period: RollingMean(window, self.buckets) for period, window in self.windows.items()}
+                self._means[pollutant] = means
+            for mean in means.values():
+                mean.add(timestamp, value)
+
+    def get(self, pollutant: str, period: str, timestamp: float = None) -> float:
+        """
+        Returns rolling average
+
+        :param pollutant: pollutant name, e.g. 'pm25'
+        :param period: averaging period, e.g. '24h'
+        :param timestamp: current time, seconds
+        :return: average value, None if not available
+        """
+        means = self._means.get(pollutant)
+        if means is None or period not in means:
+            return None
+        return means[period].mean(timestamp, self.min_coverage)
+
+    def kwargs(self, calculator, timestamp: float = None) -> {}:
+        """
+        Returns averages as keyword arguments of an index calculator, e.g. aqi_us.get_aqi or aqhi_ca.get_aqhi
+
+        :param calculator: index calculator
+        :param timestamp: current time, seconds
+        :return: dict with averages, keys are parameter names of the calculator such as o3_8h or o3_max_1h
+        """
+        return {name: self.get(pollutant, period, timestamp)
+                for name, pollutant, period in get_calculator_periods(calculator)}
+
+    def calculate(self, calculator, timestamp: float = None, **kwargs):
+        """
+        Calls an index calculator with the current averages
+
+        :param calculator: index calculator, e.g. aqi_us.get_aqi
+        :param timestamp: current time, seconds
+        :param kwargs: additional arguments of the calculator, e.g. with_level=True
+        :return: result of the calculator
+        """
+        return calculator(**self.kwargs(calculator, timestamp), **kwargs)
+
+
+def get_calculator_periods(calculator) -> []:
+    """
+    Lists averaged inputs of an index calculator
+
+    :param calculator: index calculator, e.g. aqi_us.get_aqi
+    :return: list of tuples (parameter name, pollutant, averaging period)
+    """
+    params = __calculator_params.get(calculator)
+    if params is None:
+        params = []
+        for name in inspect.signature(calculator).parameters:
+            parts = name.split('_')
+            if len(parts) < 2 or parts[0] not in POLLUTANTS or parts[-1] not in WINDOWS:
+                continue
+            # CAQI Europe uses hourly maximums, which are hourly averages for an hourly index
+            if len(parts) > 2 and parts[1:-1] != ['max']:
+                continue
+            params.append((name, parts[0], parts[-1]))
+        __calculator_params[calculator] = params
+    return params
+
+
+class DailySummary:
+    """
+    Summary of the hourly indexes of one station in one day
+    """
+    __slots__ = ('day', 'max_aqi', 'dominant', 'hours', 'at')
+
+    def __init__(self, day: int, levels: int, times: int):
+        """
+        :param day: day number, days since 1970-01-01 in local time
+        :param levels: number of levels of the standard
+        :param times: number of report hours
+        """
+        self.day = day
+        self.max_aqi = AQI_NOT_AVAILABLE
+        self.dominant = None
+        self.hours = [0] * levels
+        self.at = [AQI_NOT_AVAILABLE] * times
+
+    def record(self, station) -> ():
+        """
+        :param station: station id
+        :return: tuple (station, day, daily maximum, dominant pollutant at the maximum, tuple of hours per level,
+                 tuple of index values at the report hours), -1 means index is not available
+        """
+        return station, self.day, self.max_aqi, self.dominant, tuple(self.hours), tuple(self.at)
+
+
+class DailyAggregator:
+    """
+    Daily summaries of hourly indexes of many stations
+
+    Every station keeps only the summary of its current day, a summary record is emitted when the first index
+    of the next day arrives. Indexes of days before the current day of the station are ignored.
+    """
+
+    def __init__(self, standard: str, hours: () = REPORT_HOURS, utc_offset: float = 0):
+        """
+        :param standard: standard code: us, cn, in, eu, uk, au, kr, sg, ca, hk
+        :param hours: hours of the day (0-23) of the reported index values
+        :param utc_offset: offset of the local time of the days, seconds, e.g. 3600 for UTC+1
+        """
+        if standard not in REGISTRY:
+            raise ValueError('unsupported standard: %s' % standard)
+        self.standard = standard
+        self.hours = tuple(hours)
+        self.utc_offset = utc_offset
+        self._bands = IndexBands(getattr(get_module(standard), REGISTRY[standard][3]))
+        self._report = {hour: i for i, hour in enumerate(self.hours)}
+        self._summaries = {}
+
+    def add(self, station, timestamp: float, aqi: int, dominant=None) -> ():
+        """
+        Adds an hourly index of a station
+
+        :param station: station id, any hashable value
+        :param timestamp: time of the index, seconds since 1970-01-01 UTC
+        :param aqi: index value, -1 if not available
+        :param dominant: dominant pollutant, or dict of individual indexes returned by the calculator (without level)
+        :return: summary record of the previous day of the station (see DailySummary.record()) on day rollover,
+                 None otherwise
+        """
+        local = timestamp + self.utc_offset
+        day = int(local // SECONDS_PER_DAY)
+        summary = self._summaries.get(station)
+        record = None
+        if summary is None or day > summary.day:
+            if summary is not None:
+                record = summary.record(station)
+            summary = DailySummary(day, len(self._bands.bands), len(self.hours))
+            self._summaries[station] = summary
+        elif day < summary.day:
+            return None
+        if aqi == AQI_NOT_AVAILABLE:
+            return record
+        level = self._bands.find(aqi)
+        if level >= 0:
+            summary.hours[level] += 1
+        hour = int(local % SECONDS_PER_DAY // 3600)
+        if hour in self._report:
+            summary.at[self._report[hour]] = aqi
+        if aqi > summary.max_aqi:
+            summary.max_aqi = aqi
+            if isinstance(dominant, dict):
+                dominant = self.__get_dominant(dominant)
+            summary.dominant = dominant
+        return record
+
+    @staticmethod
+    def __get_dominant(aqi_data: {}) -> str:
+        dominant = None
+        aqi = AQI_NOT_AVAILABLE
+        for key, index in aqi_data.items():
+            value = getattr(index, 'aqi', index)
+            if dominant is None or value > aqi:
+                dominant = key
+                aqi = value
+        return dominant
+
+    def flush(self) -> []:
+        """
+        Emits summaries of the current days of all stations and forgets them, e.g. at the end of the input
+
+        :return: list of summary records, see DailySummary.record()
+        """
+        records = [summary.record(station) for station, summary in self._summaries.items()]
+        self._summaries = {}
+        return records
+
+    def __len__(self) -> int:
+        return len(self._summaries)
@@ -0,0 +1,125 @@
+# coding: utf-8
+
+"""
+    Unit conversion of concentrations: ppm, ppb, μg/m3 and mg/m3
+    Volume and mass units of gases are converted with the molar volume at the given temperature and pressure,
+    values may be scalars or arrays (temperature and pressure too), arrays are converted in bulk
+"""
+
+from aqipy.utils import __as_array
+
+PPM = 'ppm'
+PPB = 'ppb'
+UGM3 = 'ug/m3'
+MGM3 = 'mg/m3'
+UNITS = (PPM, PPB, UGM3, MGM3)
+# alternative spellings -> unit
+UNIT_ALIASES = {'µg/m3': UGM3, 'μg/m3': UGM3, 'µg/m³': UGM3, 'μg/m³': UGM3, 'ug/m³': UGM3, 'mg/m³': MGM3}
+# volume units in ppm, mass units in μg/m3
+UNIT_SCALES = {PPM: 1.0, PPB: 0.001, UGM3: 1.0, MGM3: 1000.0}
+
+# molar masses of gases, g/mol
+MOLAR_MASS = {'co': 28.010, 'o3': 47.998, 'no2': 46.0055, 'so2': 64.066, 'nh3': 17.031, 'pb': 207.2}
+# units of the calculators
+CALCULATOR_UNITS = {'co': PPM, 'o3': PPM, 'no2': PPM, 'so2': PPM, 'nh3': PPM, 'pb': PPM, 'pm25': UGM3, 'pm10': UGM3}
+
+GAS_CONSTANT = 8.314462618
+# reference conditions of the calculator tables: 25 °C, 1 atm
+TEMPERATURE = 25.0
+PRESSURE = 101.325
+
+
+def get_unit(unit: str) -> str:
+    """
+    Normalizes spelling of a unit
+
+    :param unit: unit, e.g. ppb, µg/m³ or ug/m3
+    :return: one of UNITS
+    """
+    unit = UNIT_ALIASES.get(unit, unit)
+    if unit not in UNIT_SCALES:
+        raise ValueError('unsupported unit: %s' % unit)
+    return unit
+
+
+def get_molar_volume(temperature=TEMPERATURE, pressure=PRESSURE):
+    """
+    Calculates molar volume of an ideal gas
+
+    :param temperature: temperature, °C
+    :param pressure: pressure, kPa
+    :return: molar volume, l/mol (24.45 at 25 °C and 1 atm)
+    """
+    return GAS_CONSTANT * (temperature + 273.15) / pressure
+
+
+def get_factor(pollutant: str, from_unit: str, to_unit: str = None, temperature=TEMPERATURE, pressure=PRESSURE):
+    """
+    Finds conversion factor of a pollutant
+
+    :param pollutant: pollutant or argument name of a calculator, e.g. no2 or no2_1h
+    :param from_unit: unit of the values
+    :param to_unit: target unit, unit of the calculators (CALCULATOR_UNITS) by default
+    :param temperature: temperature, °C
+    :param pressure: pressure, kPa
+    :return: factor, converted value = value * factor
+    """
+    pollutant = pollutant.partition('_')[0]
+    if pollutant not in CALCULATOR_UNITS:
+        raise ValueError('unsupported pollutant: %s' % pollutant)
+    from_unit = get_unit(from_unit)
+    to_unit = CALCULATOR_UNITS[pollutant] if to_unit is None else get_unit(to_unit)
+    factor = UNIT_SCALES[from_unit] / UNIT_SCALES[to_unit]
+    from_mass = from_unit in (UGM3, MGM3)
+    if from_mass == (to_unit in (UGM3, MGM3)):
+        return factor
+    if pollutant not in MOLAR_MASS:
+        raise ValueError('%s is given in mass units only' % pollutant)
+    # ppm = μg/m3 * molar volume / molar mass / 1000
+    ratio = get_molar_volume(temperature, pressure) / MOLAR_MASS[pollutant] / 1000
+    return factor * ratio if from_mass else factor / ratio
+
+
+def convert(value, pollutant: str, from_unit: str, to_unit: str = None, temperature=TEMPERATURE, pressure=PRESSURE):
+    """
+    Converts concentrations of a pollutant
+
+    :param value: concentration or array of concentrations (list or array, requires numpy), None stays None
+    :param pollutant: pollutant or argument name of a calculator, e.g. no2 or no2_1h
+    :param from_unit: unit of the values
+    :param to_unit: target unit, unit of the calculators (CALCULATOR_UNITS) by default
+    :param temperature: temperature, °C
+    :param pressure: pressure, kPa
+    :return: converted concentration or array of concentrations
+    """
+    if value is None:
+        return None
+    factor = get_factor(pollutant, from_unit, to_unit, temperature, pressure)
+    if not isinstance(value, (int, float)):
+        value = __as_array(value)
+    if isinstance(factor, float) and factor == 1.0:
+        return value
+    return value * factor
+
+
+def convert_reading(reading: {}, units, temperature=TEMPERATURE, pressure=PRESSURE) -> {}:
+    """
+    Converts a reading to the units of the calculators
+
+    :param reading: dict of concentrations (or arrays), keys are argument names of the calculators, e.g. no2_1h
+    :param units: unit of all values, or dict of units by argument name or pollutant, e.g. {'no2': 'ppb'},
+                  values without unit are not converted
+    :param temperature: temperature, °C
+    :param pressure: pressure, kPa
+    :return: dict with converted concentrations
+    """
+    if units is None:
+        return reading
+    converted = {}
+    for name, value in reading.items():
+        if isinstance(units, str):
+            unit = units
+        else:
+            unit = units.get(name, units.get(name.partition('_')[0]))
+        converted[name] = value if unit is None else convert(value, name, unit, None, temperature, pressure)
+    return converted
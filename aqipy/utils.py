@@ -1,16 +1,700 @@
 import math
+import time
+from bisect import bisect_right
+from functools import lru_cache, wraps
 
 AQI_NOT_AVAILABLE = -1
 AQI_MIN = -1
+# dtype of index arrays returned by batch calculations
+AQI_DTYPE = 'int16'
+# default number of entries of the individual index cache
+SUB_INDEX_CACHE_SIZE = 4096
+
+__numpy = None
+
+
+class Truncation:
+    """
+    Truncation of a concentration before index calculation: scaling (e.g. 1000 for ppm to ppb),
+    then rounding down to decimals or rounding half to even to an integer
+    """
+    __slots__ = ('scale', 'decimals', 'rounding', 'key')
+
+    def __init__(self, scale: int = 1, decimals: int = 0, rounding: bool = False):
+        self.scale = scale
+        self.decimals = decimals
+        self.rounding = rounding
+        # equal keys give equal results
+        self.key = (scale, decimals, rounding)
+
+    def __call__(self, val: float) -> float:
+        val = val * self.scale
+        if self.rounding:
+            return round(val)
+        multiplier = 10 ** self.decimals
+        return math.floor(val * multiplier) / multiplier
+
+    def truncate_array(self, val: 'np.ndarray') -> 'np.ndarray':
+        """
+        Truncates every element of an array (requires numpy), NaN stays NaN
+
+        :param val: concentrations
+        :return: truncated concentrations
+        """
+        import numpy as np
+        val = val * self.scale
+        if self.rounding:
+            return np.rint(val)
+        multiplier = 10 ** self.decimals
+        return np.floor(val * multiplier) / multiplier
+
+    def __repr__(self) -> str:
+        return 'Truncation(scale=%r, decimals=%r, rounding=%r)' % (self.scale, self.decimals, self.rounding)
+
+
+class IndexBands:
+    """
+    Index bands (e.g. US_AQI, CA_AQHI) compiled into sorted edges for bisection lookup
+    """
+    __slots__ = ('bands', '_lows', '_highs')
+
+    def __init__(self, bands: []):
+        self.bands = bands
+        self._lows = tuple(band[0] for band in bands)
+        self._highs = tuple(band[1] for band in bands)
+
+    def find(self, value: float) -> int:
+        """
+        Finds band of the value
+
+        :param value: index value
+        :return: index of the first band containing the value, last band for values above the table,
+                 -1 for values below the table or between bands
+        """
+        highs = self._highs
+        i = bisect_right(self._lows, value) - 1
+        if i < 0:
+            return -1
+        while i and value <= highs[i - 1]:
+            i -= 1
+        if value <= highs[i]:
+            return i
+        if value > highs[-1]:
+            return len(highs) - 1
+        return -1
+
+
+class SubIndex:
+    """
+    Individual index with its category code, behaves like the (index, effect message, caution message) tuple
+
+    Messages are looked up from the module message tables (a pair of effect and caution tuples) on access.
+    """
+    __slots__ = ('aqi', 'category', 'messages')
+
+    def __init__(self, aqi: int, category: int, messages: ((), ())):
+        self.aqi = aqi
+        self.category = category
+        self.messages = messages
+
+    @property
+    def effect(self) -> str:
+        if self.category < 0:
+            return ""
+        return self.messages[0][self.category]
+
+    @property
+    def caution(self) -> str:
+        if self.category < 0:
+            return ""
+        return self.messages[1][self.category]
+
+    def __getitem__(self, item):
+        if item == 0:
+            return self.aqi
+        return (self.aqi, self.effect, self.caution)[item]
+
+    def __len__(self) -> int:
+        return 3
+
+    def __iter__(self):
+        return iter((self.aqi, self.effect, self.caution))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SubIndex):
+            other = tuple(other)
+        return tuple(self) == other
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return 'SubIndex(aqi=%r, category=%r)' % (self.aqi, self.category)
+
+
+class BreakpointTable:
+    """
+    Breakpoint table (e.g. US_PM25_24H with US_AQI) compiled into sorted edges for bisection lookup
+
+    Zero-width rows which are not the last row, such as the (0, 0) placeholders of US_OZONE_1H, define no
+    concentration range and are skipped. Values below the table or between breakpoints give AQI_MIN, values
+    above the table and rows reaching max_aqi saturate.
+
+    Tables with a known truncation grid (decimals) can answer lookups from a dense array of precomputed
+    indexes, see set_dense() and set_dense_tables().
+
+    Scalar lookups run functions generated for the table at first use, see compile().
+    """
+    __slots__ = ('breakpoints', 'aqi', 'max_aqi', 'bands', 'saturated', 'decimals', '_lows', '_highs', '_rows',
+                 '_origin', '_top', '_slopes', '_arrays', '_scale', '_dense_enabled', '_dense', '_compiled')
+    registry = []
+    # generated source -> code object, shared by equal tables
+    generated = {}
+
+    def __init__(self, breakpoints: [[]], aqi: [], max_aqi: int = 0, decimals: int = None):
+        if max_aqi == 0:
+            max_aqi = aqi[-1][1]
+        self.breakpoints = breakpoints
+        self.aqi = aqi
+        self.max_aqi = max_aqi
+        self.bands = IndexBands(aqi)
+        self.saturated = len(aqi)
+        self.decimals = decimals
+        last = len(breakpoints) - 1
+        rows = [i for i in range(len(breakpoints)) if breakpoints[i][0] != breakpoints[i][1] or i == last]
+        self._lows = tuple(breakpoints[i][0] for i in rows)
+        self._highs = tuple(breakpoints[i][1] for i in rows)
+        self._rows = tuple(self.saturated if max_aqi <= aqi[i][1] else i for i in rows)
+        self._origin = tuple(rows)
+        self._top = len(rows) - 1
+        slopes = []
+        for bp, i in zip(breakpoints, aqi):
+            slopes.append((i[1] - i[0]) / (bp[1] - bp[0]) if bp[1] != bp[0] else 0.0)
+        self._slopes = tuple(slopes)
+        self._arrays = None
+        self._scale = 10 ** decimals if decimals is not None else None
+        self._dense_enabled = False
+        self._dense = None
+        self._compiled = None
+        BreakpointTable.registry.append(self)
+
+    def index(self, cp: float) -> int:
+        """
+        Finds breakpoint row of the truncated concentration
+
+        :param cp: truncated concentration
+        :return: row index, AQI_MIN if below the table or between breakpoints, saturated if the index is capped
+        """
+        highs = self._highs
+        i = bisect_right(self._lows, cp) - 1
+        if i < 0:
+            return AQI_MIN
+        while i and cp <= highs[i - 1]:
+            i -= 1
+        if cp <= highs[i]:
+            return self._rows[i]
+        if i == self._top:
+            return self.saturated
+        return AQI_MIN
+
+    def interpolate(self, row: int, cp: float) -> int:
+        bp_low = self.breakpoints[row][0]
+        return round(self._slopes[row] * (cp - bp_low) + self.aqi[row][0])
+
+    def evaluate(self, cp: float) -> int:
+        """
+        Calculates index of the truncated concentration with general formula
+
+        :param cp: truncated concentration
+        :return: index value
+        """
+        if self._dense_enabled:
+            k = self.dense_key(cp)
+            if k >= 0:
+                return self._dense[0][k]
+        return (self._compiled or self.compile())[0](cp)
+
+    def sub_index(self, cp: float, messages: ((), ())) -> SubIndex:
+        """
+        Calculates individual index of the truncated concentration
+
+        :param cp: truncated concentration
+        :param messages: messages of the individual index
+        :return: SubIndex with index value and category (band of the index value)
+        """
+        if self._dense_enabled:
+            k = self.dense_key(cp)
+            if k >= 0:
+                values, categories = self._dense
+                return SubIndex(values[k], categories[k], messages)
+        return (self._compiled or self.compile())[1](cp, messages)
+
+    def get_source(self) -> str:
+        """
+        Generates source of the functions specialized to the table: rows are unrolled into comparisons
+        of the first row whose upper breakpoint is not exceeded (the same row as index() as upper breakpoints
+        are sorted), slopes, intercepts and categories of the rows are constants
+
+        :return: source defining evaluate(cp) -> index value and sub_index(cp, messages) -> SubIndex
+        """
+        saturated = 'SubIndex(%r, %r, messages)' % (self.max_aqi, self.bands.find(self.max_aqi))
+        evaluate = ['def evaluate(cp):']
+        sub_index = ['def sub_index(cp, messages):']
+        for j, row in enumerate(self._rows):
+            evaluate.append('    if cp <= %r:' % (self._highs[j],))
+            sub_index.append(evaluate[-1])
+            if j == 0 or self._lows[j] > self._highs[j - 1]:
+                # below the table or between breakpoints
+                evaluate += ['        if cp < %r:' % (self._lows[j],), '            return 0']
+                sub_index += [evaluate[-2], '            return SubIndex(0, 0, messages)']
+            if row == self.saturated:
+                evaluate.append('        return %r' % (self.max_aqi,))
+                sub_index.append('        return ' + saturated)
+                continue
+            origin = self._origin[j]
+            low, high = self.aqi[origin]
+            formula = 'round(%r * (cp - %r) + %r)' % (self._slopes[origin], self.breakpoints[origin][0], low)
+            evaluate.append('        return ' + formula)
+            sub_index.append('        aqi = ' + formula)
+            category = self.bands.find(low)
+            if category >= 0 and high <= self.bands.bands[category][1]:
+                sub_index.append('        return SubIndex(aqi, %r, messages)' % category)
+            else:
+                sub_index.append('        return SubIndex(aqi, find(aqi), messages)')
+        evaluate.append('    return %r' % (self.max_aqi,))
+        sub_index.append('    return ' + saturated)
+        return '\n'.join(evaluate) + '\n\n\n' + '\n'.join(sub_index) + '\n'
+
+    def compile(self) -> ():
+        """
+        Compiles functions specialized to the table, generated code is cached for equal tables
+
+        :return: tuple of functions evaluate(cp) -> index value and sub_index(cp, messages) -> SubIndex,
+                 same as evaluate() and the individual index of a truncated concentration
+        """
+        source = self.get_source()
+        code = BreakpointTable.generated.get(source)
+        if code is None:
+            code = compile(source, '<BreakpointTable>', 'exec')
+            BreakpointTable.generated[source] = code
+        namespace = {'SubIndex': SubIndex, 'find': self.bands.find}
+        exec(code, namespace)
+        self._compiled = (namespace['evaluate'], namespace['sub_index'])
+        return self._compiled
+
+    def check_range(self, cp: float) -> int:
+        """
+        Checks whether the truncated concentration is covered by the table
+
+        :param cp: truncated concentration
+        :return: 0 inside the table, 1 if the index is clamped (above the table or capped),
+                 -1 if out of range (below the table or between breakpoints)
+        """
+        t = self.index(cp)
+        if t == AQI_MIN:
+            return -1
+        return 1 if t == self.saturated else 0
+
+    def evaluate_array(self, cp: 'np.ndarray') -> 'np.ndarray':
+        """
+        Calculates indexes of an array of truncated concentrations (requires numpy), same as evaluate() for every element
+
+        :param cp: truncated concentrations
+        :return: index values, float array
+        """
+        import numpy as np
+        if self._arrays is None:
+            origin = self._origin
+            self._arrays = (
+                np.array(self._lows, dtype=np.float64),
+                np.array(self._highs, dtype=np.float64),
+                np.array(self._rows) == self.saturated,
+                np.array([self._slopes[i] for i in origin], dtype=np.float64),
+                np.array([self.breakpoints[i][0] for i in origin], dtype=np.float64),
+                np.array([self.aqi[i][0] for i in origin], dtype=np.float64),
+            )
+        lows, highs, saturated, slopes, bp_lows, aqi_lows = self._arrays
+        i = np.searchsorted(lows, cp, side='right') - 1
+        below = i < 0
+        i = np.maximum(i, 0)
+        i -= (i > 0) & (cp <= highs[np.maximum(i - 1, 0)])
+        inside = cp <= highs[i]
+        top = i == len(lows) - 1
+        aqi = np.rint(slopes[i] * (cp - bp_lows[i]) + aqi_lows[i])
+        aqi = np.where(inside & ~saturated[i], aqi, np.where(inside | top, self.max_aqi, 0))
+        return np.where(below, 0, aqi)
+
+    def set_dense(self, enabled: bool = True):
+        """
+        Enables lookup of precomputed indexes for truncated concentrations on the table grid,
+        the dense array is built at first use
+
+        :param enabled: Boolean distinguishing whether to use the dense array
+        """
+        if self.decimals is None:
+            raise ValueError("truncation grid of the table is unknown")
+        self._dense_enabled = enabled
+
+    def dense_key(self, cp: float) -> int:
+        """
+        Finds position of the truncated concentration in the dense array
+
+        :param cp: truncated concentration
+        :return: position, -1 if cp is not on the grid or above the table (bisection lookup applies)
+        """
+        if self._dense is None:
+            self._dense = self.__build_dense()
+        k = round(cp * self._scale)
+        if 0 <= k < len(self._dense[0]) and k / self._scale == cp:
+            return k
+        return -1
+
+    def __build_dense(self) -> ((), ()):
+        values = []
+        categories = []
+        for k in range(int(self._highs[-1] * self._scale) + 2):
+            cp = k / self._scale
+            t = self.index(cp)
+            if t == AQI_MIN:
+                values.append(0)
+                categories.append(0)
+                continue
+            aqi = self.max_aqi if t == self.saturated else self.interpolate(t, cp)
+            values.append(aqi)
+            categories.append(self.bands.find(aqi))
+        return tuple(values), tuple(categories)
+
+
+class BandTable:
+    """
+    Table of concentration bands (e.g. UK_O3_1H), the index is the number of the band containing the truncated
+    concentration, the last band for concentrations outside the table
+    """
+    __slots__ = ('bands', 'last', '_lows', '_highs')
+
+    def __init__(self, bands: [[]], last: bool = False):
+        """
+        :param bands: concentration bands
+        :param last: Boolean distinguishing whether the last of overlapping bands is taken instead of the first
+        """
+        self.bands = bands
+        self.last = last
+        self._lows = tuple(band[0] for band in bands)
+        self._highs = tuple(band[1] for band in bands)
+
+    def evaluate(self, cp: float) -> int:
+        """
+        Calculates index of the truncated concentration
+
+        :param cp: truncated concentration
+        :return: index value
+        """
+        found = len(self.bands)
+        for i in range(len(self.bands)):
+            if self._lows[i] <= cp <= self._highs[i]:
+                found = i + 1
+                if not self.last:
+                    break
+        return found
+
+    def sub_index(self, cp: float, messages: ((), ())) -> SubIndex:
+        """
+        Calculates individual index of the truncated concentration
+
+        :param cp: truncated concentration
+        :param messages: messages of the individual index, one per band
+        :return: SubIndex with index value and category (position of the band)
+        """
+        aqi = self.evaluate(cp)
+        return SubIndex(aqi, aqi - 1, messages)
+
+    def check_range(self, cp: float) -> int:
+        """
+        Checks whether the truncated concentration is covered by the table
+
+        :param cp: truncated concentration
+        :return: 0 inside a band, 1 if the index is clamped (above the table), -1 if out of range
+                 (below the table or between bands)
+        """
+        for low, high in zip(self._lows, self._highs):
+            if low <= cp <= high:
+                return 0
+        return 1 if cp > self._highs[-1] else -1
+
+    def evaluate_array(self, cp: 'np.ndarray') -> 'np.ndarray':
+        """
+        Calculates indexes of an array of truncated concentrations (requires numpy)
+
+        :param cp: truncated concentrations
+        :return: index values, float array
+        """
+        import numpy as np
+        found = np.full(np.shape(cp), float(len(self.bands)))
+        order = range(len(self.bands)) if self.last else reversed(range(len(self.bands)))
+        for i in order:
+            found = np.where((self._lows[i] <= cp) & (cp <= self._highs[i]), i + 1, found)
+        return found
+
+
+class RatioTable:
+    """
+    Index as percentage of an air quality standard (e.g. NEPM standards of Australia), capped at max_aqi
+    """
+    __slots__ = ('standard', 'max_aqi', 'bands')
+
+    def __init__(self, standard: float, max_aqi: int, bands: [] = None):
+        """
+        :param standard: air quality standard, concentration of index 100
+        :param max_aqi: cap of the index
+        :param bands: index bands, categories of sub_index()
+        """
+        self.standard = standard
+        self.max_aqi = max_aqi
+        self.bands = IndexBands(bands) if bands is not None else None
+
+    def evaluate(self, cp: float) -> int:
+        """
+        Calculates index of the truncated concentration
+
+        :param cp: truncated concentration
+        :return: index value
+        """
+        aqi = round(cp / self.standard * 100)
+        if aqi > self.max_aqi:
+            aqi = self.max_aqi
+        return aqi
+
+    def sub_index(self, cp: float, messages: ((), ())) -> SubIndex:
+        """
+        Calculates individual index of the truncated concentration
+
+        :param cp: truncated concentration
+        :param messages: messages of the individual index
+        :return: SubIndex with index value and category (band of the index value, -1 without bands)
+        """
+        aqi = self.evaluate(cp)
+        return SubIndex(aqi, self.bands.find(aqi) if self.bands is not None else AQI_NOT_AVAILABLE, messages)
+
+    def check_range(self, cp: float) -> int:
+        """
+        Checks whether the truncated concentration is covered by the table
+
+        :param cp: truncated concentration
+        :return: 0 inside, 1 if the index is clamped at max_aqi, -1 if out of range (negative)
+        """
+        if cp < 0:
+            return -1
+        return 1 if round(cp / self.standard * 100) > self.max_aqi else 0
+
+    def evaluate_array(self, cp: 'np.ndarray') -> 'np.ndarray':
+        """
+        Calculates indexes of an array of truncated concentrations (requires numpy)
+
+        :param cp: truncated concentrations
+        :return: index values, float array
+        """
+        import numpy as np
+        return np.minimum(np.rint(cp / self.standard * 100), self.max_aqi)
+
+
+def set_dense_tables(enabled: bool = True):
+    """
+    Enables dense lookup arrays for all breakpoint tables with a known truncation grid
+
+    :param enabled: Boolean distinguishing whether to use dense arrays
+    """
+    for table in BreakpointTable.registry:
+        if table.decimals is not None:
+            table.set_dense(enabled)
+
+
+class CategoryEdges:
+    """
+    Categories of an individual index as a step function of the truncated concentration, so that the category
+    is found by bisection without interpolation
+    """
+    __slots__ = ('table', 'bands', 'edges', 'categories')
+
+    def __init__(self, truncation: Truncation, table, bands: IndexBands):
+        """
+        :param truncation: truncation of the concentrations
+        :param table: BreakpointTable, BandTable or RatioTable of the individual index
+        :param bands: index bands of the standard
+        """
+        self.table = table
+        self.bands = bands
+        multiplier = 1 if truncation.rounding else 10 ** truncation.decimals
+        if isinstance(table, BreakpointTable):
+            top = table._highs[-1]
+        elif isinstance(table, BandTable):
+            top = table.bands[-1][1]
+        else:
+            top = table.standard * table.max_aqi / 100
+        # truncated concentrations are steps of the grid, indexes saturate above the top of the table
+        edges = []
+        categories = []
+        for k in range(math.floor(round(top * multiplier, 6)) + 2):
+            cp = k / multiplier
+            category = bands.find(table.evaluate(cp))
+            if not categories or category != categories[-1]:
+                edges.append(cp)
+                categories.append(category)
+        self.edges = tuple(edges)
+        self.categories = tuple(categories)
+
+    def find(self, cp: float) -> int:
+        """
+        Finds category of a truncated concentration
+
+        :param cp: truncated concentration
+        :return: index of the band of the individual index, -1 if outside the bands
+        """
+        i = bisect_right(self.edges, cp) - 1
+        if i < 0:
+            # negative concentrations
+            return self.bands.find(self.table.evaluate(cp))
+        return self.categories[i]
+
+
+class SubIndexCache:
+    """
+    Thread-safe bounded LRU caches of individual indexes, one per table keyed on the truncated concentration,
+    every table belongs to one pollutant of one standard and its messages
+
+    maxsize limits every table separately, the cache holds at most maxsize entries per table in use.
+    Cached individual indexes are shared by all callers and must not be modified.
+    """
+    __slots__ = ('maxsize', '_caches')
+
+    def __init__(self, maxsize: int = SUB_INDEX_CACHE_SIZE):
+        """
+        :param maxsize: maximal number of entries of every table, least recently used entries are evicted
+        """
+        if maxsize <= 0:
+            raise ValueError("cache size must be positive: %r" % maxsize)
+        self.maxsize = maxsize
+        # table -> (messages, cached lookup), the C implementation of lru_cache is thread-safe and
+        # cheaper than a lookup under a lock, its key is the truncated concentration alone
+        self._caches = {}
+
+    def lookup(self, table, cp: float, messages: ((), ()) = None):
+        """
+        Returns cached individual index, calculates and stores it on a miss
+
+        :param table: table of the pollutant
+        :param cp: truncated concentration
+        :param messages: messages of the individual index, None caches index values (table.evaluate()),
+                         lookups of a table with other messages than its first lookup are not cached
+        :return: individual index
+        """
+        entry = self._caches.get(table)
+        if entry is None:
+            factory = table.evaluate if messages is None else lambda c: table.sub_index(c, messages)
+            entry = self._caches.setdefault(table, (messages, lru_cache(self.maxsize)(factory)))
+        if entry[0] is not messages and entry[0] != messages:
+            return table.evaluate(cp) if messages is None else table.sub_index(cp, messages)
+        return entry[1](cp)
+
+    def _infos(self) -> []:
+        return [cached.cache_info() for _, cached in list(self._caches.values())]
+
+    @property
+    def hits(self) -> int:
+        return sum(info.hits for info in self._infos())
+
+    @property
+    def misses(self) -> int:
+        return sum(info.misses for info in self._infos())
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters
+        """
+        self._caches.clear()
+
+    def info(self) -> {}:
+        """
+        :return: dict with hits, misses, size (entries of all tables) and maxsize (entries of every table)
+        """
+        infos = self._infos()
+        return {'hits': sum(info.hits for info in infos), 'misses': sum(info.misses for info in infos),
+                'size': sum(info.currsize for info in infos), 'maxsize': self.maxsize}
+
+    def __len__(self) -> int:
+        return sum(info.currsize for info in self._infos())
+
+
+__sub_index_cache = None
+
+
+def set_sub_index_cache(maxsize: int = SUB_INDEX_CACHE_SIZE) -> SubIndexCache:
+    """
+    Enables memoization of individual indexes of scalar calculations, the cache is shared by all threads
+
+    :param maxsize: maximal number of entries of every table, 0 disables the cache
+    :return: the new cache, None if disabled
+    """
+    global __sub_index_cache
+    __sub_index_cache = SubIndexCache(maxsize) if maxsize else None
+    return __sub_index_cache
+
+
+def get_sub_index_cache() -> SubIndexCache:
+    """
+    :return: cache of individual indexes, None if disabled
+    """
+    return __sub_index_cache
+
+
+__compiled = {}
+
+
+def __get_compiled(key: tuple, factory, *args):
+    entry = __compiled.get(key)
+    if entry is None or entry[0] != args:
+        entry = (args, factory(*args))
+        __compiled[key] = entry
+    return entry[1]
+
+
+def __get_bands(aqi_a: []) -> IndexBands:
+    return __get_compiled((id(aqi_a),), IndexBands, aqi_a)
+
+
+def __get_table(av: [[]], aqi_a: [], max_aqi: int = 0) -> BreakpointTable:
+    return __get_compiled((id(av), id(aqi_a), max_aqi), BreakpointTable, av, aqi_a, max_aqi)
+
+
+def __compile_category_edges(inputs: {}, levels: []) -> {}:
+    bands = IndexBands(levels)
+    return {name: (spec[1], spec[3], CategoryEdges(spec[1], spec[4], bands)) for name, spec in inputs.items()}
+
+
+def __get_category(inputs: {}, levels: [], readings: ()) -> int:
+    # same as the level of the maximum of individual indexes, readings are pairs (argument, concentration)
+    edges = __get_compiled((id(inputs), id(levels)), __compile_category_edges, inputs, levels)
+    top = len(levels) - 1
+    category = AQI_NOT_AVAILABLE
+    for name, val in readings:
+        if not val:
+            continue
+        truncation, skip_zero, steps = edges[name]
+        cp = truncation(val)
+        if skip_zero and not cp:
+            continue
+        i = steps.find(cp)
+        if i > category:
+            category = i
+            if i == top:
+                break
+    return category
 
 
 def __get_aqi_texts(aqi: int, aqi_a: [], a1: [], a2: []) -> (str, str):
-    for i in range(len(aqi_a)):
-        if aqi_a[i][0] <= aqi <= aqi_a[i][1]:
-            return a1[i], a2[i]
-    if aqi > aqi_a[-1][1]:
-        return a1[-1], a2[-1]
-    return "", ""
+    i = __get_bands(aqi_a).find(aqi)
+    if i < 0:
+        return "", ""
+    return a1[i], a2[i]
 
 
 def __round_down(n, decimals=0) -> float:
@@ -19,40 +703,161 @@ def __round_down(n, decimals=0) -> float:
 
 
 def __get_index_data(val: float, array: [[]], max_aqi: int, aqi_a: []) -> (int, [], []):
-    for i in range(len(array)):
-        if array[i][0] <= val <= array[i][1]:
-            if max_aqi <= aqi_a[i][1]:
-                return len(aqi_a), aqi_a[i], array[i]
-            return i, aqi_a[i], array[i]
-        elif val < array[i][0]:
-            return AQI_MIN, aqi_a[0], array[0]
-    return len(aqi_a), aqi_a[-1], array[-1]
+    t = __get_table(array, aqi_a, max_aqi).index(val)
+    if t == AQI_MIN:
+        return AQI_MIN, aqi_a[0], array[0]
+    elif t == len(aqi_a):
+        return t, aqi_a[-1], array[-1]
+    return t, aqi_a[t], array[t]
+
+
+def __get_table_sub_index(cp: float, table, messages: ((), ())) -> SubIndex:
+    # messages None gives the index value only (CAQI Europe has no messages)
+    cache = __sub_index_cache
+    if cache is not None:
+        return cache.lookup(table, cp, messages)
+    return table.evaluate(cp) if messages is None else table.sub_index(cp, messages)
+
+
+def __get_numpy():
+    # numpy is imported on the first batch calculation, scalar calculations do not load it
+    global __numpy
+    if __numpy is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            return None
+        __numpy = numpy
+    return __numpy
+
+
+def __require_numpy():
+    np = __get_numpy()
+    if np is None:
+        raise ImportError("numpy is required for batch calculations: pip install aqipy-atmotech[numpy]")
+    return np
+
+
+def __as_array(val) -> 'np.ndarray':
+    np = __require_numpy()
+    return np.asarray(val, dtype=np.float64)
+
+
+def __round_down_array(n: 'np.ndarray', decimals=0) -> 'np.ndarray':
+    np = __require_numpy()
+    multiplier = 10 ** decimals
+    return np.floor(n * multiplier) / multiplier
+
+
+def __round_array(n: 'np.ndarray') -> 'np.ndarray':
+    # rounds half to even like the built-in round()
+    np = __require_numpy()
+    return np.rint(n)
+
+
+def __is_defined_array(val: 'np.ndarray') -> 'np.ndarray':
+    np = __require_numpy()
+    return ~np.isnan(val)
+
+
+def __is_available_array(val: 'np.ndarray') -> 'np.ndarray':
+    # same as the truth test of scalar calculations, NaN marks a missing reading
+    np = __require_numpy()
+    return (val != 0) & ~np.isnan(val)
+
+
+def __get_table_array(cp: 'np.ndarray', table: BreakpointTable, available: 'np.ndarray' = None) -> 'np.ndarray':
+    np = __require_numpy()
+    aqi = table.evaluate_array(cp)
+    if available is not None:
+        aqi = np.where(available, aqi, AQI_NOT_AVAILABLE)
+    return aqi.astype(AQI_DTYPE)
+
+
+def __get_max_index_array(aqi_data: {}, pollutants: ()) -> ('np.ndarray', 'np.ndarray'):
+    np = __require_numpy()
+    if len(aqi_data) == 0:
+        empty = np.empty(0, dtype=AQI_DTYPE)
+        return empty, empty
+    values = np.broadcast_arrays(*aqi_data.values())
+    aqi_data.update(zip(aqi_data, values))
+    values = np.stack(values)
+    codes = np.array([pollutants.index(key) for key in aqi_data], dtype=AQI_DTYPE)
+    dominant = np.argmax(values, axis=0)
+    aqi = np.take_along_axis(values, dominant[np.newaxis], axis=0)[0]
+    return aqi, np.where(aqi == AQI_NOT_AVAILABLE, AQI_NOT_AVAILABLE, codes[dominant]).astype(AQI_DTYPE)
+
+
+def __get_band_array(aqi: 'np.ndarray', bands: []) -> 'np.ndarray':
+    # same as IndexBands.find for every element
+    np = __require_numpy()
+    bands = __get_bands(bands)
+    lows = np.array(bands._lows, dtype=np.float64)
+    highs = np.array(bands._highs, dtype=np.float64)
+    i = np.searchsorted(lows, aqi, side='right') - 1
+    below = i < 0
+    i = np.maximum(i, 0)
+    i -= (i > 0) & (aqi <= highs[np.maximum(i - 1, 0)])
+    band = np.where((aqi <= highs[i]) | (aqi > highs[-1]), i, -1)
+    return np.where(below, -1, band).astype(AQI_DTYPE)
+
+
+def __added_risk_array(beta: float, c: 'np.ndarray') -> 'np.ndarray':
+    np = __require_numpy()
+    return np.expm1(beta * c) * 100.0
+
+
+def __round_clip_array(n: 'np.ndarray', low: int, high: int) -> 'np.ndarray':
+    # same as max(low, min(high, round(n)))
+    np = __require_numpy()
+    return np.clip(np.rint(n), low, high)
+
+
+def __replace_array(val: 'np.ndarray', old: float, new: float) -> 'np.ndarray':
+    np = __require_numpy()
+    return np.where(val == old, new, val)
+
+
+def __maximum_array(a: 'np.ndarray', b: 'np.ndarray') -> 'np.ndarray':
+    np = __require_numpy()
+    return np.maximum(a, b)
+
+
+def __where_available_array(aqi: 'np.ndarray', available: 'np.ndarray') -> 'np.ndarray':
+    np = __require_numpy()
+    return np.where(available, aqi, AQI_NOT_AVAILABLE).astype(AQI_DTYPE)
+
+
+def __get_weighted_average_array(values: 'np.ndarray', hours: int, min_weight: float) -> 'np.ndarray':
+    # NowCast style weighted average over the last hours of every row, values are ordered in time along axis 1
+    np = __require_numpy()
+    values = __as_array(values)
+    padded = np.concatenate([np.full(values.shape[:-1] + (hours - 1,), np.nan), values], axis=-1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, hours, axis=-1)[..., ::-1]
+    valid = ~np.isnan(windows)
+    c_min = np.min(np.where(valid, windows, np.inf), axis=-1)
+    c_max = np.max(np.where(valid, windows, -np.inf), axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(c_max == 0, 1.0, c_min / c_max)
+    weight = np.minimum(np.maximum(weight, min_weight), 1.0)
+    numerator = np.zeros(weight.shape)
+    denominator = np.zeros(weight.shape)
+    factor = np.ones(weight.shape)
+    for i in range(hours):
+        numerator += np.where(valid[..., i], factor * windows[..., i], 0.0)
+        denominator += np.where(valid[..., i], factor, 0.0)
+        factor = factor * weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average = numerator / denominator
+    return np.where(np.count_nonzero(valid[..., :3], axis=-1) >= 2, average, np.nan)
 
 
 def __get_aqi_general_formula(cp: float, av: [], aqi_a: [], max_aqi: int = 0) -> int:
-    if max_aqi == 0:
-        max_aqi = aqi_a[-1][1]
-    t, i, bp = __get_index_data(cp, av, max_aqi, aqi_a)
-    if t == len(aqi_a):
-        return max_aqi
-    elif t == AQI_MIN:
-        return 0
-    aqi = round((i[1] - i[0]) / (bp[1] - bp[0]) * (cp - bp[0]) + i[0])
-    return aqi
+    return __get_table(av, aqi_a, max_aqi).evaluate(cp)
 
 
 def __get_aqi_general_formula_texts(cp: float, av: [], a1: [], a2: [], aqi_a: [], max_aqi: int = 0) -> (int, str, str):
-    if max_aqi == 0:
-        max_aqi = aqi_a[-1][1]
-    t, i, bp = __get_index_data(cp, av, max_aqi, aqi_a)
-    if t == len(aqi_a):
-        text1, text2 = __get_aqi_texts(max_aqi, aqi_a, a1, a2)
-        return max_aqi, text1, text2
-    elif t == AQI_MIN:
-        return 0, a1[0], a2[0]
-    aqi = round((i[1] - i[0]) / (bp[1] - bp[0]) * (cp - bp[0]) + i[0])
-    text1, text2 = __get_aqi_texts(aqi, aqi_a, a1, a2)
-    return aqi, text1, text2
+    return tuple(__get_table_sub_index(cp, __get_table(av, aqi_a, max_aqi), (a1, a2)))
 
 
 def __added_risk(beta, c):
@@ -61,9 +866,176 @@ def __added_risk(beta, c):
 
 
 def __get_aqi_level(aqi, levels, levels_names):
-    for i in range(len(levels)):
-        if levels[i][0] <= aqi <= levels[i][1]:
-            return levels_names[i]
-    if aqi > levels[-1][1]:
-        return levels_names[-1]
-    return ""
+    i = __get_bands(levels).find(aqi)
+    if i < 0:
+        return ""
+    return levels_names[i]
+
+
+def __get_message_codes(aqi: int, aqi_data: {}, levels: [], with_level: bool) -> {}:
+    # individual indexes with message codes (positions in the message tables), or the level index of the index
+    if with_level:
+        return {'level': __get_bands(levels).find(aqi)}
+    return {key: (sub_index.aqi, sub_index.category) for key, sub_index in aqi_data.items()}
+
+
+# inputs of a calculator (e.g. US_AQI_INPUTS): argument name -> (result key, truncation, individual index,
+# zero after truncation means not available, table of truncated concentrations, messages of the individual index)
+def __get_max_index(inputs: {}, values: (), bands: [], levels: [], with_level: bool = False,
+                    with_codes: bool = False) -> (int, {}):
+    # scalar back end of the calculators, values are in the order of the inputs
+    aqi_data = {}
+    value = None
+    for spec, val in zip(inputs.values(), values):
+        if not val or (spec[3] and not spec[1](val)):
+            continue
+        index = aqi_data[spec[0]] = spec[2](val)
+        aqi = index if index.__class__ is int else index[0]
+        if value is None or aqi > value:
+            value = aqi
+    if value is None:
+        return AQI_NOT_AVAILABLE, aqi_data
+    if with_codes:
+        return value, __get_message_codes(value, aqi_data, bands, with_level)
+    if not with_level:
+        return value, aqi_data
+    return value, {'level': __get_aqi_level(value, bands, levels)}
+
+
+def __get_max_index_batch(inputs: {}, values: (), pollutants: ()) -> ('np.ndarray', {}, 'np.ndarray'):
+    # batch back end of the calculators, values are arrays (or None) in the order of the inputs
+    aqi_data = {}
+    for (key, truncation, _, skip_zero, table, _), val in zip(inputs.values(), values):
+        if val is None:
+            continue
+        c = __as_array(val)
+        cp = truncation.truncate_array(c)
+        available = __is_available_array(c)
+        if skip_zero:
+            available = available & (cp != 0)
+        aqi_data[key] = __get_table_array(cp, table, available)
+    value, dominant = __get_max_index_array(aqi_data, pollutants)
+    return value, aqi_data, dominant
+
+
+# standard code -> (module, {function name: original function}, {argument name: original calculator input}, statistics)
+__instrumented = {}
+
+
+def __new_statistics() -> {}:
+    return {'calls': 0, 'time': 0.0, 'categories': {}}
+
+
+def __count(stats: {}, start: float, category: int):
+    stats['time'] += time.perf_counter() - start
+    stats['calls'] += 1
+    categories = stats['categories']
+    categories[category] = categories.get(category, 0) + 1
+
+
+def __instrument_calculator(fn, stats: {}, bands: IndexBands):
+    @wraps(fn)
+    def calculator(*args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        __count(stats, start, bands.find(result[0]) if result[0] != AQI_NOT_AVAILABLE else AQI_NOT_AVAILABLE)
+        return result
+    return calculator
+
+
+def __instrument_sub_index(fn, stats: {}, truncation: Truncation, table, bands: IndexBands):
+    stats['clamped'] = 0
+    stats['out_of_range'] = 0
+    import inspect
+
+    # argument of the concentration, for calls by keyword
+    name = next(iter(inspect.signature(fn).parameters))
+    # positions depend on the truncated concentration only
+    check_range = lru_cache(maxsize=SUB_INDEX_CACHE_SIZE)(table.check_range)
+
+    @wraps(fn)
+    def sub_index(*args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        __count(stats, start, result.category if isinstance(result, SubIndex) else bands.find(result))
+        position = check_range(truncation(args[0] if args else kwargs[name]))
+        if position > 0:
+            stats['clamped'] += 1
+        elif position < 0:
+            stats['out_of_range'] += 1
+        return result
+    return sub_index
+
+
+def set_instrumentation(enabled: bool = True):
+    """
+    Enables call counters, cumulative time, histograms of categories and counts of clamped or out-of-range inputs
+    for the calculators of all standards and their individual indexes (imports all standard modules)
+
+    Instrumented functions replace the module functions and the functions of the calculator inputs (so that
+    calculators and stations are counted) while enabled, disabled instrumentation costs nothing.
+
+    :param enabled: Boolean distinguishing whether to instrument the calculators
+    """
+    from aqipy import REGISTRY, get_module
+    from aqipy.station import STANDARDS
+
+    for standard, (module, originals, inputs, _) in list(__instrumented.items()):
+        for name, fn in originals.items():
+            setattr(module, name, fn)
+        if inputs:
+            STANDARDS[standard][0].update(inputs)
+        del __instrumented[standard]
+    if not enabled:
+        return
+    for standard, (_, calculator, _, bands, _, _) in REGISTRY.items():
+        module = get_module(standard)
+        bands = IndexBands(getattr(module, bands))
+        stats = __new_statistics()
+        stats['pollutants'] = {}
+        originals = {calculator: getattr(module, calculator)}
+        inputs = {}
+        setattr(module, calculator, __instrument_calculator(originals[calculator], stats, bands))
+        if standard in STANDARDS:
+            specs = STANDARDS[standard][0]
+            for name, spec in specs.items():
+                key, truncation, fn, _, table, _ = spec
+                if fn.__name__ not in originals:
+                    originals[fn.__name__] = fn
+                    stats['pollutants'][key] = __new_statistics()
+                    setattr(module, fn.__name__,
+                            __instrument_sub_index(fn, stats['pollutants'][key], truncation, table, bands))
+                inputs[name] = spec
+                specs[name] = spec[:2] + (getattr(module, fn.__name__),) + spec[3:]
+        __instrumented[standard] = (module, originals, inputs, stats)
+
+
+def get_instrumentation() -> {}:
+    """
+    Exports collected statistics, counters are not synchronized between threads
+
+    :return: dict standard code -> dict with calls, time (seconds), categories (category index -> count,
+             -1 means index is not available) and pollutants: result key -> dict with calls, time, categories,
+             clamped (inputs above the table) and out_of_range (inputs below the table or between breakpoints),
+             empty if instrumentation is disabled
+    """
+    result = {}
+    for standard, (_, _, _, stats) in __instrumented.items():
+        result[standard] = {key: dict(value) if isinstance(value, dict) else value for key, value in stats.items()}
+        result[standard]['pollutants'] = {key: {name: dict(value) if isinstance(value, dict) else value
+                                                for name, value in pollutant.items()}
+                                          for key, pollutant in stats['pollutants'].items()}
+    return result
+
+
+def reset_instrumentation():
+    """
+    Sets all collected statistics to zero
+    """
+    for _, _, _, stats in __instrumented.values():
+        for item in [stats] + list(stats['pollutants'].values()):
+            for key, value in item.items():
+                if key == 'categories':
+                    value.clear()
+                elif key != 'pollutants':
+                    item[key] = 0.0 if key == 'time' else 0
@@ -0,0 +1,165 @@
+# coding: utf-8
+
+"""
+    Benchmarks of the index calculators
+    Every public calculator of the ten standards (with the with_level and with_codes variants, get_category and the
+    individual indexes) is called with concentrations drawn from log-normal distributions typical for urban stations.
+    Reports calls/sec and memory blocks allocated per call (kept alive by the results), compares the results with
+    a JSON baseline.
+
+    python benchmarks/bench_aqipy.py --save                 # write the baseline
+    python benchmarks/bench_aqipy.py --check                # fail when an entry regresses beyond the tolerance
+    python benchmarks/bench_aqipy.py --check --tolerance 0.3 --filter aqi_us
+"""
+
+import argparse
+import inspect
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from aqipy import aqhi_ca, aqhi_hk, aqi_au, aqi_cn, aqi_in, aqi_us, cai_kr, caqi_eu, daqi_uk, psi_sg  # noqa: E402
+
+MODULES = (aqi_us, aqi_cn, aqi_in, caqi_eu, daqi_uk, aqi_au, cai_kr, psi_sg, aqhi_ca, aqhi_hk)
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# pollutant -> (median, geometric standard deviation), ppm or μg/m3
+DISTRIBUTIONS = {
+    'co': (0.4, 2.0),
+    'o3': (0.03, 1.8),
+    'no2': (0.015, 2.0),
+    'so2': (0.002, 2.5),
+    'pm25': (10.0, 2.2),
+    'pm10': (20.0, 2.0),
+    'nh3': (0.01, 2.0),
+    'pb': (0.0002, 2.0),
+}
+SAMPLES = 1000
+
+
+def __get_samples(pollutant: str, rnd: random.Random) -> []:
+    median, gsd = DISTRIBUTIONS[pollutant]
+    return [rnd.lognormvariate(math.log(median), math.log(gsd)) for _ in range(SAMPLES)]
+
+
+def get_cases() -> []:
+    """
+    Lists benchmark cases
+
+    :return: list of tuples (name, function, list of kwargs)
+    """
+    rnd = random.Random(1)
+    cases = []
+    for module in MODULES:
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if not name.startswith('get_') or name.endswith('_batch') or func.__module__ != module.__name__:
+                continue
+            parameters = inspect.signature(func).parameters
+            # concentrations are drawn for pollutants only, flags (with_level, with_codes, ...) get variants
+            params = [p for p in parameters if p.split('_')[0] in DISTRIBUTIONS]
+            flags = [p for p in parameters if p.startswith('with_')]
+            columns = {p: __get_samples(p.split('_')[0], rnd) for p in params}
+            kwargs = [{p: columns[p][i] for p in params} for i in range(SAMPLES)]
+            case = '%s.%s' % (module.__name__.split('.')[-1], name)
+            cases.append((case, func, kwargs))
+            for flag in flags:
+                cases.append(('%s[%s]' % (case, flag), func, [dict(kw, **{flag: True}) for kw in kwargs]))
+    return cases
+
+
+def measure(func, kwargs: [], min_time: float = 0.2) -> {}:
+    """
+    Measures one benchmark case
+
+    :param func: function
+    :param kwargs: arguments of the calls
+    :param min_time: minimal duration of the measurement, seconds
+    :return: dict with calls_per_sec and blocks_per_call
+    """
+    best = 0.0
+    calls = 0
+    total = 0.0
+    while total < min_time or calls < 3 * len(kwargs):
+        start = time.perf_counter()
+        for kw in kwargs:
+            func(**kw)
+        elapsed = time.perf_counter() - start
+        best = max(best, len(kwargs) / elapsed)
+        calls += len(kwargs)
+        total += elapsed
+    # after the warm-up of the timing loop, so that lazily built tables are not counted
+    results = []
+    blocks = sys.getallocatedblocks()
+    for kw in kwargs:
+        results.append(func(**kw))
+    blocks = (sys.getallocatedblocks() - blocks) / len(kwargs)
+    del results
+    return {'calls_per_sec': round(best), 'blocks_per_call': round(blocks, 2)}
+
+
+def compare(results: {}, baseline: {}, tolerance: float) -> []:
+    """
+    Compares results with a baseline
+
+    :param results: dict of case name -> measurement
+    :param baseline: same as results
+    :param tolerance: allowed relative regression, e.g. 0.2
+    :return: list of regression messages
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['calls_per_sec'] < base['calls_per_sec'] * (1 - tolerance):
+            regressions.append('%s: %d calls/sec, baseline %d' % (name, result['calls_per_sec'], base['calls_per_sec']))
+        # absolute slack of half a block for noise of the interpreter
+        if result['blocks_per_call'] > base['blocks_per_call'] * (1 + tolerance) + 0.5:
+            regressions.append('%s: %.2f blocks/call, baseline %.2f' % (name, result['blocks_per_call'],
+                                                                       base['blocks_per_call']))
+    return regressions
+
+
+def main(argv: [] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of the index calculators')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON baseline file')
+    parser.add_argument('--save', action='store_true', help='write results to the baseline')
+    parser.add_argument('--check', action='store_true', help='fail when an entry regresses beyond the tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    parser.add_argument('--filter', default='', help='run only cases containing this text')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimal duration of every case, seconds')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, func, kwargs in get_cases():
+        if args.filter not in name:
+            continue
+        results[name] = measure(func, kwargs, args.min_time)
+        print('%-45s %12d calls/sec %8.2f blocks/call' % (name, results[name]['calls_per_sec'],
+                                                           results[name]['blocks_per_call']))
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print('baseline %s does not exist, run with --save first' % args.baseline)
+            return 2
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print('REGRESSION', message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
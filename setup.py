@@ -19,6 +19,8 @@ setup(
         "Operating System :: OS Independent",
     ],
     install_requires=[],
+    extras_require={'numpy': ['numpy']},
+    entry_points={'console_scripts': ['aqipy=aqipy.cli:main']},
     python_requires='>=3.6',
     setup_requires=['pytest-runner'],
     tests_require=['pytest==4.4.1'],
@@ -1,3 +1,5 @@
+import pytest
+
 from aqipy import aqhi_ca
 
 
@@ -25,3 +27,15 @@ def test_get_aqi_ozone_8h_with_level():
 
 def test_levels():
     assert len(aqhi_ca.CA_AQHI) == len(aqhi_ca.CA_AQHI_LEVELS)
+
+
+def test_get_aqhi_batch():
+    np = pytest.importorskip('numpy')
+    o3 = np.array([[0.015, 0], [0.015, 0.05]])
+    aqhi, category = aqhi_ca.get_aqhi_batch(o3, 0, [100, 0], [20, np.nan])
+    assert aqhi.tolist() == [[6, -1], [6, -1]]
+    assert category.tolist() == [[1, -1], [1, -1]]
+    readings = [(0.015, 0, 100, 20), (0, 0, 0, 0), (0.1, 0.2, 400, 900), (0.031, 0.012, 8.5, 15.2)]
+    aqhi, category = aqhi_ca.get_aqhi_batch(*zip(*readings))
+    assert aqhi.tolist() == [aqhi_ca.get_aqhi(*r)[0] for r in readings]
+    assert [aqhi_ca.CA_AQHI_LEVELS[i] for i in category] == [aqhi_ca.get_aqhi(*r, True)[1]['level'] for r in readings]
@@ -1,3 +1,5 @@
+import pytest
+
 from aqipy import aqi_us
 
 
@@ -78,3 +80,51 @@ def aqi(a:[]):
         assert a[i][0] < a[i][1]
         if i < a_len - 1:
             assert a[i][1] < a[i + 1][0]
+
+
+def test_get_aqi_batch():
+    np = pytest.importorskip('numpy')
+    aqi, aqi_data, dominant = aqi_us.get_aqi_batch(o3_8h=[0.07853333, 100, 0, np.nan], co_8h=5,
+                                                   o3_1h=[0.0001, 0.1, 0.2, 0])
+    assert aqi.tolist() == [126, 300, 195, 56]
+    assert aqi_data['o3_8h'].tolist() == [126, 300, -1, -1]
+    assert aqi_data['co_8h'].tolist() == [56, 56, 56, 56]
+    assert aqi_data['o3_1h'].tolist() == [-1, 0, 195, -1]
+    assert [aqi_us.US_AQI_POLLUTANTS[i] for i in dominant] == ['o3_8h', 'o3_8h', 'o3_1h', 'co_8h']
+    for o3_8h in (0.054, 0.0711, 0.0859, 0.2, 0.3):
+        assert aqi_us.get_aqi_batch(o3_8h=[o3_8h])[0][0] == aqi_us.get_aqi(o3_8h=o3_8h)[0]
+    aqi, aqi_data, dominant = aqi_us.get_aqi_batch()
+    assert len(aqi) == 0
+
+
+def test_nowcast():
+    nowcast = aqi_us.NowCast('pm25')
+    assert nowcast.push(40) is None
+    assert nowcast.get_aqi()[0] == -1
+    assert nowcast.push(40) == 40
+    assert nowcast.get_aqi()[0] == aqi_us.get_aqi_pm25_24h(40)[0]
+    assert nowcast.push(None) == 40
+    assert nowcast.push(None) is None
+    nowcast = aqi_us.NowCast('pm25')
+    for value in (50, 80, 75, 90, 82, 53, 64, 74, 21, 10, 16, 13):
+        nowcast.push(value)
+    weights = [0.5 ** i for i in range(12)]
+    values = (13, 16, 10, 21, 74, 64, 53, 82, 90, 75, 80, 50)
+    assert abs(nowcast.concentration - sum(w * v for w, v in zip(weights, values)) / sum(weights)) < 1e-9
+    with pytest.raises(ValueError):
+        aqi_us.NowCast('co')
+
+
+def test_nowcast_batch():
+    np = pytest.importorskip('numpy')
+    values = np.array([[50, 80, 75, 90, 82, 53, 64, 74, 21, 10, 16, 13],
+                       [np.nan, 0.05, np.nan, np.nan, 0.06, 0.07, 0.07, 0.08, 0.1, 0.09, 0.09, 0.05]])
+    nowcast = aqi_us.NowCast('pm25')
+    expected = [nowcast.push(v) for v in values[0]]
+    concentration, aqi = aqi_us.get_nowcast_batch(values[:1], 'pm25')
+    assert np.isnan(concentration[0, 0])
+    assert concentration[0, 1:].tolist() == expected[1:]
+    assert aqi[0, -1] == aqi_us.get_aqi_pm25_24h(expected[-1])[0]
+    concentration, aqi = aqi_us.get_nowcast_batch(values[1:], 'o3')
+    assert aqi[0, :4].tolist() == [-1, -1, -1, -1]
+    assert aqi[0, -1] == aqi_us.get_aqi_o3_8h(concentration[0, -1])[0]
@@ -0,0 +1,18 @@
+import importlib.util
+import os
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'benchmarks', 'bench_aqipy.py')
+
+
+def test_benchmark_cases():
+    spec = importlib.util.spec_from_file_location('bench_aqipy', BENCHMARKS)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+    cases = bench.get_cases()
+    names = [name for name, _, _ in cases]
+    assert 'aqi_us.get_aqi[with_level]' in names and 'aqi_us.get_aqi[with_codes]' in names
+    assert 'aqi_us.get_category' in names and 'aqhi_ca.get_aqhi[with_codes]' in names
+    assert len(set(names)) == len(names)
+    # one call of every case, so that signature changes of the calculators break here
+    for name, func, kwargs in cases:
+        func(**kwargs[0])
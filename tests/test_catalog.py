@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import aqipy
+from aqipy import aqhi_ca, aqhi_hk, aqi_us, catalog
+from aqipy.station import STANDARDS
+
+
+def test_codes_resolve_to_messages():
+    rnd = random.Random(3)
+    for standard in STANDARDS:
+        if standard == 'eu':
+            continue
+        calculator = aqipy.get_calculator(standard)
+        inputs = STANDARDS[standard][0]
+        for _ in range(300):
+            kwargs = {name: rnd.choice([None, 0, rnd.uniform(0, 1), rnd.uniform(0, 500)]) for name in inputs}
+            aqi, aqi_data = calculator(**kwargs)
+            assert calculator(**kwargs, with_codes=True) == (aqi, {key: (sub_index[0], sub_index.category)
+                                                                   for key, sub_index in aqi_data.items()})
+            for key, (sub_aqi, code) in calculator(**kwargs, with_codes=True)[1].items():
+                assert (sub_aqi,) + catalog.get_message(standard, key, code) == tuple(aqi_data[key])
+            if not aqi_data:
+                continue
+            dominant = max(aqi_data, key=lambda k: aqi_data[k][0])
+            assert catalog.get_code(standard, aqi) == aqi_data[dominant].category
+            level = calculator(**kwargs, with_level=True)[1]['level']
+            code = calculator(**kwargs, with_level=True, with_codes=True)[1]['level']
+            assert level == (STANDARDS[standard][2][code] if code >= 0 else '')
+
+
+def test_aqhi_codes():
+    for a in range(1, 12):
+        reading = (0.03, 0.02, 0.001, 10 * a * a, 10)
+        aqhi, effect, caution = aqhi_hk.get_aqhi(*reading)
+        _, code = aqhi_hk.get_aqhi(*reading, with_codes=True)
+        assert catalog.get_message('hk', 'aqhi', code) == (effect, caution)
+        assert catalog.get_code('hk', aqhi) == code
+        aqhi, general, risk = aqhi_ca.get_aqhi(0.03, 0.02, 10 * a * a, 10)
+        assert catalog.get_message('ca', 'aqhi', aqhi_ca.get_aqhi(0.03, 0.02, 10 * a * a, 10, with_codes=True)[1]) == \
+            (general, risk)
+    assert aqhi_ca.get_aqhi(None, 0.02, 10, 10, with_codes=True) == (-1, -1)
+    assert catalog.get_message('ca', 'aqhi', -1) == ("", "")
+
+
+def test_translation():
+    assert catalog.get_catalog('eu') == {}
+    with pytest.raises(ValueError):
+        catalog.get_catalog('us', 'de')
+    with pytest.raises(ValueError):
+        catalog.add_translation('us', 'de', {'pm25_24h': ()})
+    translated = {key: [('e%d' % i, 'c%d' % i) for i in range(len(pairs))] for key, pairs in catalog.get_catalog('us').items()}
+    catalog.add_translation('us', 'de', translated)
+    assert catalog.get_languages('us') == ('en', 'de')
+    _, aqi_data = aqi_us.get_aqi(pm25_24h=35.51, with_codes=True)
+    assert catalog.get_message('us', 'pm25_24h', aqi_data['pm25_24h'][1], 'de') == ('e2', 'c2')
@@ -0,0 +1,36 @@
+import json
+
+from aqipy import aqi_us, cli
+
+CSV = "station,pm25,o3_8h,o3_3h,no2_3h,pm25_3h,pm10_3h\na,35.51,0.0701,0.03,0.01,10,20\nb,,,,,,\nc,5,0.031,0.02,0.01,5,10\n"
+
+
+def test_csv(tmp_path, capsys):
+    path = tmp_path / 'readings.csv'
+    path.write_text(CSV)
+    assert cli.main(['--standard', 'us', '--map', 'pm25=pm25_24h', '--keep', 'station', str(path)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    aqi, _ = aqi_us.get_aqi(pm25_24h=35.51, o3_8h=0.0701)
+    assert lines == ['station,aqi,dominant,level', 'a,%d,pm25_24h,unhealthy sensitive' % aqi, 'b,-1,,',
+                     'c,29,o3_8h,good']
+    assert cli.main(['--standard', 'us', '--map', 'pm25=pm25_24h', '--workers', '2', '--chunk-size', '1',
+                     str(path)]) == 0
+    assert capsys.readouterr().out.splitlines()[1:] == [line.split(',', 1)[1] for line in lines[1:]]
+
+
+def test_jsonl(tmp_path, capsys):
+    path = tmp_path / 'readings.jsonl'
+    path.write_text('{"o3_3h": 0.03, "no2_3h": 0.01, "pm25_3h": 10, "pm10_3h": 20, "id": 1}\n{"id": 2}\n')
+    assert cli.main(['--standard', 'ca', '--keep', 'id', '--output-format', 'jsonl', str(path)]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows == [{'id': 1, 'aqi': 3, 'dominant': None, 'level': 'low'},
+                    {'id': 2, 'aqi': -1, 'dominant': None, 'level': ''}]
+
+
+def test_malformed_cell(tmp_path, capsys):
+    path = tmp_path / 'readings.csv'
+    path.write_text("station,pm25_24h,o3_8h\na,abc,0.031\nb,n/a,\nc,12.3,0.031\n")
+    assert cli.main(['--standard', 'us', '--keep', 'station', '--chunk-size', '2', str(path)]) == 0
+    out, err = capsys.readouterr()
+    assert out.splitlines() == ['station,aqi,dominant,level', 'a,29,o3_8h,good', 'b,-1,,', 'c,51,pm25_24h,moderate']
+    assert "row 1, column pm25_24h: 'abc' is not a number" in err and "row 2, column pm25_24h: 'n/a'" in err
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from aqipy import columnar, multi
+
+
+def test_get_indexes_mapped(tmp_path):
+    np = pytest.importorskip('numpy')
+    rng = np.random.default_rng(3)
+    rows = 10000
+    pm25 = rng.lognormal(2.3, 0.8, rows).astype(np.float32)
+    pm25[::7] = np.nan
+    pm25.tofile(str(tmp_path / 'pm25_24h.f32'))
+    o3 = rng.lognormal(-3.5, 0.5, rows)
+    np.save(str(tmp_path / 'o3_8h.npy'), o3)
+    inputs = {'pm25_24h': str(tmp_path / 'pm25_24h.f32'), 'o3_8h': str(tmp_path / 'o3_8h.npy')}
+    for standard in ('in', 'sg'):
+        paths = columnar.get_indexes_mapped(standard, inputs, str(tmp_path / standard), dtype='float32',
+                                            block_size=1000)
+        assert all(os.path.exists(path) for path in paths.values())
+        expected = multi.get_indexes_batch({'pm25_24h': pm25.astype(np.float64), 'o3_8h': o3}, (standard,))[standard]
+        for name, column in zip(('aqi', 'dominant', 'level'), expected):
+            assert (np.load(paths[name]) == column).all()
+        sub_indexes = multi.get_sub_indexes_batch({'pm25_24h': pm25.astype(np.float64), 'o3_8h': o3}, standard)
+        assert (np.load(paths['aqi_pm25_24h']) == sub_indexes['pm25_24h']).all()
+        assert (np.load(paths['aqi_co_8h']) == -1).all()
+    paths = columnar.get_indexes_mapped('ca', {'o3_3h': o3}, str(tmp_path / 'ca'))
+    assert (np.load(paths['aqi']) == -1).all()
+    with pytest.raises(ValueError):
+        columnar.get_indexes_mapped('us', {'o3_8h': o3, 'pm25_24h': o3[:10]}, str(tmp_path / 'us'))
+
+
+def test_get_indexes_mapped_units(tmp_path):
+    np = pytest.importorskip('numpy')
+    rng = np.random.default_rng(5)
+    no2 = rng.lognormal(3.5, 0.8, 5000)
+    temperature = rng.uniform(-10, 35, 5000)
+    paths = columnar.get_indexes_mapped('eu', {'no2_max_1h': no2}, str(tmp_path), block_size=700, units='ug/m3',
+                                        temperature=temperature)
+    expected = multi.get_indexes_batch({'no2_max_1h': no2}, ('eu',), 'ug/m3', temperature)['eu'][0]
+    assert (np.load(paths['aqi']) == expected).all()
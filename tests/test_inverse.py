@@ -0,0 +1,48 @@
+import math
+
+from aqipy import aqi_cn, aqi_us, caqi_eu, daqi_uk, inverse
+from aqipy.station import STANDARDS
+
+
+def test_inverse_us_pm25():
+    c = inverse.get_concentration('us', 'pm25_24h', 151)
+    assert c == 55.5
+    assert aqi_us.get_aqi_pm25_24h(c).aqi >= 151
+    assert aqi_us.get_aqi_pm25_24h(c - 1e-9).aqi < 151
+
+
+def test_inverse_not_reached():
+    # individual index of O3 8h is capped at 300
+    assert inverse.get_concentration('us', 'o3_8h', 301) is None
+    assert inverse.get_thresholds('us', 301)['pm25_24h'] is not None
+
+
+def test_inverse_band_and_skip_zero():
+    c = inverse.get_concentration('uk', 'pm25_24h', 4)
+    assert daqi_uk.get_daqi(pm25_24h=c)[0] == 4
+    assert daqi_uk.get_daqi(pm25_24h=c - 1e-9)[0] == 3
+    # truncated zero is not an available reading of US O3 1h
+    assert inverse.get_concentration('us', 'o3_1h', 0) > 0
+
+
+def test_inverse_levels_are_monotonic():
+    for standard, (inputs, bands, _) in STANDARDS.items():
+        for pollutant in inputs:
+            thresholds = inverse.get_level_thresholds(standard, pollutant)
+            assert len(thresholds) == len(bands)
+            reached = [t for t in thresholds if t is not None]
+            assert reached == sorted(reached)
+            assert all(not math.isnan(t) for t in reached)
+    c = inverse.get_concentration('eu', 'no2_max_1h', 50)
+    assert caqi_eu.get_caqi(no2_max_1h=c)[0] >= 50
+
+
+def test_inverse_gaps():
+    # above the threshold of 28, but between the rows (0, 50) and (51, 150) of CN PM2.5
+    assert inverse.get_concentration('cn', 'pm25_24h', 28) < 50.5
+    assert aqi_cn.get_aqi(pm25_24h=50.5)[0] == 0
+    low, high = inverse.get_gaps('cn', 'pm25_24h')[0]
+    assert (low, high) == (50.1, 51.0)
+    assert aqi_cn.get_aqi(pm25_24h=low)[0] == aqi_cn.get_aqi(pm25_24h=high - 1e-9)[0] == 0
+    assert aqi_cn.get_aqi(pm25_24h=low - 1e-9)[0] == 50 and aqi_cn.get_aqi(pm25_24h=high)[0] == 51
+    assert inverse.get_gaps('us', 'pm25_24h') == [] and inverse.get_gaps('uk', 'pm25_24h') == []
@@ -0,0 +1,42 @@
+import pytest
+
+from aqipy import multi, aqi_us, caqi_eu, aqhi_ca, aqhi_hk
+
+READINGS = [
+    {'pm25_24h': 35.51, 'pm10_24h': 80, 'o3_8h': 0.0701, 'o3_1h': 0.08, 'no2_1h': 0.05, 'co_8h': 1.2, 'o3_3h': 0.03,
+     'no2_3h': 0.02, 'so2_3h': 0.001, 'pm25_3h': 30, 'pm10_3h': 60},
+    {'pm25_24h': 5, 'o3_8h': 0.031},
+    {},
+]
+
+
+def test_get_indexes():
+    for reading in READINGS:
+        result = multi.get_indexes(reading)
+        assert set(result) == set(multi.ALL_STANDARDS)
+        aqi, data = aqi_us.get_aqi(**{k: v for k, v in reading.items() if k in aqi_us.US_AQI_INPUTS})
+        assert result['us'][0] == aqi
+        assert result['us'][1] == (max(data, key=lambda k: data[k].aqi) if data else None)
+        caqi, _ = caqi_eu.get_caqi(o3_max_1h=reading.get('o3_1h'), no2_max_1h=reading.get('no2_1h'),
+                                   pm25_24h=reading.get('pm25_24h'), pm10_24h=reading.get('pm10_24h'),
+                                   co_1h=reading.get('co_1h'))
+        assert result['eu'][0] == caqi
+    result = multi.get_indexes(READINGS[0], ('ca', 'hk'))
+    assert result['ca'][0] == aqhi_ca.get_aqhi(0.03, 0.02, 30, 60)[0]
+    assert result['hk'][0] == aqhi_hk.get_aqhi(0.03, 0.02, 0.001, 30, 60)[0]
+    assert multi.get_indexes({}, ('us', 'ca')) == {'us': (-1, None, -1), 'ca': (-1, None, -1)}
+
+
+def test_get_indexes_batch():
+    np = pytest.importorskip('numpy')
+    names = set().union(*READINGS)
+    readings = {name: np.array([r.get(name, np.nan) for r in READINGS]) for name in names}
+    batch = multi.get_indexes_batch(readings)
+    for i, reading in enumerate(READINGS):
+        result = multi.get_indexes(reading)
+        for standard in multi.ALL_STANDARDS:
+            aqi, dominant, category = batch[standard]
+            if dominant is not None:
+                pollutants = multi.get_pollutants(standard)
+                assert (pollutants[dominant[i]] if dominant[i] >= 0 else None) == result[standard][1]
+            assert (aqi[i], category[i]) == (result[standard][0], result[standard][2])
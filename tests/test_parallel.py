@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from aqipy import aqi_us, aqhi_ca, multi, parallel
+
+
+def test_get_indexes_parallel():
+    np = pytest.importorskip('numpy')
+    rnd = random.Random(5)
+    rows = 5000
+    readings = {
+        'pm25_24h': np.array([rnd.choice([0, np.nan, rnd.uniform(0, 300)]) for _ in range(rows)]),
+        'o3_8h': np.array([rnd.uniform(0, 0.2) for _ in range(rows)]),
+        'o3_1h': np.array([rnd.uniform(0, 0.3) for _ in range(rows)]),
+        'o3_3h': 0.03,
+        'no2_3h': 0.01,
+        'pm10_3h': 20,
+        'pm25_3h': np.array([rnd.uniform(0, 100) for _ in range(rows)]),
+    }
+    aqi, dominant, category = parallel.get_indexes_parallel('us', readings, workers=2, chunk_size=1000)
+    for i in range(0, rows, 97):
+        pm25 = readings['pm25_24h'][i]
+        expected, data = aqi_us.get_aqi(pm25_24h=None if np.isnan(pm25) else pm25, o3_8h=readings['o3_8h'][i],
+                                        o3_1h=readings['o3_1h'][i])
+        assert aqi[i] == expected
+        assert multi.get_pollutants('us')[dominant[i]] == max(data, key=lambda k: data[k].aqi)
+    inline = parallel.get_indexes_parallel('us', readings, workers=1)
+    assert all((a == b).all() for a, b in zip(inline, (aqi, dominant, category)))
+    aqhi, dominant, category = parallel.get_indexes_parallel('ca', readings, workers=2, chunk_size=1000)
+    assert aqhi[10] == aqhi_ca.get_aqhi(0.03, 0.01, readings['pm25_3h'][10], 20)[0]
+    assert (dominant == -1).all()
+    aqi, _, _ = parallel.get_indexes_parallel('kr', {'o3_3h': readings['pm25_3h']}, workers=2, chunk_size=1000)
+    assert (aqi == -1).all()
@@ -0,0 +1,68 @@
+import pytest
+
+from aqipy import multi, raster
+
+
+def test_get_grids():
+    np = pytest.importorskip('numpy')
+    rng = np.random.default_rng(5)
+    pm25 = rng.lognormal(2.5, 1.0, (3, 20, 30))
+    pm25[0, :5] = np.nan
+    o3 = rng.lognormal(-3.5, 0.5, (20, 30))
+    readings = {'pm25_24h': pm25, 'o3_8h': o3, 'pm25_3h': pm25, 'o3_3h': o3, 'no2_3h': 0.02}
+    columns = {name: np.broadcast_to(value, pm25.shape).ravel() for name, value in readings.items()}
+    for standard in multi.ALL_STANDARDS:
+        aqi, dominant, level, aqi_data = raster.get_grids(readings, standard)
+        expected = multi.get_indexes_batch(columns, (standard,))[standard]
+        assert aqi.shape == level.shape == pm25.shape
+        assert (aqi.ravel() == expected[0]).all()
+        assert (level.ravel() == expected[2]).all()
+        if dominant is not None:
+            assert (dominant.ravel() == expected[1]).all()
+            assert all(grid.shape == pm25.shape for grid in aqi_data.values())
+        image = raster.render_grid(readings, standard)
+        assert image.shape == pm25.shape + (4,) and image.dtype == np.uint8
+        assert (image[level == -1] == raster.NO_DATA_COLOR).all()
+        assert (image[level == 0] == raster.get_palette(standard)[0]).all()
+    aqi, dominant, level, aqi_data = raster.get_grids({}, 'us')
+    assert aqi == -1 and aqi_data == {}
+
+
+def test_get_palette():
+    np = pytest.importorskip('numpy')
+    palette = raster.get_palette('eu')
+    assert palette.shape == (6, 4)
+    assert tuple(palette[-1]) == raster.NO_DATA_COLOR
+    assert raster.get_palette('eu') is palette
+    palette = raster.get_palette('ca', [(0, 0, 255), (0, 255, 0), (255, 0, 0, 128), (0, 0, 0)])
+    assert tuple(palette[2]) == (255, 0, 0, 128) and tuple(palette[0]) == (0, 0, 255, 255)
+    image = raster.render_grid({'pm25_24h': np.array([[5.0, 500.0]])}, 'eu', colors=[(i, i, i) for i in range(5)])
+    assert image[0, 0, 0] == 0 and image[0, 1, 0] == 4
+    with pytest.raises(ValueError):
+        raster.get_palette('us', [(0, 0, 0)])
+
+
+def test_tile_cache():
+    np = pytest.importorskip('numpy')
+    cache = raster.TileCache(2)
+    pm25 = np.arange(64).reshape(8, 8) * 4.5 + 0.02
+    pm25[0, 0] = 0
+    tile = raster.render_grid({'pm25_24h': pm25}, 'us', cache=cache)
+    assert not tile.flags.writeable
+    assert (tile == raster.render_grid({'pm25_24h': pm25}, 'us')).all()
+    # same truncated concentrations
+    pm25_next = pm25 + 0.01
+    pm25_next[0, 0] = 0
+    assert raster.render_grid({'pm25_24h': pm25_next}, 'us', cache=cache) is tile
+    assert cache.info() == {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2}
+    # zero is missing, a small positive value is not
+    other = pm25.copy()
+    other[0, 0] = 0.01
+    assert raster.render_grid({'pm25_24h': other}, 'us', cache=cache) is not tile
+    raster.render_grid({'pm25_24h': pm25}, 'cn', cache=cache)
+    assert len(cache) == 2
+    assert raster.render_grid({'pm25_24h': pm25}, 'us', cache=cache) is not tile
+    cache.clear()
+    assert cache.info() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}
+    with pytest.raises(ValueError):
+        raster.TileCache(0)
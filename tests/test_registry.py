@@ -0,0 +1,73 @@
+import inspect
+import subprocess
+import sys
+
+import pytest
+
+import aqipy
+from aqipy.station import STANDARDS
+
+
+def test_registry_matches_calculators():
+    assert aqipy.get_standards() == ('us', 'cn', 'in', 'eu', 'uk', 'au', 'kr', 'sg', 'ca', 'hk')
+    for standard in aqipy.get_standards():
+        params = inspect.signature(aqipy.get_calculator(standard)).parameters
+        assert tuple(p for p in params if not p.startswith('with_')) == aqipy.get_arguments(standard)
+        if standard in STANDARDS:
+            assert set(STANDARDS[standard][0]) == set(aqipy.get_arguments(standard))
+    assert aqipy.get_periods('us')['o3'] == ('1h', '8h')
+    assert aqipy.get_periods('eu')['no2'] == ('max_1h',)
+    with pytest.raises(ValueError):
+        aqipy.get_arguments('xx')
+
+
+def test_lazy_modules():
+    code = ("import sys, aqipy\n"
+            "aqipy.get_periods('cn')\n"
+            "assert aqipy.get_calculator('us')(pm25_24h=12.3)[0] == 51\n"
+            "print(sorted(m for m in sys.modules if m.startswith('aqipy.')))\n")
+    out = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    assert out.stdout.strip() == "['aqipy.aqi_us', 'aqipy.utils']"
+    assert aqipy.aqhi_hk.get_aqhi is aqipy.get_calculator('hk')
+    assert 'daqi_uk' in dir(aqipy)
+    with pytest.raises(AttributeError):
+        aqipy.unknown
+
+
+def test_scalar_calculators_do_not_import_numpy():
+    code = ("import sys, aqipy\n"
+            "assert aqipy.aqi_us.get_aqi(pm25_24h=12.3, o3_8h=0.031)[0] == 51\n"
+            "assert aqipy.multi.get_indexes({'pm25_24h': 12.3})['us'][0] == 51\n"
+            "print('numpy' in sys.modules)\n")
+    out = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    assert out.stdout.strip() == 'False'
+
+
+def test_standard_tables():
+    assert len(STANDARDS) == 8 and list(STANDARDS) == list(aqipy.get_standards()[:8])
+    assert 'ca' not in STANDARDS and STANDARDS.get('ca') is None
+    with pytest.raises(KeyError):
+        STANDARDS['ca']
+    inputs, bands, levels = STANDARDS['uk']
+    assert levels is aqipy.daqi_uk.UK_AQI_LEVELS and dict(STANDARDS.items())['uk'][0] is inputs
+
+
+def test_get_category_matches_level():
+    import random
+    rng = random.Random(11)
+    values = (None, 0, -0.5, 0.004, 0.06, 0.125, 0.6, 1.5, 12.05, 35.4, 150.5, 250.4, 500.0, 5000)
+    for standard in aqipy.get_standards():
+        module = aqipy.get_module(standard)
+        calculator = aqipy.get_calculator(standard)
+        names = getattr(module, aqipy.REGISTRY[standard][4])
+        arguments = aqipy.get_arguments(standard)
+        for _ in range(2000):
+            if aqipy.REGISTRY[standard][2] is None:
+                reading = {name: rng.choice((None, 0.01, 0.05, 0.1, 5, 20, 80, 300)) for name in arguments}
+            else:
+                reading = {name: rng.choice(values) for name in arguments if rng.random() < 0.5}
+            category = module.get_category(**reading)
+            level = calculator(**reading, with_level=True)[1]
+            # missing readings give (-1, {}), or (-1, "", "") for AQHI
+            level = level.get('level', "") if isinstance(level, dict) else ""
+            assert (names[category] if category >= 0 else "") == level, (standard, reading)
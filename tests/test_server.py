@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from aqipy import multi, server
+from aqipy.station import STANDARDS
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(b'%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s'
+                 % (method.encode(), path.encode(), len(body), body))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_server():
+    readings = [{'pm25_24h': 10 + i, 'o3_8h': 0.03 + i / 1000} for i in range(50)]
+
+    async def run():
+        service = server.AqiServer(max_delay=0.01)
+        await service.start()
+        try:
+            results = await asyncio.gather(*[request(service.port, 'POST', '/v1/aqi/us', r) for r in readings])
+            bulk = await request(service.port, 'POST', '/v1/aqi/in', readings)
+            messages = await request(service.port, 'GET', '/v1/messages/us')
+            errors = [await request(service.port, 'POST', '/v1/aqi/us', {'pm25_24h': 'x'}),
+                      await request(service.port, 'GET', '/v1/aqi/us'),
+                      await request(service.port, 'GET', '/v1/nothing')]
+            metrics = await request(service.port, 'GET', '/v1/metrics')
+        finally:
+            await service.close()
+        return results, bulk, messages, errors, metrics
+
+    results, bulk, messages, errors, metrics = asyncio.run(run())
+    for reading, (status, result) in zip(readings, results):
+        aqi, dominant, level = multi.get_indexes(reading, ('us',))['us']
+        assert status == 200
+        assert result == {'aqi': aqi, 'dominant': dominant, 'level': level, 'message': level}
+    assert bulk[1] == [{'aqi': a, 'dominant': d, 'level': c, 'message': c}
+                       for a, d, c in (multi.get_indexes(r, ('in',))['in'] for r in readings)]
+    status, catalog = messages
+    text = catalog['messages'][results[0][1]['dominant']][results[0][1]['message']]
+    assert text[0] == STANDARDS['us'][0]['pm25_24h'][5][0][0]
+    assert [e[0] for e in errors] == [400, 405, 404]
+    assert metrics[1]['requests'] == 51
+    assert metrics[1]['readings'] == 100
+    assert metrics[1]['batches'] < 51
+    assert metrics[1]['latency_p99_ms'] >= metrics[1]['latency_p50_ms'] > 0
+
+
+def test_server_failing_request():
+    async def run():
+        service = server.AqiServer(max_delay=0.05)
+        await service.start()
+        try:
+            # the overflowing reading is batched together with the valid ones
+            return await asyncio.gather(request(service.port, 'POST', '/v1/aqi/us', {'pm25_24h': 12.3}),
+                                        request(service.port, 'POST', '/v1/aqi/us', {'pm25_24h': 10 ** 400}),
+                                        request(service.port, 'POST', '/v1/aqi/us', [{'o3_8h': 0.031}])), \
+                service.metrics()
+        finally:
+            await service.close()
+
+    (valid, failing, bulk), metrics = asyncio.run(run())
+    assert valid == (200, {'aqi': 51, 'dominant': 'pm25_24h', 'level': 1, 'message': 1})
+    assert failing[0] == 500 and failing[1]['error'].startswith('OverflowError')
+    assert bulk[0] == 200 and bulk[1][0]['dominant'] == 'o3_8h'
+    assert metrics['batches'] == 1
+
+
+def test_server_does_not_block_and_closes_pending_requests(monkeypatch):
+    import time
+
+    def slow_rows(readings, standard):
+        time.sleep(0.5)
+        return multi.get_indexes_rows(readings, standard)
+
+    monkeypatch.setattr(server, 'get_indexes_rows', slow_rows)
+
+    async def run():
+        service = server.AqiServer(max_batch=1, max_delay=0.001)
+        await service.start()
+        slow = asyncio.ensure_future(request(service.port, 'POST', '/v1/aqi/us', {'pm25_24h': 12.3}))
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        metrics = await request(service.port, 'GET', '/v1/metrics')
+        elapsed = time.perf_counter() - start
+        queued = [asyncio.ensure_future(service.evaluate('us', [{'pm25_24h': 5}])) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        await service.close()
+        return metrics, elapsed, await asyncio.gather(slow, *queued, return_exceptions=True), service.queue_depth()
+
+    metrics, elapsed, (slow, *queued), depth = asyncio.run(run())
+    # the running batch does not delay other connections
+    assert metrics[0] == 200 and elapsed < 0.3
+    assert slow[0] == 500 and 'server is closing' in slow[1]['error']
+    assert all(isinstance(result, ConnectionAbortedError) for result in queued)
+    assert depth == 0
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from aqipy import aqi_us, caqi_eu, psi_sg, multi
+from aqipy.station import Station, STANDARDS
+
+
+def test_station_matches_calculator():
+    rnd = random.Random(7)
+    for standard, calculator in (('us', aqi_us.get_aqi), ('eu', caqi_eu.get_caqi), ('sg', psi_sg.get_aqi)):
+        station = Station(standard)
+        inputs = STANDARDS[standard][0]
+        kwargs = {}
+        for _ in range(500):
+            name = rnd.choice(list(inputs))
+            kwargs[name] = rnd.choice([None, 0, 0.0004, rnd.uniform(0, 1), rnd.uniform(0, 300)])
+            assert station.update(**{name: kwargs[name]}) == calculator(**kwargs)
+            assert station.get_aqi(with_level=True) == calculator(**kwargs, with_level=True)
+            assert station.dominant == multi.get_indexes(kwargs, (standard,))[standard][1]
+            if station.dominant is not None:
+                aqi, data = station.get_aqi()
+                assert getattr(data[station.dominant], 'aqi', aqi) == aqi
+
+
+def test_station_no_op_update():
+    station = Station('us')
+    aqi, data = station.update(pm25_24h=35.51, o3_8h=0.0701)
+    assert (aqi, station.dominant) == (101, 'pm25_24h')
+    assert station.update(pm25_24h=35.54) == (aqi, data)
+    assert station.get_aqi()[1] is data
+    assert station.update(pm25_24h=None) == (100, {'o3_8h': aqi_us.get_aqi_o3_8h(0.0701)})
+    assert station.dominant == 'o3_8h'
+    station.reset()
+    assert station.get_aqi() == (-1, {})
+    station = Station('eu')
+    station.update(o3_max_1h=200, pm10_1h=10)
+    assert station.dominant == 'o3_1h' == multi.get_indexes({'o3_max_1h': 200, 'pm10_1h': 10}, ('eu',))['eu'][1]
+    with pytest.raises(TypeError):
+        station.update(pm25=1)
+    with pytest.raises(ValueError):
+        Station('ca')
@@ -0,0 +1,82 @@
+from aqipy import aqi_us, aqhi_ca, caqi_eu, daqi_uk
+from aqipy.stream import DailyAggregator, RollingMean, StationAverages, get_calculator_periods
+
+
+def test_rolling_mean():
+    mean = RollingMean(3600)
+    assert mean.mean() is None
+    for t in range(0, 3600, 60):
+        mean.add(t, 10 if t < 1800 else 20)
+    assert mean.mean() == 15
+    mean.add(3600, 20)
+    assert mean.mean() > 15
+    assert mean.mean(5400) == 20
+    assert mean.mean(7200 + 60) is None
+
+
+def test_rolling_mean_late_samples():
+    mean = RollingMean(900, 15)
+    mean.add(1000, 1)
+    mean.add(990, 3)
+    assert mean.mean() == 2
+    mean.add(10, 100)
+    assert mean.mean() == 2
+
+
+def test_rolling_mean_coverage():
+    mean = RollingMean(3600, 4)
+    mean.add(0, 5)
+    assert mean.mean(min_coverage=0.5) is None
+    mean.add(1000, 5)
+    assert mean.mean(min_coverage=0.5) == 5
+
+
+def test_station_averages_kwargs():
+    averages = StationAverages()
+    for t in range(0, 86400, 10):
+        averages.add(t, o3=0.07853333, co=5, pm25=None)
+    kwargs = averages.kwargs(aqi_us.get_aqi, 86400)
+    assert abs(kwargs['o3_8h'] - 0.07853333) < 1e-9
+    assert kwargs['pm25_24h'] is None
+    aqi, aqi_data = averages.calculate(aqi_us.get_aqi, 86400)
+    assert aqi == 126
+    assert aqi_data['co_8h'][0] == 56
+    assert averages.calculate(aqi_us.get_aqi, 86400, with_level=True)[1]['level'] == 'unhealthy sensitive'
+    assert averages.calculate(aqhi_ca.get_aqhi, 86400)[0] == -1
+    assert averages.calculate(caqi_eu.get_caqi, 86400)[1]['o3_1h'] == 65
+    assert averages.calculate(daqi_uk.get_daqi, 86400)[0] == 6
+
+
+def test_calculator_periods():
+    assert get_calculator_periods(caqi_eu.get_caqi)[1] == ('o3_max_1h', 'o3', '1h')
+    assert [p[0] for p in get_calculator_periods(daqi_uk.get_daqi)] == ['o3_1h', 'no2_1h', 'so2_15m', 'pm25_24h',
+                                                                        'pm10_24h']
+
+
+def test_daily_aggregator():
+    aggregator = DailyAggregator('us', hours=(0, 12), utc_offset=-3600)
+    records = []
+    for hour in range(1, 50):
+        for station in ('a', 'b'):
+            pm25 = 10 + hour if station == 'a' else None
+            record = aggregator.add(station, hour * 3600, *aqi_us.get_aqi(pm25_24h=pm25, o3_8h=0.06))
+            if record is not None:
+                records.append(record)
+    assert len(aggregator) == 2
+    # local days start at 01:00 UTC
+    assert records[0] == ('a', 0, 97, 'pm25_24h', (0, 24, 0, 0, 0, 0), (67, 74))
+    assert records[1] == ('b', 0, 67, 'o3_8h', (0, 24, 0, 0, 0, 0), (67, 67))
+    assert records[2][:4] == ('a', 1, 152, 'pm25_24h') and sum(records[2][4]) == 24
+    # late index of a finished day
+    assert aggregator.add('a', 3600, 500) is None
+    assert aggregator.flush() == [('a', 2, 153, 'pm25_24h', (0, 0, 0, 1, 0, 0), (153, -1)),
+                                  ('b', 2, 67, 'o3_8h', (0, 1, 0, 0, 0, 0), (67, -1))]
+    assert len(aggregator) == 0
+
+
+def test_daily_aggregator_aqhi():
+    aggregator = DailyAggregator('ca')
+    aggregator.add(1, 0, aqhi_ca.get_aqhi(0.03, 0.02, 10, 10)[0])
+    aggregator.add(1, 3600, -1)
+    aggregator.add(1, 7200, 11)
+    assert aggregator.add(1, 86400, 1) == (1, 0, 11, None, (0, 1, 0, 1), (4, -1, -1, -1))
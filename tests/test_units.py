@@ -0,0 +1,54 @@
+import pytest
+
+from aqipy import aqi_us, caqi_eu, cli, multi, units
+from aqipy.station import Station
+
+
+def test_factors():
+    assert units.get_molar_volume() == pytest.approx(24.465, abs=1e-3)
+    assert units.convert(40, 'no2_1h', 'ppb') == pytest.approx(0.04)
+    assert units.convert(100, 'no2', 'µg/m³') == pytest.approx(100 * 24.465 / 46.0055 / 1000, rel=1e-4)
+    assert units.convert(0.05, 'no2', 'ppm', 'ug/m3') == pytest.approx(0.05 / units.convert(1, 'no2', 'ug/m3'))
+    assert units.convert(1.2, 'co', 'mg/m3', 'ppm', temperature=20) < units.convert(1.2, 'co', 'mg/m3', 'ppm')
+    assert units.convert(12.3, 'pm25_24h', 'mg/m3') == pytest.approx(12300)
+    assert units.convert(12.3, 'pm25', 'ug/m3') == 12.3
+    assert units.convert(None, 'o3', 'ppb') is None
+    with pytest.raises(ValueError):
+        units.convert(1, 'pm10', 'ppb')
+    with pytest.raises(ValueError):
+        units.convert(1, 'o3', 'ppt')
+    with pytest.raises(ValueError):
+        units.convert(1, 'xx', 'ppb')
+
+
+def test_arrays():
+    np = pytest.importorskip('numpy')
+    c = np.array([10.0, 0.0, np.nan, 80.0])
+    converted = units.convert(c, 'o3', 'ppb')
+    assert np.allclose(converted, c / 1000, equal_nan=True)
+    temperature = np.array([0.0, 10.0, 20.0, 30.0])
+    converted = units.convert(c, 'o3', 'ug/m3', temperature=temperature)
+    assert np.allclose(converted, [units.convert(v, 'o3', 'ug/m3', temperature=t) for v, t in zip(c, temperature)],
+                       equal_nan=True)
+
+
+def test_calculators_with_units():
+    reading = {'pm25_24h': 0.03551, 'o3_8h': 70.1, 'no2_1h': 100}
+    reading_units = {'pm25': 'mg/m3', 'o3': 'ppb', 'no2_1h': 'ug/m3'}
+    converted = units.convert_reading(reading, reading_units)
+    expected = aqi_us.get_aqi(**converted)[0]
+    assert multi.get_indexes(reading, ('us',), reading_units)['us'][0] == expected
+    assert multi.get_indexes_rows([reading], 'us', reading_units)[0][0] == expected
+    assert Station('us', reading_units).update(**reading)[0] == expected
+    assert multi.get_indexes({'no2_1h': 100}, ('eu',), 'ug/m3', temperature=20)['eu'][0] == \
+        caqi_eu.get_caqi(no2_max_1h=units.convert(100, 'no2', 'ug/m3', temperature=20))[0]
+
+
+def test_cli_units(tmp_path, capsys):
+    path = tmp_path / 'readings.csv'
+    path.write_text("pm25_24h,o3_8h\n35.51,70.1\n")
+    assert cli.main(['--unit', 'o3=ppb', str(path)]) == 0
+    assert capsys.readouterr().out.splitlines()[1] == '%d,pm25_24h,unhealthy sensitive' % \
+        aqi_us.get_aqi(pm25_24h=35.51, o3_8h=0.0701)[0]
+    with pytest.raises(SystemExit):
+        cli.main(['--unit', 'ppb', '--unit', 'o3=ppb', str(path)])
@@ -0,0 +1,208 @@
+import pytest
+
+from aqipy import aqi_au, aqi_cn, aqi_us, daqi_uk, psi_sg, aqhi_hk
+from aqipy.utils import AQI_MIN, BreakpointTable, CategoryEdges, IndexBands, RatioTable, SubIndex
+
+
+def test_breakpoint_table_placeholders():
+    table = aqi_us.US_OZONE_1H_TABLE
+    assert table.index(0) == AQI_MIN
+    assert table.index(0.1) == AQI_MIN
+    assert table.index(0.125) == 2
+    assert table.evaluate(0) == 0
+    assert psi_sg.SG_NO2_1H_TABLE.index(1) == 2
+
+
+def test_breakpoint_table_gaps():
+    table = aqi_us.US_PM25_24H_TABLE
+    assert table.index(12.0) == 0
+    assert table.index(12.05) == AQI_MIN
+    assert table.index(12.1) == 1
+    assert table.evaluate(-1) == 0
+
+
+def test_breakpoint_table_saturation():
+    table = aqi_us.US_OZONE_8H_TABLE
+    assert table.index(0.106) == table.saturated
+    assert table.evaluate(0.150) == 300
+    assert aqi_us.US_PM25_24H_TABLE.evaluate(1000) == 500
+    assert aqi_us.US_PM25_24H_TABLE.evaluate(float('nan')) == 500
+    assert BreakpointTable(((0, 10), (11, 20)), ((0, 50), (51, 100)), 80).evaluate(15) == 80
+
+
+def test_index_bands():
+    bands = IndexBands(aqi_us.US_AQI)
+    assert bands.find(0) == 0
+    assert bands.find(150) == 2
+    assert bands.find(50.5) == -1
+    assert bands.find(-1) == -1
+    assert bands.find(1000) == 5
+    hk = IndexBands(aqhi_hk.HK_AR)
+    assert hk.find(3.76) == 1
+    assert hk.find(19.37) == 10
+
+
+def test_dense_tables():
+    values = [0, 0.1, 12.0, 12.1, 35.44, 55.5, 150.4, 500.4, 500.5, 1000]
+    expected = [aqi_us.get_aqi_pm25_24h(v) for v in values]
+    table = aqi_us.US_PM25_24H_TABLE
+    table.set_dense()
+    try:
+        assert [aqi_us.get_aqi_pm25_24h(v) for v in values] == expected
+        assert len(table._dense[0]) == 5006
+        assert table.dense_key(35.4) == 354
+        assert table.dense_key(35.45) == -1
+        assert table.dense_key(1000) == -1
+    finally:
+        table.set_dense(False)
+    with pytest.raises(ValueError):
+        BreakpointTable(((0, 10), (11, 20)), ((0, 50), (51, 100))).set_dense()
+
+
+def test_sub_index():
+    sub_index = aqi_us.get_aqi_o3_8h(0.07853333)
+    assert sub_index == (126, aqi_us.US_OZONE_EFFECTS[2], aqi_us.US_OZONE_CAUTIONS[2])
+    assert sub_index[0] == 126
+    assert sub_index[-1] == aqi_us.US_OZONE_CAUTIONS[2]
+    assert sub_index.category == 2
+    assert sub_index.effect == aqi_us.US_OZONE_EFFECTS[2]
+    assert len(sub_index) == 3
+    assert not hasattr(sub_index, '__dict__')
+    assert SubIndex(5, -1, aqi_us.US_OZONE_MESSAGES) == (5, "", "")
+
+
+def test_table_sub_index():
+    # every kind of table gives individual indexes the same way
+    index = aqi_us.US_OZONE_8H_TABLE.sub_index(0.078, aqi_us.US_OZONE_MESSAGES)
+    assert (index.aqi, index.category) == (126, 2)
+    index = daqi_uk.UK_PM10_24H_TABLE.sub_index(60, daqi_uk.UK_DAQI_MESSAGES)
+    assert (index.aqi, index.category) == (5, 4) and index == daqi_uk.get_aqi_pm10_24h(60)
+    index = aqi_au.AU_PM25_24H_TABLE.sub_index(30, aqi_au.AU_AQI_MESSAGES)
+    assert (index.aqi, index.category) == (120, 3) and index == aqi_au.get_aqi_pm25_24h(30)
+    assert RatioTable(25, 200).sub_index(30, aqi_au.AU_AQI_MESSAGES) == (120, "", "")
+
+
+def test_sub_index_cache():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from aqipy import caqi_eu, daqi_uk, utils
+
+    expected = [aqi_us.get_aqi(pm25_24h=i / 10, o3_8h=0.05) for i in range(1, 300)]
+    cache = utils.set_sub_index_cache(1024)
+    try:
+        assert utils.get_sub_index_cache() is cache
+        with ThreadPoolExecutor(4) as pool:
+            for _ in range(3):
+                assert list(pool.map(lambda i: aqi_us.get_aqi(pm25_24h=i / 10, o3_8h=0.05), range(1, 300))) == expected
+        info = cache.info()
+        assert info['hits'] + info['misses'] == 3 * 299 * 2
+        assert info['size'] == len(cache) == 300
+        assert info['hits'] >= 3 * 299 * 2 - 2 * 300
+        assert aqi_us.get_aqi_pm25_24h(35.51) is aqi_us.get_aqi_pm25_24h(35.54)
+        assert daqi_uk.get_daqi(pm25_24h=40)[0] == 4
+        assert caqi_eu.get_caqi_pm25_24h(40) == caqi_eu.get_caqi_pm25_24h(40.2)
+        cache = utils.set_sub_index_cache(64)
+        for i in range(1, 300):
+            aqi_us.get_aqi_pm25_24h(i / 10)
+        assert len(cache) == 64
+        aqi_us.get_aqi_pm25_24h(29.8)
+        aqi_us.get_aqi_pm25_24h(0.1)
+        assert (cache.hits, cache.misses) == (1, 300)
+        # every table has its own entries
+        aqi_us.get_aqi_o3_8h(0.05)
+        assert len(cache) == 65 and caqi_eu.get_caqi_pm25_24h(40) == 83
+        # callers passing new message tuples share the entries of the table
+        texts_cache = utils.set_sub_index_cache(16)
+        for i in range(1000):
+            utils.__get_aqi_general_formula_texts(i % 10, aqi_us.US_PM25_24H, *aqi_us.US_PM_MESSAGES, aqi_us.US_AQI)
+        assert texts_cache.info() == {'hits': 990, 'misses': 10, 'size': 10, 'maxsize': 16}
+        cache.clear()
+        assert cache.info() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 64}
+    finally:
+        assert utils.set_sub_index_cache(0) is None
+    with pytest.raises(ValueError):
+        utils.SubIndexCache(0)
+
+
+def test_instrumentation():
+    from aqipy import utils, caqi_eu, daqi_uk
+    original = aqi_us.get_aqi
+    expected = original(pm25_24h=12.3, o3_8h=0.2)
+    utils.set_instrumentation()
+    try:
+        assert aqi_us.get_aqi is not original
+        assert aqi_us.get_aqi(pm25_24h=12.3, o3_8h=0.2) == expected
+        aqi_us.get_aqi(pm25_24h=12.05, o3_1h=0.1)
+        daqi_uk.get_daqi(pm10_24h=1000)
+        caqi_eu.get_caqi(pm10_1h=20)
+        stats = utils.get_instrumentation()
+        assert stats['us']['calls'] == 2
+        assert stats['us']['categories'] == {4: 1, 0: 1}
+        assert stats['us']['time'] > 0
+        o3 = stats['us']['pollutants']['o3_8h']
+        assert (o3['calls'], o3['clamped'], o3['out_of_range'], o3['categories']) == (1, 1, 0, {4: 1})
+        pm25 = stats['us']['pollutants']['pm25_24h']
+        assert (pm25['calls'], pm25['clamped'], pm25['out_of_range']) == (2, 0, 0)
+        assert stats['us']['pollutants']['o3_1h']['out_of_range'] == 1
+        assert stats['uk']['pollutants']['pm10_24h']['clamped'] == 1
+        assert stats['eu']['pollutants']['pm10_1h']['categories'] == {0: 1}
+        assert stats['ca']['calls'] == 0
+        stats['us']['calls'] = 100
+        assert utils.get_instrumentation()['us']['calls'] == 2
+        utils.reset_instrumentation()
+        stats = utils.get_instrumentation()
+        assert stats['us']['calls'] == 0 and stats['us']['pollutants']['o3_8h']['categories'] == {}
+    finally:
+        utils.set_instrumentation(False)
+    assert aqi_us.get_aqi is original
+    assert aqi_us.US_AQI_INPUTS['o3_8h'][2] is aqi_us.get_aqi_o3_8h
+    assert utils.get_instrumentation() == {}
+
+
+def test_instrumentation_keeps_signatures():
+    import inspect
+    import aqipy
+    from aqipy import utils
+    from aqipy.station import STANDARDS
+    expected = {}
+    for standard in STANDARDS:
+        for _, _, fn, _, _, _ in STANDARDS[standard][0].values():
+            expected[(standard, fn.__name__)] = (fn(0.07), next(iter(inspect.signature(fn).parameters)))
+    utils.set_instrumentation()
+    try:
+        for (standard, name), (result, argument) in expected.items():
+            fn = getattr(aqipy.get_module(standard), name)
+            assert fn(0.07) == result
+            assert fn(**{argument: 0.07}) == result
+        assert aqi_us.get_aqi_pm25_24h(pm25_24h=10) == aqi_us.get_aqi_pm25_24h(10)
+        assert utils.get_instrumentation()['us']['pollutants']['pm25_24h']['calls'] == 4
+    finally:
+        utils.set_instrumentation(False)
+
+
+def test_category_edges():
+    spec = aqi_cn.CN_AQI_INPUTS['pm25_24h']
+    edges = CategoryEdges(spec[1], spec[4], IndexBands(aqi_cn.CN_AQI))
+    assert edges.find(0) == 0
+    assert edges.find(150.0) == 1
+    # concentrations between integer breakpoints give index 0
+    assert edges.find(150.5) == 0
+    assert edges.find(151.0) == 2
+    assert edges.find(5000) == 5
+    assert edges.find(-1) == 0
+    assert list(edges.edges) == sorted(edges.edges)
+
+
+def test_compiled_table():
+    table = BreakpointTable(aqi_us.US_OZONE_1H, aqi_us.US_AQI, decimals=3)
+    evaluate, sub_index = table.compile()
+    assert 'def sub_index(cp, messages):' in table.get_source()
+    for k in range(-2, 700):
+        cp = k / 1000
+        t = table.index(cp)
+        expected = table.max_aqi if t == table.saturated else 0 if t == AQI_MIN else table.interpolate(t, cp)
+        assert evaluate(cp) == table.evaluate(cp) == expected
+        index = sub_index(cp, aqi_us.US_OZONE_MESSAGES)
+        assert (index.aqi, index.category) == (expected, 0 if t == AQI_MIN else table.bands.find(expected))
+    # equal tables share generated code
+    assert BreakpointTable(aqi_us.US_OZONE_1H, aqi_us.US_AQI).compile()[0].__code__ is evaluate.__code__